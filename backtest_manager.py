@@ -1,9 +1,10 @@
 import asyncio
 from logging_setup import logger_main
 from start_trading_all import run_backtest
+from backtest_store import new_run_id
 
-async def run_backtests(exchange_id, user_id, symbols, backtest_days, testnet):
-    """Runs backtests for all symbols in parallel and returns results."""
+async def run_backtests(exchange_id, user_id, symbols, backtest_days, testnet, store=None, run_id=None):
+    """Runs backtests for all symbols in parallel and returns results, recording them in the result store if given."""
     backtest_results = {}
     batch_size = 20  # Increased batch size for parallel backtesting
     logger_main.info(f"Starting backtest for {len(symbols)} symbols in batches of {batch_size}")
@@ -30,4 +31,9 @@ async def run_backtests(exchange_id, user_id, symbols, backtest_days, testnet):
                 backtest_results[symbol] = result
                 logger_main.debug(f"Backtest result for {symbol}: {result}")
     logger_main.info(f"Backtest completed for {len(backtest_results)} symbols")
+    if store is not None:
+        run_id = run_id or new_run_id()
+        params = {'days': backtest_days, 'leverage': 1.0, 'trade_percentage': 0.1, 'rsi_overbought': 70, 'rsi_oversold': 30}
+        count = store.append_results(run_id, backtest_results, strategy='rsi', params=params)
+        logger_main.info(f"Stored {count} backtest results as run {run_id}")
     return backtest_results
@@ -0,0 +1,351 @@
+import contextlib
+import fcntl
+import json
+import os
+import secrets
+import time
+import numpy as np
+import pandas as pd
+from logging_setup import logger_main
+
+KEY_COLUMNS = ['run_id', 'symbol', 'strategy']
+
+class BacktestResultStore:
+    """
+    Append-only columnar store for backtest results.
+
+    Every append is written as a new immutable segment file holding one
+    column per field, so adding results never rewrites earlier data. A row
+    is identified by (run_id, symbol, strategy); a later row with the same
+    key supersedes the earlier one, which is how partial updates work.
+    Live rows are indexed by symbol and by run, and metric columns are kept
+    as numpy arrays so top-N queries use argpartition instead of a sort.
+
+    Several processes may share a directory: segments are numbered and
+    written under an exclusive flock on the directory, and every query first
+    loads the segments other writers added since the last one.
+    """
+
+    def __init__(self, path='backtest_store'):
+        """
+        Initialize the store and load existing segments.
+
+        Args:
+            path (str): Directory holding the segment files (default: 'backtest_store').
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._size = 0
+        self._run_id = []
+        self._symbol = []
+        self._strategy = []
+        self._params = []
+        self._metrics = {}
+        self._key_row = {}
+        self._by_symbol = {}
+        self._by_run = {}
+        self._next_segment = 0
+        self._load()
+
+    @contextlib.contextmanager
+    def _locked(self, operation=fcntl.LOCK_EX):
+        with open(os.path.join(self.path, '.lock'), 'a') as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _segment_files(self):
+        return sorted(f for f in os.listdir(self.path) if f.startswith('segment-') and f.endswith('.npz'))
+
+    @staticmethod
+    def _segment_number(name):
+        return int(name[len('segment-'):-len('.npz')])
+
+    def _load_new(self):
+        # Segment numbers only grow, so the segments not seen yet are the ones at or above _next_segment
+        files = [name for name in self._segment_files() if self._segment_number(name) >= self._next_segment]
+        for name in files:
+            with np.load(os.path.join(self.path, name), allow_pickle=False) as segment:
+                metrics = {key[2:]: segment[key] for key in segment.files if key.startswith('m_')}
+                self._add_rows(
+                    segment['run_id'].tolist(), segment['symbol'].tolist(),
+                    segment['strategy'].tolist(), segment['params'].tolist(), metrics
+                )
+        if files:
+            self._next_segment = self._segment_number(files[-1]) + 1
+        return len(files)
+
+    def _load(self):
+        with self._locked(fcntl.LOCK_SH):
+            count = self._load_new()
+        logger_main.info(f"Loaded {len(self._key_row)} backtest results from {count} segments in {self.path}")
+
+    def refresh(self):
+        """
+        Load segments written by other store instances since the last load.
+
+        Returns:
+            int: Number of new segments loaded.
+        """
+        with self._locked(fcntl.LOCK_SH):
+            return self._load_new()
+
+    def _ensure_capacity(self, extra):
+        needed = self._size + extra
+        for name, column in self._metrics.items():
+            if len(column) < needed:
+                grown = np.full(max(needed, 2 * len(column)), np.nan)
+                grown[:self._size] = column[:self._size]
+                self._metrics[name] = grown
+
+    def _add_rows(self, run_ids, symbols, strategies, params, metrics):
+        count = len(run_ids)
+        for name in metrics:
+            if name not in self._metrics:
+                self._metrics[name] = np.full(max(self._size + count, 16), np.nan)
+        self._ensure_capacity(count)
+        start = self._size
+        for name, values in metrics.items():
+            self._metrics[name][start:start + count] = values
+        self._run_id.extend(run_ids)
+        self._symbol.extend(symbols)
+        self._strategy.extend(strategies)
+        self._params.extend(params)
+        self._size += count
+        for row in range(start, start + count):
+            key = (self._run_id[row], self._symbol[row], self._strategy[row])
+            self._key_row[key] = row
+            self._by_symbol.setdefault(key[1], set()).add(key)
+            self._by_run.setdefault(key[0], set()).add(key)
+
+    def _write_segment(self, run_ids, symbols, strategies, params, metrics):
+        # Called with the exclusive lock held, after _load_new, so the number is free
+        columns = {
+            'run_id': np.array(run_ids, dtype=str),
+            'symbol': np.array(symbols, dtype=str),
+            'strategy': np.array(strategies, dtype=str),
+            'params': np.array(params, dtype=str)
+        }
+        for name, values in metrics.items():
+            columns[f"m_{name}"] = np.asarray(values, dtype=np.float64)
+        name = f"segment-{self._next_segment:08d}.npz"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        self._next_segment += 1
+
+    def append(self, rows):
+        """
+        Append result rows as a new segment.
+
+        Args:
+            rows (list): Dicts with 'run_id', 'symbol', 'strategy', optional 'params'
+                (dict) and numeric metric fields (e.g. 'profit', 'sharpe_ratio').
+
+        Returns:
+            int: Number of rows appended.
+        """
+        if not rows:
+            return 0
+        run_ids, symbols, strategies, params = [], [], [], []
+        names = sorted({k for row in rows for k in row if k not in KEY_COLUMNS and k != 'params'})
+        metrics = {name: np.full(len(rows), np.nan) for name in names}
+        for i, row in enumerate(rows):
+            run_ids.append(str(row['run_id']))
+            symbols.append(row['symbol'])
+            strategies.append(row.get('strategy', 'default'))
+            params.append(json.dumps(row.get('params', {}), sort_keys=True))
+            for name in names:
+                value = row.get(name)
+                if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                    metrics[name][i] = value
+        with self._locked():
+            self._load_new()
+            self._write_segment(run_ids, symbols, strategies, params, metrics)
+            self._add_rows(run_ids, symbols, strategies, params, metrics)
+        logger_main.debug(f"Appended {len(rows)} backtest results to {self.path}")
+        return len(rows)
+
+    def append_results(self, run_id, results, strategy='default', params=None):
+        """
+        Append a {symbol: result} mapping as produced by backtest_manager.run_backtests.
+
+        Args:
+            run_id (str): Backtest run ID.
+            results (dict): Mapping of symbol to a result dict (or None for failed backtests).
+            strategy (str): Strategy name (default: 'default').
+            params (dict): Strategy parameters shared by the run.
+
+        Returns:
+            int: Number of rows appended.
+        """
+        rows = []
+        for symbol, result in results.items():
+            if not isinstance(result, dict):
+                continue
+            row = {k: v for k, v in result.items() if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)}
+            row.update(run_id=run_id, symbol=symbol, strategy=strategy, params=params or {})
+            rows.append(row)
+        return self.append(rows)
+
+    def update(self, run_id, symbol, strategy='default', **metrics):
+        """
+        Update metrics of an existing result by appending a superseding row.
+
+        Args:
+            run_id (str): Backtest run ID.
+            symbol (str): Trading symbol.
+            strategy (str): Strategy name (default: 'default').
+            **metrics: Metric values to set; other fields are carried over.
+
+        Returns:
+            bool: True if the row existed and was updated, False otherwise.
+        """
+        self.refresh()
+        row = self._key_row.get((str(run_id), symbol, strategy))
+        if row is None:
+            return False
+        merged = {name: column[row] for name, column in self._metrics.items() if not np.isnan(column[row])}
+        merged.update(metrics)
+        merged.update(run_id=run_id, symbol=symbol, strategy=strategy, params=json.loads(self._params[row]))
+        self.append([merged])
+        return True
+
+    def _rows(self, symbol=None, run_id=None, strategy=None):
+        if symbol is not None and run_id is not None:
+            keys = self._by_symbol.get(symbol, set()) & self._by_run.get(str(run_id), set())
+        elif symbol is not None:
+            keys = self._by_symbol.get(symbol, set())
+        elif run_id is not None:
+            keys = self._by_run.get(str(run_id), set())
+        else:
+            keys = self._key_row.keys()
+        rows = [self._key_row[key] for key in keys if strategy is None or key[2] == strategy]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def _frame(self, rows):
+        data = {
+            'run_id': [self._run_id[r] for r in rows],
+            'symbol': [self._symbol[r] for r in rows],
+            'strategy': [self._strategy[r] for r in rows],
+            'params': [json.loads(self._params[r]) for r in rows]
+        }
+        for name, column in self._metrics.items():
+            data[name] = column[rows]
+        return pd.DataFrame(data)
+
+    def query(self, symbol=None, run_id=None, strategy=None):
+        """
+        Get the current results matching the filters.
+
+        Args:
+            symbol (str): Filter by symbol (optional).
+            run_id (str): Filter by run ID (optional).
+            strategy (str): Filter by strategy (optional).
+
+        Returns:
+            pd.DataFrame: Matching rows.
+        """
+        self.refresh()
+        return self._frame(self._rows(symbol, run_id, strategy))
+
+    def top_n(self, metric='profit', n=100, run_id=None, strategy=None, ascending=False):
+        """
+        Get the best N results by a metric.
+
+        Args:
+            metric (str): Metric column to rank by (default: 'profit').
+            n (int): Number of rows to return (default: 100).
+            run_id (str): Restrict to a run (optional).
+            strategy (str): Restrict to a strategy (optional).
+            ascending (bool): Rank lowest first, e.g. for drawdown (default: False).
+
+        Returns:
+            pd.DataFrame: Top rows ordered by the metric.
+        """
+        self.refresh()
+        if metric not in self._metrics:
+            raise ValueError(f"Unknown metric: {metric}")
+        rows = self._rows(run_id=run_id, strategy=strategy)
+        values = self._metrics[metric][rows]
+        valid = ~np.isnan(values)
+        rows, values = rows[valid], values[valid]
+        scores = values if ascending else -values
+        if n < len(rows):
+            part = np.argpartition(scores, n)[:n]
+            rows, scores = rows[part], scores[part]
+        return self._frame(rows[np.argsort(scores, kind='stable')])
+
+    def select_pairs(self, n=None, min_value=0.0, metric='profit', run_id=None, strategy=None):
+        """
+        Select trading pairs by their best result, replacing the selected_pairs.json reload.
+
+        Args:
+            n (int): Maximum number of pairs (default: all that qualify).
+            min_value (float): Minimum metric value for a pair to qualify (default: 0.0).
+            metric (str): Metric to rank by (default: 'profit').
+            run_id (str): Restrict to a run (optional).
+            strategy (str): Restrict to a strategy (optional).
+
+        Returns:
+            list: Symbols ordered from best to worst.
+        """
+        self.refresh()
+        top = self.top_n(metric, n=len(self._key_row), run_id=run_id, strategy=strategy)
+        top = top[top[metric] > min_value].drop_duplicates('symbol')
+        symbols = top['symbol'].tolist()
+        return symbols[:n] if n is not None else symbols
+
+    def compact(self):
+        """
+        Rewrite all live rows into a single segment and drop superseded rows.
+        """
+        with self._locked():
+            self._load_new()
+            rows = self._rows()
+            old_files = self._segment_files()
+            if not rows.size:
+                return
+            metrics = {name: column[rows] for name, column in self._metrics.items()}
+            columns = (
+                [self._run_id[r] for r in rows], [self._symbol[r] for r in rows],
+                [self._strategy[r] for r in rows], [self._params[r] for r in rows]
+            )
+            self._write_segment(*columns, metrics)
+            for name in old_files:
+                os.remove(os.path.join(self.path, name))
+            self._size = 0
+            self._run_id, self._symbol, self._strategy, self._params = [], [], [], []
+            self._metrics = {}
+            self._key_row, self._by_symbol, self._by_run = {}, {}, {}
+            self._add_rows(*columns, metrics)
+        logger_main.info(f"Compacted {len(old_files)} segments into one with {len(rows)} rows")
+
+    def import_legacy_json(self, path='backtest_results.json', run_id=None, strategy='default'):
+        """
+        Import a legacy {symbol: {metric: value}} results file.
+
+        Args:
+            path (str): Path to the JSON file (default: 'backtest_results.json').
+            run_id (str): Run ID for the imported rows (default: 'legacy-<mtime>').
+            strategy (str): Strategy name (default: 'default').
+
+        Returns:
+            int: Number of rows imported.
+        """
+        with open(path) as f:
+            results = json.load(f)
+        run_id = run_id or f"legacy-{int(os.path.getmtime(path))}"
+        count = self.append_results(run_id, results, strategy=strategy)
+        logger_main.info(f"Imported {count} legacy backtest results from {path} as run {run_id}")
+        return count
+
+def new_run_id():
+    """Generates a sortable backtest run ID, unique even for runs started in the same second."""
+    now = time.time()
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now % 1 * 1e6):06d}-{secrets.token_hex(3)}"
+
+__all__ = ['BacktestResultStore', 'new_run_id']
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+BAR_SCALES = {
+    'quick': [1_000, 10_000],
+    'full': [1_000, 10_000, 100_000, 1_000_000]
+}
+SYMBOL_SCALES = {
+    'quick': [10, 100],
+    'full': [10, 100, 1_000, 3_000]
+}
+BARS_PER_SYMBOL = 1_000
+
+def generate_ohlcv(bars, seed=0, start=1609459200000, step=3600000):
+    """
+    Generate synthetic OHLCV data as a geometric random walk.
+
+    Args:
+        bars (int): Number of candles.
+        seed (int): Random seed (default: 0).
+        start (int): First timestamp in milliseconds (default: 2021-01-01).
+        step (int): Candle duration in milliseconds (default: 1 hour).
+
+    Returns:
+        pd.DataFrame: OHLCV data (columns: ['timestamp', 'open', 'high', 'low', 'close', 'volume']).
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, bars))
+    volume = rng.lognormal(8, 1, bars)
+    timestamp = start + step * np.arange(bars, dtype=np.int64)
+    return pd.DataFrame({'timestamp': timestamp, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+def _crossover_signals(df, fast=10, slow=50):
+    """Vectorized SMA crossover signals (1 buy, -1 sell, 0 hold) for the backtest paths."""
+    trend = np.sign(df['close'].rolling(window=fast).mean() - df['close'].rolling(window=slow).mean())
+    return trend.diff().fillna(0).clip(-1, 1)
+
+def _targets():
+    from features import calculate_volatility, calculate_sma, calculate_rsi, extract_features
+    from strategies import (sma_crossover_strategy, rsi_divergence_strategy, macd_crossover_strategy,
+                            bollinger_breakout_strategy, volume_weighted_trend_strategy)
+    from backtest_cycle import run_backtest_cycle
+    from event_backtester import EventBacktester
+    from learning.backtester import backtest_strategy
+
+    def learning_backtester(df):
+        signals = _crossover_signals(df).map({1.0: 'buy', -1.0: 'sell', 0.0: None}).tolist()
+        candles = df.to_dict('records')
+        return asyncio.run(backtest_strategy(candles, signals))
+
+    def event_backtester(df):
+        return EventBacktester(df).run(_crossover_signals(df), profit_target=0.05, stop_loss=None, trailing_percent=0.01)
+
+    return {
+        'indicator': {
+            'calculate_volatility': calculate_volatility,
+            'calculate_sma': calculate_sma,
+            'calculate_rsi': calculate_rsi,
+            'extract_features': extract_features
+        },
+        'strategy': {
+            'sma_crossover_strategy': sma_crossover_strategy,
+            'rsi_divergence_strategy': rsi_divergence_strategy,
+            'macd_crossover_strategy': macd_crossover_strategy,
+            'bollinger_breakout_strategy': bollinger_breakout_strategy,
+            'volume_weighted_trend_strategy': volume_weighted_trend_strategy
+        },
+        'backtest': {
+            'run_backtest_cycle': lambda df: run_backtest_cycle(df, _crossover_signals, {}),
+            'learning_backtester': learning_backtester,
+            'event_backtester': event_backtester
+        }
+    }
+
+def _measure(func, frames, repeats):
+    """Returns the best wall time over repeats and the peak traced memory of one extra pass."""
+    best = float('inf')
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        for df in frames:
+            func(df)
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    for df in frames:
+        func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(preset='quick', groups=None, names=None, repeats=3):
+    """
+    Run every benchmark target at every bar and symbol scale of a preset.
+
+    Args:
+        preset (str): 'quick' or 'full' (default: 'quick').
+        groups (list): Restrict to groups ('indicator', 'strategy', 'backtest').
+        names (list): Restrict to target names.
+        repeats (int): Timing repeats, the best one is reported (default: 3).
+
+    Returns:
+        list: One result dict per (target, scale).
+    """
+    scales = [(bars, 1) for bars in BAR_SCALES[preset]]
+    scales += [(BARS_PER_SYMBOL, symbols) for symbols in SYMBOL_SCALES[preset]]
+    results = []
+    for bars, symbols in scales:
+        frames = [generate_ohlcv(bars, seed=i) for i in range(symbols)]
+        candles = bars * symbols
+        for group, targets in _targets().items():
+            if groups and group not in groups:
+                continue
+            for name, func in targets.items():
+                if names and name not in names:
+                    continue
+                seconds, peak = _measure(func, frames, repeats)
+                result = {
+                    'group': group,
+                    'name': name,
+                    'bars': bars,
+                    'symbols': symbols,
+                    'candles': candles,
+                    'seconds': seconds,
+                    'candles_per_sec': candles / seconds if seconds > 0 else float('inf'),
+                    'peak_mem_mb': peak / 2 ** 20
+                }
+                results.append(result)
+                print(f"{group:10s} {name:32s} bars={bars:>9d} symbols={symbols:>5d} "
+                      f"{result['candles_per_sec']:>14,.0f} candles/s {result['peak_mem_mb']:>10.1f} MB")
+        del frames
+    return results
+
+def _metadata(preset):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'preset': preset,
+        'timestamp': int(time.time()),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform()
+    }
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Compare two benchmark reports and list regressions.
+
+    Args:
+        baseline (dict): Earlier report as written by save_results.
+        current (dict): New report.
+        tolerance (float): Allowed relative slowdown or memory growth (default: 0.1).
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none).
+    """
+    key = lambda r: (r['group'], r['name'], r['bars'], r['symbols'])
+    previous = {key(r): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        label = f"{result['name']} (bars={result['bars']}, symbols={result['symbols']})"
+        if result['candles_per_sec'] < old['candles_per_sec'] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old['candles_per_sec']:,.0f} -> {result['candles_per_sec']:,.0f} candles/s")
+        if result['peak_mem_mb'] > old['peak_mem_mb'] * (1 + tolerance) and result['peak_mem_mb'] - old['peak_mem_mb'] > 1:
+            regressions.append(f"{label}: peak memory {old['peak_mem_mb']:.1f} -> {result['peak_mem_mb']:.1f} MB")
+    return regressions
+
+def save_results(results, path, preset):
+    """Writes a benchmark report as JSON and returns it."""
+    report = {'meta': _metadata(preset), 'results': results}
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indicator, strategy and backtest throughput")
+    parser.add_argument('--preset', choices=sorted(BAR_SCALES), default='quick')
+    parser.add_argument('--group', action='append', dest='groups', help="Benchmark group to run (repeatable)")
+    parser.add_argument('--name', action='append', dest='names', help="Benchmark target to run (repeatable)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="Earlier report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.preset, args.groups, args.names, args.repeats)
+    report = save_results(results, args.output, args.preset)
+    print(f"Saved {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import calendar
+import time
+from datetime import datetime, timezone
+
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+WEEK_OFFSET = 4 * 86400  # Weekly candles open on Monday, the epoch was a Thursday
+
+def timeframe_to_seconds(timeframe):
+    """
+    Duration of a ccxt timeframe.
+
+    Args:
+        timeframe (str): Timeframe such as '1m', '4h', '1d', '1w' or '1M' (months count as 30 days).
+
+    Returns:
+        int: Candle duration in seconds.
+    """
+    amount, unit = int(timeframe[:-1]), timeframe[-1]
+    if unit == 'M':
+        return amount * 30 * 86400
+    if unit not in TIMEFRAME_UNITS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return amount * TIMEFRAME_UNITS[unit]
+
+def candle_open(timestamp, timeframe):
+    """
+    Open time of the candle containing a timestamp.
+
+    Args:
+        timestamp (float): Unix time in seconds.
+        timeframe (str): Timeframe.
+
+    Returns:
+        int: Open time of the candle in seconds.
+    """
+    if timeframe[-1] == 'M':
+        moment = datetime.fromtimestamp(timestamp, timezone.utc)
+        months = moment.year * 12 + moment.month - 1
+        months -= months % int(timeframe[:-1])
+        return calendar.timegm((months // 12, months % 12 + 1, 1, 0, 0, 0))
+    duration = timeframe_to_seconds(timeframe)
+    offset = WEEK_OFFSET if timeframe[-1] == 'w' else 0
+    return int((timestamp - offset) // duration * duration + offset)
+
+def next_close(timeframe, now=None):
+    """
+    Close time of the candle that is currently open.
+
+    Args:
+        timeframe (str): Timeframe.
+        now (float): Unix time in seconds (default: current time).
+
+    Returns:
+        int: Next candle close in seconds.
+    """
+    now = time.time() if now is None else now
+    if timeframe[-1] == 'M':
+        opened = datetime.fromtimestamp(candle_open(now, timeframe), timezone.utc)
+        months = opened.year * 12 + opened.month - 1 + int(timeframe[:-1])
+        return calendar.timegm((months // 12, months % 12 + 1, 1, 0, 0, 0))
+    return candle_open(now, timeframe) + timeframe_to_seconds(timeframe)
+
+def seconds_until_close(timeframe, now=None):
+    """
+    Seconds until the current candle closes, at least 1 (usable as a cache TTL).
+
+    Args:
+        timeframe (str): Timeframe.
+        now (float): Unix time in seconds (default: current time).
+
+    Returns:
+        int: Seconds until the next close.
+    """
+    now = time.time() if now is None else now
+    return max(1, int(next_close(timeframe, now) - now + 0.999))
+
+def is_closed(opened, timeframe, now=None):
+    """
+    Whether the candle opened at a timestamp has closed.
+
+    Args:
+        opened (float): Open time of the candle in seconds.
+        timeframe (str): Timeframe.
+        now (float): Unix time in seconds (default: current time).
+
+    Returns:
+        bool: True once the candle's close time has passed.
+    """
+    now = time.time() if now is None else now
+    return next_close(timeframe, opened) <= now
+
+__all__ = ['timeframe_to_seconds', 'candle_open', 'next_close', 'seconds_until_close', 'is_closed']
@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import logging
+import time
+from candle_clock import next_close, timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+SETTLE_DELAY = 2.0  # Seconds after a close before dispatching, so exchanges have finalized the bar
+STAGGER_WINDOW = 30.0  # Seconds over which the dispatches of one close are spread
+
+class CandleScheduler:
+    """
+    Dispatch trading tasks at candle closes.
+
+    Subscriptions tie a user's symbols to a timeframe. The scheduler keeps a
+    heap of the next close of every subscribed timeframe, sleeps until the
+    earliest one and then dispatches only the subscriptions of the timeframes
+    that just closed, spreading them over stagger seconds so their exchange
+    requests do not all land at the same moment. The staggered sends run as
+    their own tasks, so the scheduler keeps serving other timeframes' closes
+    while one close is being spread out.
+    """
+
+    def __init__(self, queue_manager, settle=SETTLE_DELAY, stagger=STAGGER_WINDOW):
+        """
+        Initialize the scheduler.
+
+        Args:
+            queue_manager (QueueManager): Dispatcher of the user tasks.
+            settle (float): Seconds to wait after a close (default: SETTLE_DELAY).
+            stagger (float): Seconds to spread one close's dispatches over, capped at
+                half the candle duration (default: STAGGER_WINDOW).
+        """
+        self.queue_manager = queue_manager
+        self.settle = settle
+        self.stagger = stagger
+        self.subscriptions = {}  # timeframe -> {user: subscription}
+        self.heap = []  # (close time, timeframe)
+        self.last_close = {}  # (user, timeframe) -> last dispatched close
+        self.wakeup = asyncio.Event()
+        self.sending = set()  # Staggered dispatches still waiting for their turn
+
+    def subscribe(self, user, credentials, symbols, timeframe, limit):
+        """
+        Trade a user's symbols on every close of a timeframe.
+
+        Subscribing the same user and timeframe again replaces the symbols.
+
+        Args:
+            user: User ID.
+            credentials: User credentials (API keys).
+            symbols (list): Symbols to process (None for all available symbols).
+            timeframe (str): Timeframe whose closes trigger the task.
+            limit (int): Number of closed candles each task fetches.
+        """
+        timeframe_to_seconds(timeframe)  # Reject unsupported timeframes up front
+        if timeframe not in self.subscriptions:
+            self.subscriptions[timeframe] = {}
+            heapq.heappush(self.heap, (next_close(timeframe), timeframe))
+            self.wakeup.set()
+        self.subscriptions[timeframe][user] = {
+            "credentials": credentials,
+            "symbols": list(symbols) if symbols is not None else None,
+            "limit": limit
+        }
+        logger.info(f"Scheduled {len(symbols) if symbols is not None else 'all'} symbols of user {user} on {timeframe} closes")
+
+    def unsubscribe(self, user, timeframe=None):
+        """
+        Stop trading a user on one timeframe, or on all of them.
+
+        Args:
+            user: User ID.
+            timeframe (str): Timeframe (default: all).
+        """
+        for tf in ([timeframe] if timeframe else list(self.subscriptions)):
+            self.subscriptions.get(tf, {}).pop(user, None)
+            if tf in self.subscriptions and not self.subscriptions[tf]:
+                del self.subscriptions[tf]
+                self.heap = [entry for entry in self.heap if entry[1] != tf]
+                heapq.heapify(self.heap)
+
+    def due(self, now=None):
+        """
+        Pop the timeframes whose candle has closed and settled.
+
+        Args:
+            now (float): Unix time in seconds (default: current time).
+
+        Returns:
+            list: (close time, timeframe) pairs, the next close of each is scheduled.
+        """
+        now = time.time() if now is None else now
+        closed = []
+        while self.heap and self.heap[0][0] + self.settle <= now:
+            close, timeframe = heapq.heappop(self.heap)
+            closed.append((close, timeframe))
+            heapq.heappush(self.heap, (next_close(timeframe, close), timeframe))
+        return closed
+
+    def jobs(self, closed):
+        """
+        Tasks to dispatch for closed candles, one per user and timeframe.
+
+        A close that was already dispatched for a user is skipped, and when the
+        scheduler fell behind by several candles of a timeframe only the latest is used.
+
+        Args:
+            closed (list): (close time, timeframe) pairs from due().
+
+        Returns:
+            list: Dicts with the process_user arguments of each task.
+        """
+        latest = {}
+        for close, timeframe in closed:
+            latest[timeframe] = max(close, latest.get(timeframe, close))
+        jobs = []
+        for timeframe, close in latest.items():
+            duration = timeframe_to_seconds(timeframe)
+            for user, subscription in self.subscriptions.get(timeframe, {}).items():
+                if self.last_close.get((user, timeframe), 0) >= close:
+                    continue
+                self.last_close[(user, timeframe)] = close
+                jobs.append({
+                    "user": user,
+                    "credentials": subscription["credentials"],
+                    # The last `limit` closed candles, ending with the one that just closed
+                    "since": int((close - subscription["limit"] * duration) * 1000),
+                    "limit": subscription["limit"],
+                    "timeframe": timeframe,
+                    "symbol_batch": subscription["symbols"],
+                    "stagger": min(self.stagger, duration / 2)
+                })
+        return jobs
+
+    async def _send(self, job, delay):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await self.queue_manager.process_user(
+                job["user"], job["credentials"], job["since"], job["limit"], job["timeframe"], job["symbol_batch"]
+            )
+        except Exception as e:
+            logger.error(f"Failed to dispatch {job['timeframe']} task for user {job['user']}: {str(e)}")
+
+    async def dispatch(self, jobs):
+        """
+        Queue jobs, spread evenly over their stagger window, without waiting for them.
+
+        Args:
+            jobs (list): Jobs from jobs().
+
+        Returns:
+            list: One asyncio task per job, done once the job was handed to the queue manager.
+        """
+        tasks = []
+        for i, job in enumerate(jobs):
+            task = asyncio.create_task(self._send(job, i * job["stagger"] / len(jobs)))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+            tasks.append(task)
+        if jobs:
+            logger.info(f"Dispatching {len(jobs)} tasks over {max(job['stagger'] for job in jobs):.0f}s")
+        return tasks
+
+    async def run(self):
+        """Dispatch at every candle close until cancelled."""
+        logger.info(f"Candle scheduler started for timeframes {sorted(self.subscriptions)}")
+        try:
+            while True:
+                self.wakeup.clear()
+                jobs = self.jobs(self.due())
+                if jobs:
+                    await self.dispatch(jobs)
+                    continue
+                timeout = self.heap[0][0] + self.settle - time.time() if self.heap else None
+                try:
+                    # A new subscription can bring an earlier close, so it interrupts the sleep
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self.sending):
+                task.cancel()
+
+__all__ = ['CandleScheduler', 'SETTLE_DELAY', 'STAGGER_WINDOW']
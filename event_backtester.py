@@ -0,0 +1,382 @@
+import numpy as np
+import pandas as pd
+from logging_setup import logger_main
+from features import calculate_volatility
+
+ORDER_MARKET = 0
+ORDER_LIMIT = 1
+ORDER_STOP = 2
+ORDER_TYPES = {'market': ORDER_MARKET, 'limit': ORDER_LIMIT, 'stop': ORDER_STOP}
+
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+EXIT_SIGNAL = 0
+EXIT_STOP_LOSS = 1
+EXIT_TRAILING_STOP = 2
+EXIT_TAKE_PROFIT = 3
+
+class FeeSchedule:
+    """
+    Maker/taker fee rates applied to the notional of every fill.
+    """
+
+    def __init__(self, maker=0.001, taker=0.001):
+        """
+        Initialize the fee schedule.
+
+        Args:
+            maker (float): Fee rate for resting (limit, take-profit) fills (default: 0.001).
+            taker (float): Fee rate for market and stop fills (default: 0.001).
+        """
+        self.maker = maker
+        self.taker = taker
+
+    def rate(self, order_type):
+        """
+        Get the fee rate for an order type.
+
+        Args:
+            order_type (int): One of ORDER_MARKET, ORDER_LIMIT, ORDER_STOP.
+
+        Returns:
+            float: Fee rate.
+        """
+        return self.maker if order_type == ORDER_LIMIT else self.taker
+
+def signals_to_array(signals, length):
+    """
+    Convert strategy signals to an int8 array of 1 (buy), -1 (sell) and 0 (hold).
+
+    Args:
+        signals: Sequence, Series or array of 1/-1/0 or 'buy'/'sell'/'hold'.
+        length (int): Expected number of bars.
+
+    Returns:
+        np.ndarray: Signal array.
+    """
+    if isinstance(signals, pd.Series):
+        signals = signals.to_numpy()
+    signals = np.asarray(signals)
+    if len(signals) != length:
+        raise ValueError(f"Signals length {len(signals)} does not match data length {length}")
+    if signals.dtype.kind in ('U', 'S', 'O'):
+        out = np.zeros(length, dtype=np.int8)
+        out[signals == 'buy'] = 1
+        out[signals == 'sell'] = -1
+        return out
+    return np.sign(np.nan_to_num(signals.astype(np.float64))).astype(np.int8)
+
+class EventBacktester:
+    """
+    Event-driven backtester filling orders against candle high/low.
+
+    Orders are submitted at a bar close and become active on the next bar.
+    Market orders fill at the open, limit and stop orders fill when the bar
+    trades through their price (at the open if the bar gaps through). Open
+    positions are managed with the same exit rules as risk_manager: a fixed
+    or volatility-based stop-loss, a trailing stop and a take-profit. When a
+    stop and the take-profit are both inside one bar, the stop is assumed to
+    have been hit first.
+
+    Candles are converted to flat arrays once, and the order book, equity
+    curve and trade log are preallocated, so the per-bar loop does not build
+    any containers and the simulator can be reused for many parameter sets.
+    """
+
+    def __init__(self, data, fees=None, initial_balance=1000.0, max_orders=16):
+        """
+        Initialize the backtester.
+
+        Args:
+            data (pd.DataFrame): OHLCV data (columns: ['timestamp', 'open', 'high', 'low', 'close', 'volume']).
+            fees (FeeSchedule): Fee schedule (default: FeeSchedule()).
+            initial_balance (float): Starting quote balance (default: 1000.0).
+            max_orders (int): Capacity of the pending order book (default: 16).
+        """
+        self.fees = fees or FeeSchedule()
+        self.initial_balance = float(initial_balance)
+        self.max_orders = max_orders
+        self.length = len(data)
+
+        self.open = data['open'].to_numpy(dtype=np.float64)
+        self.high = data['high'].to_numpy(dtype=np.float64)
+        self.low = data['low'].to_numpy(dtype=np.float64)
+        self.close = data['close'].to_numpy(dtype=np.float64)
+        self.volatility = np.nan_to_num(calculate_volatility(data).to_numpy(dtype=np.float64))
+
+        # Python lists index faster than numpy arrays inside a scalar loop
+        self._open = self.open.tolist()
+        self._high = self.high.tolist()
+        self._low = self.low.tolist()
+        self._close = self.close.tolist()
+        self._volatility = self.volatility.tolist()
+
+        # Fixed-capacity order book, slots are reused after fill or expiry
+        self._order_active = [False] * max_orders
+        self._order_side = [0] * max_orders
+        self._order_type = [0] * max_orders
+        self._order_price = [0.0] * max_orders
+        self._order_expiry = [0] * max_orders
+
+        self.equity = np.empty(self.length, dtype=np.float64)
+        self._trade_entry_bar = np.empty(self.length, dtype=np.int64)
+        self._trade_exit_bar = np.empty(self.length, dtype=np.int64)
+        self._trade_entry_price = np.empty(self.length, dtype=np.float64)
+        self._trade_exit_price = np.empty(self.length, dtype=np.float64)
+        self._trade_pnl = np.empty(self.length, dtype=np.float64)
+        self._trade_reason = np.empty(self.length, dtype=np.int8)
+
+    def _reset_orders(self):
+        for slot in range(self.max_orders):
+            self._order_active[slot] = False
+        self._pending = 0
+
+    def _submit(self, side, order_type, price, expiry):
+        for slot in range(self.max_orders):
+            if not self._order_active[slot]:
+                self._order_active[slot] = True
+                self._order_side[slot] = side
+                self._order_type[slot] = order_type
+                self._order_price[slot] = price
+                self._order_expiry[slot] = expiry
+                self._pending += 1
+                return True
+        return False
+
+    def _cancel_side(self, side):
+        for slot in range(self.max_orders):
+            if self._order_active[slot] and self._order_side[slot] == side:
+                self._order_active[slot] = False
+                self._pending -= 1
+
+    def _record_trade(self, n, entry_bar, exit_bar, entry_price, exit_price, pnl, reason):
+        self._trade_entry_bar[n] = entry_bar
+        self._trade_exit_bar[n] = exit_bar
+        self._trade_entry_price[n] = entry_price
+        self._trade_exit_price[n] = exit_price
+        self._trade_pnl[n] = pnl
+        self._trade_reason[n] = reason
+
+    def run(self, signals, order_type='market', limit_offset=0.0, order_ttl=1, trade_fraction=1.0,
+            profit_target=None, stop_loss=None, trailing_percent=None):
+        """
+        Simulate a long-only strategy driven by per-bar signals.
+
+        Args:
+            signals: Per-bar signals (1/-1/0 or 'buy'/'sell'/'hold'), evaluated at bar close.
+            order_type (str): 'market', 'limit' or 'stop' for signal orders (default: 'market').
+            limit_offset (float): Distance of limit/stop prices from the signal close (default: 0.0).
+            order_ttl (int): Bars a limit/stop order stays active before cancellation (default: 1).
+            trade_fraction (float): Fraction of the balance used per entry (default: 1.0).
+            profit_target (float): Take-profit percentage, None to disable.
+            stop_loss (float): Stop-loss percentage, None for the volatility-based stop
+                of risk_manager.set_stop_loss, 0 to disable.
+            trailing_percent (float): Trailing stop percentage, None to disable.
+
+        Returns:
+            dict: Backtest results (final_balance, total_return, sharpe_ratio,
+                max_drawdown, trades, win_rate, fees_paid, equity, trade_log).
+        """
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Invalid order type: {order_type}")
+        kind = ORDER_TYPES[order_type]
+        sig = signals_to_array(signals, self.length).tolist()
+
+        o, h, l, c, vol = self._open, self._high, self._low, self._close, self._volatility
+        active, sides, types, prices, expiries = (
+            self._order_active, self._order_side, self._order_type, self._order_price, self._order_expiry
+        )
+        maker, taker = self.fees.maker, self.fees.taker
+        equity = self.equity
+        self._reset_orders()
+
+        cash = self.initial_balance
+        qty = 0.0
+        entry_price = 0.0
+        entry_cost = 0.0
+        entry_bar = 0
+        highest = 0.0
+        tp_price = 0.0
+        sl_price = 0.0
+        fees_paid = 0.0
+        n_trades = 0
+        wins = 0
+        use_tp = profit_target is not None and profit_target > 0
+        use_trailing = trailing_percent is not None and trailing_percent > 0
+
+        for i in range(self.length):
+            bar_open = o[i]
+            bar_high = h[i]
+            bar_low = l[i]
+
+            # 1. Pending orders against this bar's range
+            for slot in range(self.max_orders if self._pending else 0):
+                if not active[slot]:
+                    continue
+                side = sides[slot]
+                if i > expiries[slot] or (side == SIDE_BUY and qty > 0) or (side == SIDE_SELL and qty == 0):
+                    active[slot] = False
+                    self._pending -= 1
+                    continue
+                kind_ = types[slot]
+                price = prices[slot]
+                if kind_ == ORDER_MARKET:
+                    fill = bar_open
+                elif kind_ == ORDER_LIMIT:
+                    if side == SIDE_BUY:
+                        if bar_low > price:
+                            continue
+                        fill = bar_open if bar_open < price else price
+                    else:
+                        if bar_high < price:
+                            continue
+                        fill = bar_open if bar_open > price else price
+                else:
+                    if side == SIDE_BUY:
+                        if bar_high < price:
+                            continue
+                        fill = bar_open if bar_open > price else price
+                    else:
+                        if bar_low > price:
+                            continue
+                        fill = bar_open if bar_open < price else price
+                active[slot] = False
+                self._pending -= 1
+                fee_rate = maker if kind_ == ORDER_LIMIT else taker
+                if side == SIDE_BUY:
+                    entry_cost = cash * trade_fraction
+                    fee = entry_cost * fee_rate
+                    qty = (entry_cost - fee) / fill
+                    cash -= entry_cost
+                    fees_paid += fee
+                    entry_price = fill
+                    entry_bar = i
+                    highest = fill
+                    tp_price = fill * (1 + profit_target) if use_tp else 0.0
+                    if stop_loss is None:
+                        # Volatility known when the order was placed, bar i is not closed at the fill
+                        sl_price = fill * (1 - (0.02 + vol[i - 1] * 0.005))
+                    else:
+                        sl_price = fill * (1 - stop_loss) if stop_loss > 0 else 0.0
+                else:
+                    proceeds = qty * fill
+                    fee = proceeds * fee_rate
+                    cash += proceeds - fee
+                    fees_paid += fee
+                    pnl = proceeds - fee - entry_cost
+                    self._record_trade(n_trades, entry_bar, i, entry_price, fill, pnl, EXIT_SIGNAL)
+                    n_trades += 1
+                    if pnl > 0:
+                        wins += 1
+                    qty = 0.0
+
+            # 2. Exit rules; a limit/stop entry filled intrabar is only managed from the next bar
+            if qty > 0 and (entry_bar < i or bar_open == entry_price):
+                stop_level = sl_price
+                reason = EXIT_STOP_LOSS
+                if use_trailing:
+                    trail = highest * (1 - trailing_percent)
+                    if trail > stop_level:
+                        stop_level = trail
+                        reason = EXIT_TRAILING_STOP
+                exit_price = 0.0
+                fee_rate = taker
+                if stop_level > 0 and bar_low <= stop_level:
+                    exit_price = bar_open if bar_open < stop_level else stop_level
+                elif use_tp and bar_high >= tp_price:
+                    exit_price = bar_open if bar_open > tp_price else tp_price
+                    reason = EXIT_TAKE_PROFIT
+                    fee_rate = maker
+                if exit_price > 0:
+                    proceeds = qty * exit_price
+                    fee = proceeds * fee_rate
+                    cash += proceeds - fee
+                    fees_paid += fee
+                    pnl = proceeds - fee - entry_cost
+                    self._record_trade(n_trades, entry_bar, i, entry_price, exit_price, pnl, reason)
+                    n_trades += 1
+                    if pnl > 0:
+                        wins += 1
+                    qty = 0.0
+                    self._cancel_side(SIDE_SELL)
+                elif bar_high > highest:
+                    highest = bar_high
+
+            # 3. Mark to market at the close
+            close = c[i]
+            equity[i] = cash + qty * close
+
+            # 4. Signal at the close becomes an order for the next bar
+            s = sig[i]
+            if s == 1 and qty == 0:
+                self._cancel_side(SIDE_BUY)
+                if kind == ORDER_LIMIT:
+                    self._submit(SIDE_BUY, kind, close * (1 - limit_offset), i + order_ttl)
+                elif kind == ORDER_STOP:
+                    self._submit(SIDE_BUY, kind, close * (1 + limit_offset), i + order_ttl)
+                else:
+                    self._submit(SIDE_BUY, kind, close, i + 1)
+            elif s == -1 and qty > 0:
+                self._cancel_side(SIDE_SELL)
+                if kind == ORDER_LIMIT:
+                    self._submit(SIDE_SELL, kind, close * (1 + limit_offset), i + order_ttl)
+                elif kind == ORDER_STOP:
+                    self._submit(SIDE_SELL, kind, close * (1 - limit_offset), i + order_ttl)
+                else:
+                    self._submit(SIDE_SELL, kind, close, i + 1)
+
+        return self._results(n_trades, wins, fees_paid)
+
+    def _results(self, n_trades, wins, fees_paid):
+        if self.length == 0:
+            final_balance = self.initial_balance
+            sharpe_ratio = 0.0
+            max_drawdown = 0.0
+        else:
+            final_balance = float(self.equity[-1])
+            returns = np.diff(self.equity) / self.equity[:-1]
+            std = returns.std() if len(returns) > 1 else 0.0
+            sharpe_ratio = float(returns.mean() / std * (252 ** 0.5)) if std > 0 else 0.0
+            peak = np.maximum.accumulate(self.equity)
+            max_drawdown = float(((peak - self.equity) / peak).max())
+        trade_log = {
+            'entry_bar': self._trade_entry_bar[:n_trades].copy(),
+            'exit_bar': self._trade_exit_bar[:n_trades].copy(),
+            'entry_price': self._trade_entry_price[:n_trades].copy(),
+            'exit_price': self._trade_exit_price[:n_trades].copy(),
+            'pnl': self._trade_pnl[:n_trades].copy(),
+            'reason': self._trade_reason[:n_trades].copy()
+        }
+        return {
+            'final_balance': final_balance,
+            'total_return': final_balance / self.initial_balance - 1,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': max_drawdown,
+            'trades': n_trades,
+            'win_rate': wins / n_trades if n_trades else 0.0,
+            'fees_paid': fees_paid,
+            'equity': self.equity.copy(),
+            'trade_log': trade_log
+        }
+
+def run_event_backtest(data, signals, fees=None, initial_balance=1000.0, **kwargs):
+    """
+    Run a single event-driven backtest.
+
+    Args:
+        data (pd.DataFrame): OHLCV data.
+        signals: Per-bar signals (1/-1/0 or 'buy'/'sell'/'hold').
+        fees (FeeSchedule): Fee schedule (default: FeeSchedule()).
+        initial_balance (float): Starting quote balance (default: 1000.0).
+        **kwargs: Order and exit parameters passed to EventBacktester.run.
+
+    Returns:
+        dict: Backtest results.
+    """
+    backtester = EventBacktester(data, fees=fees, initial_balance=initial_balance)
+    results = backtester.run(signals, **kwargs)
+    logger_main.info(f"Event backtest completed: Final Balance: {results['final_balance']}, Trades: {results['trades']}")
+    return results
+
+__all__ = ['FeeSchedule', 'EventBacktester', 'run_event_backtest', 'signals_to_array']
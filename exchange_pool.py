@@ -1,3 +1,4 @@
+import asyncio
 import ccxt.async_support as ccxt
 import logging
 
@@ -6,6 +7,8 @@ logger = logging.getLogger(__name__)
 class ExchangePool:
     def __init__(self):
         self.exchanges = {}
+        self.clients = {}  # (exchange_id, api_key) -> exchange, reused by connect()
+        self.locks = {}
 
     async def add_exchange(self, exchange_id, api_key, api_secret):
         """
@@ -34,6 +37,28 @@ class ExchangePool:
             logger.error(f"Failed to add exchange {exchange_id}: {str(e)}")
             raise
 
+    async def connect(self, exchange_id, api_key, api_secret):
+        """
+        Get the pooled exchange for a set of credentials, creating it on first use.
+
+        Concurrent calls for the same credentials share one instance, so its
+        markets are loaded once and its HTTP session stays open between calls.
+
+        Args:
+            exchange_id: ID of the exchange (e.g., 'binance').
+            api_key: API key for the exchange.
+            api_secret: API secret for the exchange.
+
+        Returns:
+            Exchange instance.
+        """
+        key = (exchange_id, api_key)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self.clients:
+                self.clients[key] = await self.add_exchange(exchange_id, api_key, api_secret)
+            return self.clients[key]
+
     async def get_exchange(self, exchange_id):
         """
         Get an exchange from the pool.
@@ -52,7 +77,11 @@ class ExchangePool:
         """
         Close all exchanges in the pool.
         """
-        for exchange_id, exchange in self.exchanges.items():
+        exchanges = {id(exchange): (exchange_id, exchange) for exchange_id, exchange in self.exchanges.items()}
+        exchanges.update({id(exchange): (key[0], exchange) for key, exchange in self.clients.items()})
+        for exchange_id, exchange in exchanges.values():
             await exchange.close()
             logger.info(f"Closed exchange {exchange_id}")
         self.exchanges.clear()
+        self.clients.clear()
+        self.locks.clear()
@@ -0,0 +1,353 @@
+import contextlib
+import fcntl
+import json
+import os
+import numpy as np
+import pandas as pd
+from logging_setup import logger_main
+from candle_clock import next_close, timeframe_to_seconds
+from features import calculate_volatility, calculate_sma, calculate_rsi
+
+SCHEMA_VERSION = 1  # Bump whenever features.extract_features changes, stored features are then recomputed
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+FEATURE_COLUMNS = ['returns', 'volatility', 'sma_20', 'sma_50', 'rsi', 'macd', 'macd_signal']
+COLUMNS = OHLCV_COLUMNS + FEATURE_COLUMNS
+WARMUP = 50  # Closes kept between appends, enough for the longest rolling window (sma_50)
+EWM_SPANS = {'ema_12': 12, 'ema_26': 26, 'macd_signal': 9}
+
+def _timestamps_ms(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ms]')
+    return values.astype(np.int64)
+
+def _ewm(values, span, previous=None):
+    # Continues an adjust=False EWM from its last value by prepending it to the new inputs
+    series = pd.Series(values if previous is None else np.concatenate(([previous], values)))
+    result = series.ewm(span=span, adjust=False).mean().to_numpy()
+    return result if previous is None else result[1:]
+
+def compute_features(closes, state=None):
+    """
+    Compute the feature columns of new candles, continuing from a saved state.
+
+    Produces the same values as features.extract_features on the full history.
+
+    Args:
+        closes (np.ndarray): Closing prices of the new candles.
+        state (dict): State returned by the previous call (None for the first candles).
+
+    Returns:
+        tuple: (features, state) - array of shape (n, len(FEATURE_COLUMNS)) with NaN
+            during warm-up, and the state to pass with the next candles.
+    """
+    state = state or {}
+    history = np.asarray(state.get('closes', []), dtype=np.float64)
+    frame = pd.DataFrame({'close': np.concatenate((history, closes))})
+    new = slice(len(history), None)
+    ema_12 = _ewm(closes, EWM_SPANS['ema_12'], state.get('ema_12'))
+    ema_26 = _ewm(closes, EWM_SPANS['ema_26'], state.get('ema_26'))
+    macd = ema_12 - ema_26
+    macd_signal = _ewm(macd, EWM_SPANS['macd_signal'], state.get('macd_signal'))
+    features = np.column_stack([
+        frame['close'].pct_change().to_numpy()[new],
+        calculate_volatility(frame).to_numpy()[new],
+        calculate_sma(frame, window=20).to_numpy()[new],
+        calculate_sma(frame, window=50).to_numpy()[new],
+        calculate_rsi(frame).to_numpy()[new],
+        macd,
+        macd_signal
+    ])
+    state = {
+        'closes': frame['close'].to_numpy()[-WARMUP:].tolist(),
+        'ema_12': float(ema_12[-1]),
+        'ema_26': float(ema_26[-1]),
+        'macd_signal': float(macd_signal[-1])
+    }
+    return features, state
+
+def _gaps(timestamps, timeframe, previous=None):
+    # Positions of candles that do not open where the candle before them closed
+    before = np.concatenate(([timestamps[0] if previous is None else previous], timestamps[:-1]))
+    if timeframe[-1] == 'M':
+        expected = np.array([next_close(timeframe, t / 1000) * 1000 for t in before], dtype=np.int64)
+    else:
+        expected = before + timeframe_to_seconds(timeframe) * 1000
+    gaps = np.flatnonzero(timestamps != expected)
+    return gaps if previous is not None else gaps[gaps > 0]
+
+class FeatureStore:
+    """
+    Incrementally materialized features per (symbol, timeframe) of one exchange.
+
+    Each series is a directory with two append-only binary files, read back
+    as memory maps: timestamps.i8 (int64 milliseconds) and rows.f8 (float64,
+    one row of COLUMNS per candle). meta.json holds the schema version, the
+    committed row count and the rolling/EWM state needed to extend the
+    features, and is replaced atomically after each append, so readers never
+    see a partial row. Writers of a series hold an exclusive flock on its
+    .lock file, so worker processes appending the same series take turns.
+    Rows are kept during warm-up (with NaN features) so a schema change can
+    be recomputed from the stored candles. Rolling and EWM state never spans
+    a gap in the candles (a symbol that left the universe for a while, a
+    worker that was down): the candles after it start a new warm-up.
+    """
+
+    def __init__(self, path='feature_store'):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): Directory holding the series of one exchange (default: 'feature_store').
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.path, symbol.replace('/', '_'), timeframe)
+
+    @contextlib.contextmanager
+    def _locked(self, symbol, timeframe):
+        directory = self._dir(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_meta(self, symbol, timeframe, meta):
+        path = os.path.join(self._dir(symbol, timeframe), 'meta.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _read_meta(self, symbol, timeframe):
+        try:
+            with open(os.path.join(self._dir(symbol, timeframe), 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _outdated(meta):
+        return meta['schema_version'] != SCHEMA_VERSION or meta['columns'] != COLUMNS
+
+    def meta(self, symbol, timeframe):
+        """
+        Read the metadata of a series, recomputing it first if its schema is outdated.
+
+        Returns:
+            dict: Metadata ('schema_version', 'columns', 'rows', 'last_timestamp', 'state'),
+                or None if nothing was stored yet.
+        """
+        meta = self._read_meta(symbol, timeframe)
+        if meta is not None and self._outdated(meta):
+            return self.rebuild(symbol, timeframe)
+        return meta
+
+    def _arrays(self, symbol, timeframe, meta, ncols=None):
+        rows = meta['rows']
+        ncols = ncols or len(meta['columns'])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, ncols))
+        directory = self._dir(symbol, timeframe)
+        timestamps = np.memmap(os.path.join(directory, 'timestamps.i8'), dtype=np.int64, mode='r', shape=(rows,))
+        values = np.memmap(os.path.join(directory, 'rows.f8'), dtype=np.float64, mode='r', shape=(rows, ncols))
+        return timestamps, values
+
+    def arrays(self, symbol, timeframe):
+        """
+        Memory-mapped arrays of a series, for out-of-core readers.
+
+        Returns:
+            tuple: (timestamps, values) - int64 milliseconds of shape (rows,) and float64
+                rows of COLUMNS of shape (rows, len(COLUMNS)); empty arrays if nothing is stored.
+        """
+        meta = self.meta(symbol, timeframe)
+        if meta is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+        return self._arrays(symbol, timeframe, meta)
+
+    def _features(self, symbol, timeframe, timestamps, closes, state=None, previous=None):
+        gaps = _gaps(timestamps, timeframe, previous)
+        bounds = sorted({0, len(timestamps), *gaps.tolist()})
+        features = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if start in gaps:
+                logger_main.warning(f"Gap in {symbol} {timeframe} candles before {int(timestamps[start])}, "
+                                    f"restarting feature warm-up")
+                state = None
+            part, state = compute_features(closes[start:stop], state)
+            features.append(part)
+        return np.vstack(features), state
+
+    def _write_rows(self, symbol, timeframe, meta, timestamps, rows, state):
+        directory = self._dir(symbol, timeframe)
+        for name, array in (('timestamps.i8', timestamps.astype(np.int64)), ('rows.f8', rows.astype(np.float64))):
+            with open(os.path.join(directory, name), 'r+b' if os.path.exists(os.path.join(directory, name)) else 'wb') as f:
+                # Overwrite anything past the committed rows left by an interrupted append
+                f.seek(meta['rows'] * array[0].nbytes)
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.truncate()
+        meta = dict(meta, rows=meta['rows'] + len(timestamps), last_timestamp=int(timestamps[-1]), state=state)
+        self._write_meta(symbol, timeframe, meta)
+        return meta
+
+    def append(self, symbol, timeframe, candles, include_last=True):
+        """
+        Append the candles newer than the stored ones and compute their features.
+
+        Args:
+            symbol (str): Trading symbol.
+            timeframe (str): Timeframe of the candles.
+            candles (pd.DataFrame): OHLCV data (columns: ['timestamp', 'open', 'high', 'low', 'close', 'volume']),
+                timestamps in milliseconds or datetime, oldest first.
+            include_last (bool): Store the last candle too; pass False for fetch_ohlcv output,
+                whose last candle is still open (default: True).
+
+        Returns:
+            int: Number of rows appended.
+        """
+        if not include_last:
+            candles = candles.iloc[:-1]
+        timestamps = _timestamps_ms(candles['timestamp'])
+        with self._locked(symbol, timeframe):
+            meta = self._read_meta(symbol, timeframe)
+            if meta is None:
+                meta = {'schema_version': SCHEMA_VERSION, 'columns': COLUMNS, 'rows': 0, 'last_timestamp': None, 'state': None}
+            elif self._outdated(meta):
+                meta = self._rebuild(symbol, timeframe, meta)
+            new = timestamps > meta['last_timestamp'] if meta['last_timestamp'] is not None else np.ones(len(timestamps), bool)
+            if not new.any():
+                return 0
+            ohlcv = candles[OHLCV_COLUMNS].to_numpy(dtype=np.float64)[new]
+            features, state = self._features(
+                symbol, timeframe, timestamps[new], ohlcv[:, OHLCV_COLUMNS.index('close')], meta['state'], meta['last_timestamp']
+            )
+            self._write_rows(symbol, timeframe, meta, timestamps[new], np.hstack((ohlcv, features)), state)
+        logger_main.debug(f"Appended {int(new.sum())} feature rows for {symbol} {timeframe}")
+        return int(new.sum())
+
+    def rebuild(self, symbol, timeframe):
+        """
+        Recompute all features of a series from its stored candles (e.g. after a schema change).
+
+        Returns:
+            dict: The new metadata (None if nothing was stored yet).
+        """
+        with self._locked(symbol, timeframe):
+            meta = self._read_meta(symbol, timeframe)
+            if meta is None or not self._outdated(meta):
+                # Another process may have rebuilt the series while we waited for the lock
+                return meta
+            return self._rebuild(symbol, timeframe, meta)
+
+    def _rebuild(self, symbol, timeframe, meta):
+        old_columns = meta['columns']
+        timestamps, values = self._arrays(symbol, timeframe, meta, len(old_columns))
+        ohlcv = np.array(values[:, [old_columns.index(c) for c in OHLCV_COLUMNS]])
+        timestamps = np.array(timestamps)
+        fresh = {'schema_version': SCHEMA_VERSION, 'columns': COLUMNS, 'rows': 0, 'last_timestamp': None, 'state': None}
+        if not len(timestamps):
+            self._write_meta(symbol, timeframe, fresh)
+            return fresh
+        features, state = self._features(symbol, timeframe, timestamps, ohlcv[:, OHLCV_COLUMNS.index('close')])
+        logger_main.info(f"Recomputing {len(timestamps)} feature rows of {symbol} {timeframe} for schema {SCHEMA_VERSION}")
+        return self._write_rows(symbol, timeframe, fresh, timestamps, np.hstack((ohlcv, features)), state)
+
+    def read_range(self, symbol, timeframe, start=None, end=None, columns=None, dropna=True):
+        """
+        Bulk read of a time range, e.g. for training.
+
+        Args:
+            symbol (str): Trading symbol.
+            timeframe (str): Timeframe.
+            start (int): First timestamp in milliseconds, inclusive (optional).
+            end (int): Last timestamp in milliseconds, inclusive (optional).
+            columns (list): Columns to read (default: all of COLUMNS).
+            dropna (bool): Drop warm-up rows with missing features, like extract_features (default: True).
+
+        Returns:
+            pd.DataFrame: 'timestamp' (milliseconds) followed by the requested columns.
+        """
+        columns = columns or COLUMNS
+        meta = self.meta(symbol, timeframe)
+        if meta is None:
+            return pd.DataFrame(columns=['timestamp'] + columns)
+        timestamps, values = self._arrays(symbol, timeframe, meta)
+        first = np.searchsorted(timestamps, start, side='left') if start is not None else 0
+        last = np.searchsorted(timestamps, end, side='right') if end is not None else len(timestamps)
+        data = pd.DataFrame(np.array(values[first:last, [COLUMNS.index(c) for c in columns]]), columns=columns)
+        data.insert(0, 'timestamp', np.array(timestamps[first:last]))
+        if dropna:
+            complete = ~np.isnan(values[first:last, len(OHLCV_COLUMNS):]).any(axis=1)
+            data = data[complete].reset_index(drop=True)
+        return data
+
+    def read_at(self, symbol, timeframe, at=None, columns=None):
+        """
+        Point-in-time read: the features of the last candle at or before a timestamp.
+
+        Args:
+            symbol (str): Trading symbol.
+            timeframe (str): Timeframe.
+            at (int): Timestamp in milliseconds (default: latest candle).
+            columns (list): Columns to read (default: all of COLUMNS).
+
+        Returns:
+            pd.Series: Values by column plus 'timestamp', or None if no complete row exists.
+        """
+        columns = columns or COLUMNS
+        meta = self.meta(symbol, timeframe)
+        if meta is None or not meta['rows']:
+            return None
+        timestamps, values = self._arrays(symbol, timeframe, meta)
+        row = np.searchsorted(timestamps, at, side='right') - 1 if at is not None else len(timestamps) - 1
+        if row < 0 or np.isnan(values[row, len(OHLCV_COLUMNS):]).any():
+            return None
+        series = pd.Series(np.array(values[row, [COLUMNS.index(c) for c in columns]]), index=columns)
+        series['timestamp'] = int(timestamps[row])
+        return series
+
+    def latest_rows(self, symbols, timeframe, columns):
+        """
+        Latest complete feature row of many symbols, e.g. for batched inference.
+
+        Args:
+            symbols (list): Trading symbols.
+            timeframe (str): Timeframe.
+            columns (list): Feature columns.
+
+        Returns:
+            dict: Symbol -> array of shape (1, len(columns)), without symbols lacking a complete row.
+        """
+        rows = {}
+        for symbol in symbols:
+            row = self.read_at(symbol, timeframe, columns=columns)
+            if row is not None:
+                rows[symbol] = row[columns].to_numpy(dtype=np.float64).reshape(1, -1)
+        return rows
+
+_shared_stores = {}
+
+def get_feature_store(exchange_id):
+    """
+    Get the process-wide FeatureStore of an exchange.
+
+    Series of different exchanges live in separate subdirectories of
+    FEATURE_STORE_DIR, so the same symbol traded on two exchanges is never mixed.
+
+    Args:
+        exchange_id (str): Exchange the candles come from.
+
+    Returns:
+        FeatureStore: Shared store instance.
+    """
+    if exchange_id not in _shared_stores:
+        _shared_stores[exchange_id] = FeatureStore(os.path.join(os.getenv("FEATURE_STORE_DIR", "feature_store"), exchange_id))
+    return _shared_stores[exchange_id]
+
+__all__ = ['FeatureStore', 'get_feature_store', 'compute_features', 'FEATURE_COLUMNS', 'COLUMNS', 'SCHEMA_VERSION']
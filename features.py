@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
 
 def calculate_volatility(df, window=20):
     """
@@ -92,6 +91,8 @@ def normalize_data(df, columns=None):
     Returns:
         DataFrame: DataFrame with normalized columns.
     """
+    from sklearn.preprocessing import MinMaxScaler
+
     df = df.copy()
     
     # If columns are not specified, select all numeric columns
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import numpy as np
+import pandas as pd
+from redis_pool import get_redis, pipeline
+
+logger = logging.getLogger("main")
+
+def data_fingerprint(data):
+    """
+    Fingerprint the candles a fitness value was computed on.
+
+    A slice is identified by its last candle (timestamp and close) and its
+    length. That stays the same when newer candles are appended, so re-runs
+    over the same slice hit the cache, while a still-open last candle whose
+    close moved gets a new fingerprint.
+
+    Args:
+        data: OHLCV DataFrame, or a list of ccxt candles (lists or dicts).
+
+    Returns:
+        str: '<last timestamp in ms>:<last close>:<number of candles>'.
+    """
+    if not len(data):
+        return "0:0:0"
+    if isinstance(data, pd.DataFrame):
+        timestamps = data['timestamp'].to_numpy()
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            timestamps = timestamps.astype('datetime64[ms]')
+        end, close = timestamps[-1], data['close'].iloc[-1]
+    elif isinstance(data[0], dict):
+        end, close = data[-1]['timestamp'], data[-1]['close']
+    else:
+        end, close = data[-1][0], data[-1][4]
+    return f"{int(np.int64(end))}:{float(close)!r}:{len(data)}"
+
+def params_key(params):
+    """Stable string key for a parameter vector or a strategy definition."""
+    if isinstance(params, (list, tuple)):
+        return ",".join(f"{value:.6g}" if isinstance(value, float) else str(value) for value in params)
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+def settings_key(signals=None, fees=None):
+    """
+    Short hash of the backtest settings scores depend on besides the candles and parameters.
+
+    Args:
+        signals: Custom entry signals (None for the optimizer's default signals).
+        fees: Fee schedule with maker and taker rates (None for the default schedule).
+
+    Returns:
+        str: 12 hex characters.
+    """
+    digest = hashlib.sha1()
+    digest.update(b"default" if signals is None else np.ascontiguousarray(signals, dtype=np.float64).tobytes())
+    digest.update(b"default" if fees is None else f"{float(fees.maker)!r}:{float(fees.taker)!r}".encode())
+    return digest.hexdigest()[:12]
+
+class FitnessCache:
+    """
+    Persistent optimizer fitness cache in Redis.
+
+    Scores live in one hash per (symbol, timeframe, strategy type, data
+    fingerprint), with fields keyed by quantized parameters, so a re-run on an
+    unchanged slice re-scores nothing. Each hash expires on its own, so the
+    scores of slices that are no longer evaluated age out. Scores computed
+    with other signals or fees live under their own settings key. The best
+    parameters of the latest run are kept alongside to warm-start the next
+    search.
+    """
+
+    def __init__(self, symbol, timeframe, strategy_type, ttl=86400 * 30, settings=None):
+        """
+        Initialize the cache.
+
+        Args:
+            symbol (str): Trading symbol.
+            timeframe (str): Timeframe of the candles.
+            strategy_type (str): Strategy being optimized.
+            ttl (int): Expiry of the scores of a slice after its last write, in seconds (default: 30 days).
+            settings (str): Backtest settings the scores depend on, from settings_key (optional).
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.strategy_type = strategy_type
+        self.settings = settings
+        self.scores_prefix = f"fitness:{symbol}:{timeframe}:{strategy_type}"
+        if settings is not None:
+            self.scores_prefix += f":{settings}"
+        self.best_key = f"best_params:{symbol}:{timeframe}:{strategy_type}"
+        self.ttl = ttl
+
+    def with_settings(self, signals=None, fees=None):
+        """
+        Get a cache of the same strategy whose scores are kept apart per signals and fees.
+
+        The best parameters stay shared, they only seed the next search.
+
+        Args:
+            signals: Custom entry signals (None for the default signals).
+            fees: Fee schedule (None for the default schedule).
+
+        Returns:
+            FitnessCache: Cache scoped to the settings.
+        """
+        return FitnessCache(self.symbol, self.timeframe, self.strategy_type, self.ttl, settings_key(signals, fees))
+
+    def scores_key(self, fingerprint):
+        """Redis hash holding the scores of one data slice."""
+        return f"{self.scores_prefix}:{fingerprint}"
+
+    async def get_many(self, fingerprint, keys):
+        """
+        Look up cached scores.
+
+        Args:
+            fingerprint (str): Fingerprint of the candles evaluated.
+            keys (list): Parameter keys (see params_key).
+
+        Returns:
+            dict: Parameter key -> score for the cache hits.
+        """
+        if not keys:
+            return {}
+        redis_client = get_redis()
+        scores_key = self.scores_key(fingerprint)
+        try:
+            values = await redis_client.hmget(scores_key, keys)
+            return {key: float(value) for key, value in zip(keys, values) if value is not None}
+        except Exception as e:
+            logger.error(f"Failed to read fitness cache {scores_key}: {type(e).__name__}: {str(e)}")
+            return {}
+
+    async def set_many(self, fingerprint, scores):
+        """
+        Store scores.
+
+        Args:
+            fingerprint (str): Fingerprint of the candles evaluated.
+            scores (dict): Parameter key -> score.
+        """
+        if not scores:
+            return
+        scores_key = self.scores_key(fingerprint)
+        try:
+            pipe = pipeline()
+            pipe.hset(scores_key, mapping={key: float(score) for key, score in scores.items()})
+            pipe.expire(scores_key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to write fitness cache {scores_key}: {type(e).__name__}: {str(e)}")
+
+    async def get_best(self):
+        """
+        Get the best parameters of the previous run.
+
+        Returns:
+            list: Previous best parameter sets, best first (empty if none).
+        """
+        redis_client = get_redis()
+        try:
+            best = await redis_client.get(self.best_key)
+            return json.loads(best.decode()) if best else []
+        except Exception as e:
+            logger.error(f"Failed to read best parameters {self.best_key}: {type(e).__name__}: {str(e)}")
+            return []
+
+    async def set_best(self, params_list):
+        """
+        Store the best parameters of this run for the next warm start.
+
+        Args:
+            params_list (list): Parameter sets, best first.
+        """
+        redis_client = get_redis()
+        try:
+            await redis_client.set(self.best_key, json.dumps(params_list), ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Failed to write best parameters {self.best_key}: {type(e).__name__}: {str(e)}")
+
+__all__ = ['FitnessCache', 'data_fingerprint', 'params_key', 'settings_key']
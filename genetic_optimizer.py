@@ -1,15 +1,63 @@
-from deap import base, creator, tools, algorithms
 import random
-from backtest_cycle import run_backtest_cycle
-import ccxt.async_support as ccxt
 import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from logging_setup import logger_main
+from event_backtester import EventBacktester, FeeSchedule
+from successive_halving import successive_halving
+from fitness_cache import data_fingerprint, params_key
+
+PARAM_NAMES = ['profit_target', 'stop_loss', 'trailing_percent']
+PARAM_RANGES = [(0.01, 0.1), (0.01, 0.05), (0.005, 0.02)]
+PARAM_STEP = 0.0001  # Individuals closer than this share one fitness evaluation
+WARM_START_SIZE = 5  # Best parameter sets kept for the next run
+
+# Per-process candles and backtesters by history length, set up once by the pool initializer
+_worker_data = None
+_worker_signals = None
+_worker_fees = None
+_worker_backtesters = {}
+
+def _init_worker(data, signals, fees):
+    global _worker_data, _worker_signals, _worker_fees
+    _worker_data = data
+    _worker_signals = signals
+    _worker_fees = fees
+    _worker_backtesters.clear()
+
+def _evaluate_params(params, length):
+    if length not in _worker_backtesters:
+        _worker_backtesters[length] = EventBacktester(_worker_data.iloc[-length:], fees=_worker_fees)
+    profit_target, stop_loss, trailing_percent = params
+    result = _worker_backtesters[length].run(
+        _worker_signals[-length:], profit_target=profit_target, stop_loss=stop_loss, trailing_percent=trailing_percent
+    )
+    return result['final_balance'] / _worker_backtesters[length].initial_balance
+
+def default_signals(data, fast=10, slow=50):
+    """
+    Per-bar SMA crossover signals used as entries while exit parameters are optimized.
+
+    Args:
+        data (pd.DataFrame): OHLCV data.
+        fast (int): Fast SMA window (default: 10).
+        slow (int): Slow SMA window (default: 50).
+
+    Returns:
+        np.ndarray: Signals (1 buy, -1 sell, 0 hold).
+    """
+    trend = np.sign(data['close'].rolling(window=fast).mean() - data['close'].rolling(window=slow).mean())
+    return trend.diff().fillna(0).clip(-1, 1).to_numpy()
 
 class GeneticOptimizer:
     """
     Optimize parameters using genetic algorithms with backtesting.
     """
 
-    def __init__(self, exchange, symbol, timeframe, since, limit):
+    def __init__(self, exchange, symbol, timeframe, since, limit, data=None, signals=None, fees=None, max_workers=None,
+                 cache=None):
         """
         Initialize the genetic optimizer.
 
@@ -19,29 +67,152 @@ class GeneticOptimizer:
             timeframe (str): Timeframe for OHLCV data.
             since (int): Timestamp to fetch from (in milliseconds).
             limit (int): Number of candles to fetch.
+            data (pd.DataFrame): Preloaded OHLCV data, fetched once from the exchange if None.
+            signals: Entry signals for the data (default: default_signals(data)).
+            fees (FeeSchedule): Fee schedule for the backtests (default: FeeSchedule()).
+            max_workers (int): Worker processes for fitness evaluation, 0 to evaluate
+                in-process (default: os.cpu_count()).
+            cache (FitnessCache): Persistent fitness cache shared across runs; its scores are
+                kept apart per custom signals and fees (optional).
         """
         self.exchange = exchange
         self.symbol = symbol
         self.timeframe = timeframe
         self.since = since
         self.limit = limit
+        self.data = data
+        self.signals = signals
+        self.fees = fees
+        self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        # Default signals follow from the candles, which the data fingerprint already covers
+        self.cache = cache.with_settings(signals, fees or FeeSchedule()) if cache is not None else None
+        self.fitness_cache = {}
+        self.evaluations = 0
+        self._backtesters = {}
+        self._fingerprints = {}
+
+    async def load_data(self):
+        """
+        Fetch candles once per optimizer and prepare the entry signals.
+
+        Returns:
+            pd.DataFrame: OHLCV data.
+        """
+        if self.data is None:
+            ohlcv = await self.exchange.fetch_ohlcv(self.symbol, self.timeframe, since=self.since, limit=self.limit)
+            self.data = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            logger_main.info(f"Loaded {len(self.data)} candles for {self.symbol} to optimize")
+        if self.signals is None:
+            self.signals = np.asarray(default_signals(self.data))
+        return self.data
+
+    @staticmethod
+    def quantize(individual):
+        """
+        Clip parameters to their ranges and snap them to the PARAM_STEP grid.
+
+        Args:
+            individual (list): Parameters (profit_target, stop_loss, trailing_percent).
+
+        Returns:
+            tuple: Quantized parameters, usable as a cache key.
+        """
+        return tuple(
+            round(round(min(max(value, low), high) / PARAM_STEP) * PARAM_STEP, 10)
+            for value, (low, high) in zip(individual, PARAM_RANGES)
+        )
 
-    async def evaluate(self, individual):
+    async def evaluate(self, individual, length=None):
         """
         Evaluate the fitness of parameters using backtesting.
 
         Args:
             individual (list): Parameters to evaluate (profit_target, stop_loss, trailing_percent).
+            length (int): Backtest only the most recent `length` candles (default: full history).
 
         Returns:
-            tuple: Fitness value (final balance).
+            tuple: Fitness value (final balance relative to the initial balance).
         """
-        profit_target, stop_loss, trailing_percent = individual
-        result = await run_backtest_cycle(
-            self.exchange, self.symbol, self.timeframe, self.since, self.limit,
-            profit_target=profit_target, stop_loss=stop_loss
+        await self.load_data()
+        length = min(length or len(self.data), len(self.data))
+        key = (length, self.quantize(individual))
+        if key not in self.fitness_cache:
+            if length not in self._backtesters:
+                self._backtesters[length] = EventBacktester(self.data.iloc[-length:], fees=self.fees)
+            backtester = self._backtesters[length]
+            profit_target, stop_loss, trailing_percent = key[1]
+            result = backtester.run(
+                self.signals[-length:], profit_target=profit_target, stop_loss=stop_loss, trailing_percent=trailing_percent
+            )
+            self.fitness_cache[key] = result['final_balance'] / backtester.initial_balance
+            self.evaluations += 1
+        return (self.fitness_cache[key],)
+
+    async def evaluate_population(self, individuals, executor=None, length=None):
+        """
+        Assign fitness to individuals, backtesting each distinct parameter vector once.
+
+        Args:
+            individuals (list): Individuals without valid fitness.
+            executor (ProcessPoolExecutor): Pool for CPU-bound backtests (in-process if None).
+            length (int): Backtest only the most recent `length` candles (default: full history).
+
+        Returns:
+            list: Fitness value of each individual.
+        """
+        await self.load_data()
+        length = min(length or len(self.data), len(self.data))
+        keys = [(length, self.quantize(ind)) for ind in individuals]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.fitness_cache))
+        if missing and self.cache is not None:
+            if length not in self._fingerprints:
+                self._fingerprints[length] = data_fingerprint(self.data.iloc[-length:])
+            hits = await self.cache.get_many(self._fingerprints[length], [params_key(params) for _, params in missing])
+            for key in missing:
+                if params_key(key[1]) in hits:
+                    self.fitness_cache[key] = hits[params_key(key[1])]
+            missing = [key for key in missing if key not in self.fitness_cache]
+        if missing:
+            if executor is None:
+                for key in missing:
+                    await self.evaluate(key[1], length)
+            else:
+                loop = asyncio.get_running_loop()
+                fits = await asyncio.gather(*[
+                    loop.run_in_executor(executor, _evaluate_params, params, length) for _, params in missing
+                ])
+                self.fitness_cache.update(zip(missing, fits))
+                self.evaluations += len(missing)
+            if self.cache is not None:
+                await self.cache.set_many(
+                    self._fingerprints[length], {params_key(key[1]): self.fitness_cache[key] for key in missing}
+                )
+        for ind, key in zip(individuals, keys):
+            if hasattr(ind, 'fitness'):
+                ind[:] = key[1]
+                ind.fitness.values = (self.fitness_cache[key],)
+        return [self.fitness_cache[key] for key in keys]
+
+    async def _warm_start(self):
+        if self.cache is None:
+            return []
+        seeds = [self.quantize(params) for params in await self.cache.get_best()]
+        if seeds:
+            logger_main.info(f"Warm-starting {self.symbol} optimization from {len(seeds)} previous best parameter sets")
+        return seeds
+
+    async def _save_best(self, ranked):
+        if self.cache is None:
+            return
+        best = list(dict.fromkeys(self.quantize(params) for params in ranked))[:WARM_START_SIZE]
+        await self.cache.set_best([list(params) for params in best])
+
+    def _executor(self):
+        if not self.max_workers:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker, initargs=(self.data, self.signals, self.fees)
         )
-        return (result['final_balance'],)
 
     async def optimize(self, generations=10, population_size=50):
         """
@@ -54,31 +225,88 @@ class GeneticOptimizer:
         Returns:
             dict: Best parameters.
         """
-        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMax)
+        from deap import base, creator, tools, algorithms
+
+        if not hasattr(creator, "FitnessMax"):
+            creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+        if not hasattr(creator, "Individual"):
+            creator.create("Individual", list, fitness=creator.FitnessMax)
+        await self.load_data()
 
         toolbox = base.Toolbox()
-        param_ranges = [(0.01, 0.1), (0.01, 0.05), (0.005, 0.02)]  # profit_target, stop_loss, trailing_percent
-        for i, (min_val, max_val) in enumerate(param_ranges):
+        for i, (min_val, max_val) in enumerate(PARAM_RANGES):
             toolbox.register(f"attr_float_{i}", random.uniform, min_val, max_val)
         toolbox.register("individual", tools.initCycle, creator.Individual,
-                        [toolbox.__getattribute__(f"attr_float_{i}") for i in range(len(param_ranges))], n=1)
+                        [toolbox.__getattribute__(f"attr_float_{i}") for i in range(len(PARAM_RANGES))], n=1)
         toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-        toolbox.register("evaluate", self.evaluate)
         toolbox.register("mate", tools.cxTwoPoint)
-        toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
+        # Mutation step scaled to each parameter's range, results are clipped by quantize()
+        toolbox.register("mutate", tools.mutGaussian, mu=0,
+                         sigma=[(max_val - min_val) * 0.1 for min_val, max_val in PARAM_RANGES], indpb=0.2)
         toolbox.register("select", tools.selTournament, tournsize=3)
 
-        population = toolbox.population(n=population_size)
-        for gen in range(generations):
-            offspring = algorithms.varAnd(population, toolbox, cxpb=0.5, mutpb=0.2)
-            fits = await asyncio.gather(*[toolbox.evaluate(ind) for ind in offspring])
-            for fit, ind in zip(fits, offspring):
-                ind.fitness.values = fit
-            population = toolbox.select(offspring, k=len(population))
+        executor = self._executor()
+        try:
+            population = toolbox.population(n=population_size)
+            # Seed up to a fifth of the population with the previous run's best and their mutants
+            seeds = (await self._warm_start())[:population_size]
+            for i in range(min(population_size, max(len(seeds), population_size // 5)) if seeds else 0):
+                population[i][:] = seeds[i % len(seeds)]
+                if i >= len(seeds):
+                    toolbox.mutate(population[i])
+            await self.evaluate_population(population, executor)
+            for gen in range(generations):
+                offspring = algorithms.varAnd(population, toolbox, cxpb=0.5, mutpb=0.2)
+                await self.evaluate_population([ind for ind in offspring if not ind.fitness.valid], executor)
+                population = toolbox.select(offspring, k=len(population))
+        finally:
+            if executor is not None:
+                executor.shutdown()
         best = tools.selBest(population, k=1)[0]
-        return {
-            "profit_target": best[0],
-            "stop_loss": best[1],
-            "trailing_percent": best[2]
-        }
+        await self._save_best(tools.selBest(population, k=len(population)))
+        logger_main.info(f"Optimized {self.symbol} with {self.evaluations} backtests "
+                         f"({len(self.fitness_cache)} cached): best return {best.fitness.values[0]}")
+        return dict(zip(PARAM_NAMES, best))
+
+    async def optimize_with_budget(self, budget, min_length=200, eta=3, max_candidates=None):
+        """
+        Search parameters with successive halving under a compute budget.
+
+        Random candidates are backtested on the most recent min_length candles,
+        and only the best 1/eta of each rung are promoted to a history eta times
+        longer, up to the full history.
+
+        Args:
+            budget (int): Compute budget in backtested candles (candidates x history length).
+            min_length (int): History length of the first rung (default: 200).
+            eta (int): Promotion ratio between rungs (default: 3).
+            max_candidates (int): Upper bound on the starting candidates (optional).
+
+        Returns:
+            dict: Best parameters found within the budget.
+        """
+        await self.load_data()
+        seeds = await self._warm_start()
+
+        def sample_candidates(n):
+            # Previous best parameters go first so they survive any trimming of the first rung
+            random_candidates = [[random.uniform(low, high) for low, high in PARAM_RANGES] for _ in range(n)]
+            return ([list(seed) for seed in seeds] + random_candidates)[:max(n, len(seeds))]
+
+        executor = self._executor()
+        try:
+            async def evaluate_batch(candidates, length):
+                return await self.evaluate_population(candidates, executor, length)
+
+            ranking, spent = await successive_halving(
+                sample_candidates, evaluate_batch, len(self.data), budget,
+                min_length=min_length, eta=eta, max_candidates=max_candidates
+            )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        best, score, length = ranking[0]
+        await self._save_best([candidate for candidate, _, _ in ranking])
+        logger_main.info(f"Budgeted optimization of {self.symbol} spent {spent}/{budget} candles: "
+                         f"best return {score} on {length} candles")
+        return dict(zip(PARAM_NAMES, self.quantize(best)))
@@ -2,16 +2,14 @@
 import logging
 import numpy as np
 import pandas as pd
-import redis.asyncio as redis
-import json
 import itertools
+import random
 from .backtester import backtest_strategy
+from successive_halving import successive_halving
+from fitness_cache import FitnessCache, data_fingerprint, params_key
+from redis_pool import cache_set
 logger = logging.getLogger("main")
 
-async def get_redis_client():
-    """Инициализация Redis клиента."""
-    return await redis.from_url("redis://localhost:6379/0")
-
 async def calculate_rsi(historical_data, period=14):
     """Вычисляет RSI на основе исторических данных."""
     closes = [candle['close'] for candle in historical_data]
@@ -109,8 +107,15 @@ async def evaluate_strategy(historical_data, strategy):
         ind1 = indicators[0]
         ind2 = indicators[1]
 
-        val1 = indicator_values[ind1["name"]][i] if ind1["name"] != "sma" else indicator_values[ind1["name"]][0][i] > indicator_values[ind1["name"]][1][i]
-        val2 = indicator_values[ind2["name"]][i] if ind2["name"] != "sma" else indicator_values[ind2["name"]][0][i] > indicator_values[ind2["name"]][1][i]
+        val1 = val2 = None
+        if ind1["name"] in ["rsi", "cci"]:
+            val1 = indicator_values[ind1["name"]][i]
+        elif ind1["name"] == "sma":
+            val1 = indicator_values["sma"][0][i] > indicator_values["sma"][1][i]
+        if ind2["name"] in ["rsi", "cci"]:
+            val2 = indicator_values[ind2["name"]][i]
+        elif ind2["name"] == "sma":
+            val2 = indicator_values["sma"][0][i] > indicator_values["sma"][1][i]
 
         if ind1["name"] == "bollinger":
             price = historical_data[i]['close']
@@ -149,14 +154,23 @@ async def evaluate_strategy(historical_data, strategy):
     profit = await backtest_strategy(historical_data, signals)
     return profit
 
-async def optimize_strategies(exchange, symbol, timeframe='4h', limit=200):
-    """Генерирует и оптимизирует новые стратегии."""
+async def optimize_strategies(exchange, symbol, timeframe='4h', limit=200, budget=None, min_length=50, eta=3):
+    """
+    Генерирует и оптимизирует новые стратегии.
+
+    If budget (in evaluated candles) is given, strategies are ranked with successive
+    halving: scored on the last min_length candles first and only the best 1/eta
+    promoted to longer history, instead of evaluating every strategy on all of it.
+    """
     try:
         # Fetch historical data
-        historical_data = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-        if not historical_data or len(historical_data) < limit:
+        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        if not ohlcv or len(ohlcv) < limit:
             logger.warning(f"Insufficient historical data for {symbol}")
             return []
+        # The indicator helpers and the backtester read candles by field name
+        columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        historical_data = [dict(zip(columns, candle)) for candle in ohlcv]
 
         # Define indicators and thresholds
         indicators = ["rsi", "sma", "bollinger", "cci"]
@@ -171,24 +185,56 @@ async def optimize_strategies(exchange, symbol, timeframe='4h', limit=200):
         strategies = await generate_strategy_combinations(indicators, thresholds)
         logger.info(f"Generated {len(strategies)} strategy combinations for {symbol}")
 
-        # Evaluate each strategy
-        for strategy in strategies:
-            profit = await evaluate_strategy(historical_data, strategy)
-            strategy["profit"] = profit
-            logger.debug(f"Evaluated strategy {strategy['indicators']}: profit={profit}")
-
-        # Sort strategies by profit and select top 3
-        strategies.sort(key=lambda x: x["profit"], reverse=True)
-        top_strategies = strategies[:3]
+        # Warm start: the previous run's best strategies are evaluated first
+        cache = FitnessCache(symbol, timeframe, "custom")
+        previous_best = [params_key(indicators) for indicators in await cache.get_best()]
+        strategies.sort(key=lambda s: previous_best.index(params_key(s["indicators"]))
+                        if params_key(s["indicators"]) in previous_best else len(previous_best))
+        warm_count = sum(params_key(s["indicators"]) in previous_best for s in strategies)
+
+        async def evaluate_batch(candidates, length):
+            # Only strategies without a cached score on these exact candles are backtested
+            window = historical_data[-length:]
+            fingerprint = data_fingerprint(window)
+            keys = [params_key(strategy["indicators"]) for strategy in candidates]
+            profits = await cache.get_many(fingerprint, keys)
+            computed = {}
+            for key, strategy in zip(keys, candidates):
+                if key not in profits:
+                    computed[key] = profits[key] = await evaluate_strategy(window, strategy)
+                    logger.debug(f"Evaluated strategy {strategy['indicators']}: profit={profits[key]}")
+            await cache.set_many(fingerprint, computed)
+            logger.debug(f"Scored {len(candidates)} strategies for {symbol}, {len(computed)} not cached")
+            return [profits[key] for key in keys]
+
+        if budget is None:
+            # Evaluate each strategy
+            for strategy, profit in zip(strategies, await evaluate_batch(strategies, len(historical_data))):
+                strategy["profit"] = profit
+
+            # Sort strategies by profit and select top 3
+            strategies.sort(key=lambda x: x["profit"], reverse=True)
+            top_strategies = strategies[:3]
+        else:
+            def sample_candidates(n):
+                warm = strategies[:warm_count]
+                rest = strategies[warm_count:]
+                return warm + random.sample(rest, min(max(n - len(warm), 0), len(rest)))
+
+            ranking, spent = await successive_halving(
+                sample_candidates, evaluate_batch,
+                len(historical_data), budget, min_length=min_length, eta=eta
+            )
+            for strategy, profit, length in ranking:
+                strategy["profit"] = profit
+            top_strategies = [strategy for strategy, _, _ in ranking[:3]]
+            logger.info(f"Ranked {len(ranking)} strategies for {symbol} with {spent}/{budget} candles evaluated")
+        await cache.set_best([strategy["indicators"] for strategy in top_strategies])
 
         # Save top strategies to Redis
-        redis_client = await get_redis_client()
-        try:
-            strategy_key = f"custom_strategies:{symbol}"
-            await redis_client.set(strategy_key, json.dumps(top_strategies), ex=86400 * 30)
-            logger.info(f"Saved top strategies for {symbol}: {top_strategies}")
-        finally:
-            await redis_client.close()
+        strategy_key = f"custom_strategies:{symbol}"
+        await cache_set(strategy_key, top_strategies, ttl=86400 * 30)
+        logger.info(f"Saved top strategies for {symbol}: {top_strategies}")
 
         return top_strategies
     except Exception as e:
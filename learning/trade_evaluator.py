@@ -1,55 +1,121 @@
 # learning/trade_evaluator.py
 import logging
-import redis.asyncio as redis
 import json
-import numpy as np
+import time
+from redis_pool import get_redis, pipeline
 
 logger = logging.getLogger("main")
 
-async def get_redis_client():
-    return await redis.from_url("redis://localhost:6379/0")
+HISTORY_LIMIT = 1000  # Most recent trades kept per symbol and user
+STATS_TTL = 86400 * 30
 
-async def evaluate_trade(symbol, user, strategy_info, profit):
-    redis_client = await get_redis_client()
+# Welford update of the profit mean/variance, counts and success rate, applied
+# atomically in Redis so concurrent workers never lose an update. A legacy JSON
+# blob under the key is converted to the hash on first touch.
+UPDATE_STATS_SCRIPT = """
+local key = KEYS[1]
+local profit = tonumber(ARGV[1])
+if redis.call('TYPE', key)['ok'] == 'string' then
+    local old = cjson.decode(redis.call('GET', key))
+    redis.call('DEL', key)
+    local n = tonumber(old['total_trades']) or 0
+    local std = tonumber(old['profit_volatility']) or 0
+    redis.call('HSET', key, 'total_trades', n, 'successful_trades', tonumber(old['successful_trades']) or 0,
+               'avg_profit', string.format('%.17g', tonumber(old['avg_profit']) or 0),
+               'm2', string.format('%.17g', std * std * n))
+end
+local n = redis.call('HINCRBY', key, 'total_trades', 1)
+local successful = tonumber(redis.call('HGET', key, 'successful_trades') or '0')
+if profit > 0 then
+    successful = redis.call('HINCRBY', key, 'successful_trades', 1)
+end
+local mean = tonumber(redis.call('HGET', key, 'avg_profit') or '0')
+local m2 = tonumber(redis.call('HGET', key, 'm2') or '0')
+local delta = profit - mean
+mean = mean + delta / n
+m2 = m2 + delta * (profit - mean)
+local std = 0
+if n > 1 then
+    std = math.sqrt(m2 / n)
+end
+redis.call('HSET', key, 'successful_trades', successful,
+           'avg_profit', string.format('%.17g', mean), 'm2', string.format('%.17g', m2),
+           'success_rate', string.format('%.17g', successful / n), 'profit_volatility', string.format('%.17g', std))
+redis.call('EXPIRE', key, tonumber(ARGV[2]))
+return {n, successful, string.format('%.17g', mean), string.format('%.17g', std)}
+"""
+
+def _stats(result):
+    total, successful, mean, std = int(result[0]), int(result[1]), float(result[2]), float(result[3])
+    return {
+        "total_trades": total,
+        "successful_trades": successful,
+        "success_rate": successful / total,
+        "avg_profit": mean,
+        "profit_volatility": std
+    }
+
+async def evaluate_trades(trades):
+    """
+    Record trades and update their profitability statistics in one pipeline.
+
+    Args:
+        trades (list): Dicts with 'symbol', 'user', 'strategy_info' and 'profit'.
+
+    Returns:
+        list: Updated statistics of each trade's symbol (None for all if Redis failed).
+    """
+    if not trades:
+        return []
     try:
-        trade_key = f"trade_history:{symbol}:{user}"
-        profit_key = f"profitability:{symbol}"
-
-        # Сохраняем историю сделки
-        trade_data = {
-            "strategy": strategy_info,
-            "profit": profit,
-            "timestamp": int(time.time())
-        }
-        await redis_client.lpush(trade_key, json.dumps(trade_data))
-
-        # Обновляем статистику прибыльности
-        profit_data = await redis_client.get(profit_key)
-        if profit_data:
-            profit_data = json.loads(profit_data.decode())
-        else:
-            profit_data = {
-                "total_trades": 0,
-                "successful_trades": 0,
-                "success_rate": 0.5,
-                "avg_profit": 0.0,
-                "profit_volatility": 0.0,
-                "profits": []
-            }
-
-        profit_data["total_trades"] += 1
-        if profit > 0:
-            profit_data["successful_trades"] += 1
-        profit_data["success_rate"] = profit_data["successful_trades"] / profit_data["total_trades"]
-        profit_data["profits"].append(profit)
-        if len(profit_data["profits"]) > 100:  # Ограничиваем историю до 100 сделок
-            profit_data["profits"] = profit_data["profits"][-100:]
-        profit_data["avg_profit"] = np.mean(profit_data["profits"])
-        profit_data["profit_volatility"] = np.std(profit_data["profits"]) if len(profit_data["profits"]) > 1 else 0.0
-
-        await redis_client.set(profit_key, json.dumps(profit_data), ex=86400 * 30)
-        logger.info(f"Evaluated trade for {symbol}: profit={profit}, success_rate={profit_data['success_rate']:.2f}, avg_profit={profit_data['avg_profit']:.2f}, profit_volatility={profit_data['profit_volatility']:.2f}")
+        update_stats = get_redis().register_script(UPDATE_STATS_SCRIPT)
+        pipe = pipeline()
+        for trade in trades:
+            trade_key = f"trade_history:{trade['symbol']}:{trade['user']}"
+            # Сохраняем историю сделки, ограниченную последними HISTORY_LIMIT сделками
+            pipe.lpush(trade_key, json.dumps({
+                "strategy": trade['strategy_info'],
+                "profit": trade['profit'],
+                "timestamp": int(time.time())
+            }))
+            pipe.ltrim(trade_key, 0, HISTORY_LIMIT - 1)
+            pipe.expire(trade_key, STATS_TTL)
+            await update_stats(keys=[f"profitability:{trade['symbol']}"], args=[float(trade['profit']), STATS_TTL], client=pipe)
+        results = await pipe.execute()
     except Exception as e:
-        logger.error(f"Failed to evaluate trade for {symbol}: {type(e).__name__}: {str(e)}")
-    finally:
-        await redis_client.close()
+        logger.error(f"Failed to evaluate {len(trades)} trades: {type(e).__name__}: {str(e)}")
+        return [None] * len(trades)
+
+    stats = [_stats(result) for result in results[3::4]]
+    for trade, trade_stats in zip(trades, stats):
+        logger.info(f"Evaluated trade for {trade['symbol']}: profit={trade['profit']}, success_rate={trade_stats['success_rate']:.2f}, avg_profit={trade_stats['avg_profit']:.2f}, profit_volatility={trade_stats['profit_volatility']:.2f}")
+    return stats
+
+async def evaluate_trade(symbol, user, strategy_info, profit):
+    """
+    Record one trade and update the symbol's profitability statistics.
+
+    Returns:
+        dict: Updated statistics (None if Redis failed).
+    """
+    return (await evaluate_trades([{"symbol": symbol, "user": user, "strategy_info": strategy_info, "profit": profit}]))[0]
+
+async def get_trade_stats(symbol):
+    """
+    Read the profitability statistics of a symbol.
+
+    Returns:
+        dict: 'total_trades', 'successful_trades', 'success_rate', 'avg_profit' and
+            'profit_volatility' (None if no trade was recorded).
+    """
+    stats = await get_redis().hgetall(f"profitability:{symbol}")
+    if not stats:
+        return None
+    stats = {key.decode(): value.decode() for key, value in stats.items()}
+    return {
+        "total_trades": int(stats['total_trades']),
+        "successful_trades": int(stats.get('successful_trades', 0)),
+        "success_rate": float(stats.get('success_rate', 0.0)),
+        "avg_profit": float(stats.get('avg_profit', 0.0)),
+        "profit_volatility": float(stats.get('profit_volatility', 0.0))
+    }
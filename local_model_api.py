@@ -1,17 +1,124 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from prometheus_client import Histogram, make_asgi_app
+import asyncio
+import os
+import time
+import numpy as np
 import pandas as pd
-from ml_predictor import Predictor
-from retraining_manager import RetrainingManager
+from ml_predictor import get_predictor
 import logging
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+app.mount("/metrics", make_asgi_app())
+
+# Micro-batching window: a batch is run when it is full or its oldest request waited this long
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 64))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 5))
+
+batch_size_metric = Histogram('model_batch_size', 'Requests per batched forward pass',
+                              buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+queue_latency_metric = Histogram('model_queue_latency_seconds', 'Time a request waits before its batch runs')
+inference_latency_metric = Histogram('model_inference_seconds', 'Duration of a batched forward pass')
 
 # Инициализация Predictor
-retraining_manager = RetrainingManager()
-predictor = Predictor(retraining_manager)
+predictor = get_predictor()
+
+class MicroBatcher:
+    """
+    Collect concurrent prediction requests into batches for a single forward pass.
+    """
+
+    def __init__(self, predict_rows, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        """
+        Initialize the batcher.
+
+        Args:
+            predict_rows (callable): Function mapping an (n, features) array to n predictions.
+            max_batch_size (int): Maximum requests per batch.
+            max_wait_ms (float): Maximum time the first request of a batch waits for others.
+        """
+        self.predict_rows = predict_rows
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, row):
+        """
+        Queue one feature row and wait for its prediction.
+
+        Args:
+            row (np.ndarray): Feature row of shape (1, features).
+
+        Returns:
+            float: Predicted value.
+        """
+        if row.ndim != 2 or row.shape[0] != 1:
+            raise ValueError(f"Expected one feature row, got shape {row.shape}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                queue_latency_metric.observe(started - enqueued)
+            batch_size_metric.observe(len(batch))
+            try:
+                X = np.vstack([row for row, _, _ in batch])
+                # The forward pass runs off the event loop so new requests keep queueing
+                predictions = await loop.run_in_executor(None, self.predict_rows, X)
+                inference_latency_metric.observe(time.perf_counter() - started)
+                if len(predictions) != len(batch):
+                    raise ValueError(f"Got {len(predictions)} predictions for {len(batch)} requests")
+                for (_, future, _), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(float(prediction))
+            except Exception as e:
+                logger.error(f"Batched prediction of {len(batch)} requests failed: {str(e)}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+batcher = MicroBatcher(predictor.predict_rows)
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
 
 class PredictionRequest(BaseModel):
     data: list
@@ -21,6 +128,8 @@ async def predict(request: PredictionRequest):
     """
     Endpoint to make predictions using the local model.
 
+    Concurrent requests are answered from one batched forward pass.
+
     Args:
         request: PredictionRequest object containing input data.
 
@@ -34,11 +143,18 @@ async def predict(request: PredictionRequest):
         df = pd.DataFrame(request.data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         
+        row = predictor.feature_row(df)
+        if len(row) != 1 or not np.isfinite(row).all():
+            # Too few candles to compute the indicators of the latest one
+            raise HTTPException(status_code=400, detail=f"Not enough candles to build features ({len(df)} given)")
+
         # Выполнение предсказания
-        prediction = predictor.predict(df)
+        prediction = await batcher.submit(row)
         
         logger.info(f"Prediction result: {prediction}")
         return {"predictions": float(prediction)}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
         return {"error": str(e)}
@@ -1,13 +1,112 @@
+import asyncio
 import logging
 import pandas as pd
-import redis.asyncio as redis
-import json
 import numpy as np
+from candle_clock import seconds_until_close
+from redis_pool import cache_get_many, cache_set_many
 
 logger = logging.getLogger("main")
 
-async def get_redis_client():
-    return await redis.from_url("redis://localhost:6379/0")
+UNKNOWN_STATE = {"trend": "unknown", "macd_trend": "unknown", "bb_position": "unknown"}
+
+def compute_market_states(closes):
+    """
+    Compute trend, MACD and Bollinger position of many symbols in one vectorized pass.
+
+    Args:
+        closes (pd.DataFrame): Closing prices, one column per symbol, aligned on the
+            latest candle (shorter histories padded with leading NaN).
+
+    Returns:
+        dict: Symbol -> market state.
+    """
+    last = closes.iloc[-1]
+    # SMA
+    sma_20 = closes.rolling(window=20).mean().iloc[-1]
+    # MACD
+    exp1 = closes.ewm(span=12, adjust=False).mean()
+    exp2 = closes.ewm(span=26, adjust=False).mean()
+    macd = (exp1 - exp2)
+    signal_line = macd.ewm(span=9, adjust=False).mean().iloc[-1]
+    macd = macd.iloc[-1]
+    # Bollinger Bands
+    std_20 = closes.rolling(window=20).std().iloc[-1]
+    upper_band = sma_20 + std_20 * 2
+    lower_band = sma_20 - std_20 * 2
+
+    trend = np.where(last > sma_20, "bullish", "bearish")
+    macd_trend = np.where(macd > signal_line, "bullish", "bearish")
+    bb_position = np.where(last > upper_band, "overbought", np.where(last < lower_band, "oversold", "neutral"))
+    return {
+        symbol: {
+            "trend": str(trend[i]),
+            "macd_trend": str(macd_trend[i]),
+            "bb_position": str(bb_position[i]),
+            "macd": float(macd.iloc[i]),
+            "signal_line": float(signal_line.iloc[i]),
+            "upper_band": float(upper_band.iloc[i]),
+            "lower_band": float(lower_band.iloc[i])
+        }
+        for i, symbol in enumerate(closes.columns)
+    }
+
+async def analyze_market_states(exchange, symbols, timeframe='1h', limit=100, concurrency=10):
+    """
+    Analyze the market state of many symbols with Redis caching.
+
+    Cached states are read with one MGET, only the misses are fetched
+    (concurrently), their indicators are computed in one vectorized pass, and
+    the results are written back in one pipeline, each expiring when the
+    current candle closes.
+
+    Args:
+        exchange: Exchange instance (e.g., ccxt.async_support.mexc).
+        symbols (list): Symbols to analyze.
+        timeframe: Timeframe for OHLCV data (default: '1h').
+        limit: Number of OHLCV candles to fetch (default: 100).
+        concurrency (int): OHLCV requests in flight (default: 10).
+
+    Returns:
+        dict: Symbol -> market state with indicators.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    keys = {symbol: f"market_state:{symbol}:{timeframe}" for symbol in symbols}
+    cached = await cache_get_many(list(keys.values()))
+    states = {symbol: cached[key] for symbol, key in keys.items() if key in cached}
+    misses = [symbol for symbol in symbols if symbol not in states]
+    if not misses:
+        return states
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(symbol):
+        async with semaphore:
+            try:
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                return pd.Series([candle[4] for candle in ohlcv], dtype=float)
+            except Exception as e:
+                logger.error(f"Failed to analyze market state for {symbol}: {type(e).__name__}: {str(e)}")
+                return None
+
+    series = dict(zip(misses, await asyncio.gather(*[fetch(symbol) for symbol in misses])))
+    fetched = {symbol: s for symbol, s in series.items() if s is not None and len(s)}
+    for symbol in misses:
+        if symbol not in fetched:
+            states[symbol] = dict(UNKNOWN_STATE)
+    if not fetched:
+        return states
+
+    # Align every history on its latest candle, shorter ones get leading NaN
+    length = max(len(s) for s in fetched.values())
+    closes = pd.DataFrame({
+        symbol: np.concatenate((np.full(length - len(s), np.nan), s.to_numpy())) for symbol, s in fetched.items()
+    })
+    computed = compute_market_states(closes)
+    states.update(computed)
+
+    # Сохраняем в кэш до закрытия текущей свечи
+    await cache_set_many({keys[symbol]: state for symbol, state in computed.items()}, ttl=seconds_until_close(timeframe))
+    return states
 
 async def analyze_market_state(exchange, symbol, timeframe='1h', limit=100):
     """
@@ -22,59 +121,4 @@ async def analyze_market_state(exchange, symbol, timeframe='1h', limit=100):
     Returns:
         dict: Market state with indicators.
     """
-    cache_key = f"market_state:{symbol}:{timeframe}"
-    redis_client = await get_redis_client()
-    try:
-        cached_state = await redis_client.get(cache_key)
-        if cached_state:
-            return json.loads(cached_state.decode())
-    except Exception as e:
-        logger.error(f"Failed to check cache for market state: {type(e).__name__}: {str(e)}")
-    finally:
-        await redis_client.close()
-
-    try:
-        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        
-        # SMA
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        trend = "bullish" if df['close'].iloc[-1] > df['sma_20'].iloc[-1] else "bearish"
-
-        # MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal_line = macd.ewm(span=9, adjust=False).mean()
-        macd_trend = "bullish" if macd.iloc[-1] > signal_line.iloc[-1] else "bearish"
-
-        # Bollinger Bands
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['std_20'] = df['close'].rolling(window=20).std()
-        df['upper_band'] = df['sma_20'] + (df['std_20'] * 2)
-        df['lower_band'] = df['sma_20'] - (df['std_20'] * 2)
-        bb_position = "overbought" if df['close'].iloc[-1] > df['upper_band'].iloc[-1] else "oversold" if df['close'].iloc[-1] < df['lower_band'].iloc[-1] else "neutral"
-
-        state = {
-            "trend": trend,
-            "macd_trend": macd_trend,
-            "bb_position": bb_position,
-            "macd": macd.iloc[-1],
-            "signal_line": signal_line.iloc[-1],
-            "upper_band": df['upper_band'].iloc[-1],
-            "lower_band": df['lower_band'].iloc[-1]
-        }
-
-        # Сохраняем в кэш
-        redis_client = await get_redis_client()
-        try:
-            await redis_client.set(cache_key, json.dumps(state), ex=3600)  # Кэшируем на 1 час
-        except Exception as e:
-            logger.error(f"Failed to cache market state: {type(e).__name__}: {str(e)}")
-        finally:
-            await redis_client.close()
-
-        return state
-    except Exception as e:
-        logger.error(f"Failed to analyze market state for {symbol}: {type(e).__name__}: {str(e)}")
-        return {"trend": "unknown", "macd_trend": "unknown", "bb_position": "unknown"}
+    return (await analyze_market_states(exchange, [symbol], timeframe, limit))[symbol]
@@ -29,3 +29,29 @@ def prepare_data(data, lookback=20):
     X = X_normalized.values
     
     return X, y
+
+def load_training_data(exchange_id, symbol, timeframe, start=None, end=None, columns=None, store=None):
+    """
+    Load training data from the feature store instead of recomputing features.
+
+    Args:
+        exchange_id (str): Exchange the candles come from.
+        symbol (str): Trading symbol.
+        timeframe (str): Timeframe.
+        start (int): First timestamp in milliseconds (optional).
+        end (int): Last timestamp in milliseconds (optional).
+        columns (list): Feature columns (default: all stored features).
+        store (FeatureStore): Feature store to read from (default: get_feature_store(exchange_id)).
+
+    Returns:
+        tuple: (X, y) - feature rows of every candle that has a successor, and
+            1 if the next close is higher, else 0.
+    """
+    from feature_store import FEATURE_COLUMNS, get_feature_store
+
+    columns = columns or FEATURE_COLUMNS
+    data = (store or get_feature_store(exchange_id)).read_range(symbol, timeframe, start, end, columns=columns + ['close'])
+    closes = data['close'].to_numpy()
+    X = data[columns].to_numpy()[:-1]
+    y = (closes[1:] > closes[:-1]).astype(int)
+    return X, y
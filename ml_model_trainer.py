@@ -1,45 +1,386 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
+from model_registry import DEFAULT_GROUP, get_model_registry
 
-def train_random_forest(X, y, model_path="rf_model.pkl"):
+RF_MODEL_NAME = "random_forest"
+LSTM_MODEL_NAME = "lstm"
+RF_ARTIFACT = "model.pkl"
+
+class WindowSource:
+    """
+    Lazily windowed view over one feature series, e.g. a memory-mapped feature store file.
+
+    The window ending at row r covers rows r - timesteps + 1 .. r and is labeled
+    with labels[r]; windows are only materialized when a batch is assembled.
+    """
+
+    def __init__(self, values, labels, columns=None, start=0, stop=None):
+        """
+        Initialize the source.
+
+        Args:
+            values (np.ndarray): Rows of shape (n, k), typically a np.memmap.
+            labels (np.ndarray): Label of each row, shape (n,).
+            columns (list): Column indices used as features (default: all).
+            start (int): First row a window may cover (default: 0).
+            stop (int): One past the last row a window may end on (default: len(labels)).
+        """
+        self.values = values
+        self.labels = labels
+        self.columns = columns
+        self.start = start
+        self.stop = len(labels) if stop is None else stop
+
+    @property
+    def n_features(self):
+        return self.values.shape[1] if self.columns is None else len(self.columns)
+
+    def count(self, timesteps):
+        """Number of windows of the given length."""
+        return max(0, self.stop - (self.start + timesteps - 1))
+
+    def window(self, index, timesteps):
+        """
+        Materialize one window.
+
+        Args:
+            index (int): Window number, 0 <= index < count(timesteps).
+            timesteps (int): Window length.
+
+        Returns:
+            tuple: (features of shape (timesteps, n_features), label).
+        """
+        end = self.start + timesteps - 1 + index
+        rows = self.values[end - timesteps + 1:end + 1]
+        return (rows if self.columns is None else rows[:, self.columns]), self.labels[end]
+
+    def split(self, fraction, timesteps):
+        """
+        Split chronologically into training and validation sources.
+
+        Args:
+            fraction (float): Share of the windows used for validation.
+            timesteps (int): Window length.
+
+        Returns:
+            tuple: (train, validation) sources whose windows end on disjoint rows.
+        """
+        cut = self.stop - int(self.count(timesteps) * fraction)
+        train = WindowSource(self.values, self.labels, self.columns, self.start, cut)
+        validation = WindowSource(self.values, self.labels, self.columns, max(self.start, cut - timesteps + 1), self.stop)
+        return train, validation
+
+def store_window_source(exchange_id, symbol, timeframe, columns=None, store=None):
     """
-    Train a Random Forest model.
+    Window source over the memory-mapped feature store series of a symbol.
+
+    Labels are 1 if the next close is higher, else 0; warm-up rows are skipped.
+
+    Args:
+        exchange_id (str): Exchange the candles come from.
+        symbol (str): Trading symbol.
+        timeframe (str): Timeframe.
+        columns (list): Feature columns (default: feature_store.FEATURE_COLUMNS).
+        store (FeatureStore): Feature store to read from (default: get_feature_store(exchange_id)).
+
+    Returns:
+        WindowSource: Source over the stored rows.
+    """
+    from feature_store import COLUMNS, FEATURE_COLUMNS, get_feature_store
+
+    columns = columns or FEATURE_COLUMNS
+    _, values = (store or get_feature_store(exchange_id)).arrays(symbol, timeframe)
+    closes = values[:, COLUMNS.index('close')]
+    labels = np.zeros(len(closes), dtype=np.float32)
+    labels[:-1] = closes[1:] > closes[:-1]
+    complete = ~np.isnan(values[:, [COLUMNS.index(c) for c in columns]]).any(axis=1)
+    start = int(np.argmax(complete)) if complete.any() else len(closes)
+    # The last row has no successor to label it
+    return WindowSource(values, labels, [COLUMNS.index(c) for c in columns], start, max(start, len(closes) - 1))
+
+def _assemble_batch(sources, offsets, indices, timesteps):
+    n_features = sources[0].n_features
+    X = np.empty((len(indices), timesteps, n_features), dtype=np.float32)
+    y = np.empty(len(indices), dtype=np.float32)
+    owners = np.searchsorted(offsets, indices, side='right') - 1
+    for i, (owner, index) in enumerate(zip(owners, indices)):
+        X[i], y[i] = sources[owner].window(index - offsets[owner], timesteps)
+    return np.nan_to_num(X, copy=False), y
+
+def _window_indices(total, shuffle, shuffle_buffer, block_size, rng):
+    if not shuffle:
+        yield from range(total)
+        return
+    # Visit blocks of consecutive windows in random order (sequential reads within a block),
+    # then mix windows of different blocks through a bounded shuffle buffer
+    buffer = []
+    for block in rng.permutation(-(-total // block_size)):
+        for index in range(block * block_size, min(total, (block + 1) * block_size)):
+            if len(buffer) < shuffle_buffer:
+                buffer.append(index)
+            else:
+                slot = rng.integers(shuffle_buffer)
+                yield buffer[slot]
+                buffer[slot] = index
+    rng.shuffle(buffer)
+    yield from buffer
+
+def window_batches(sources, timesteps, batch_size=32, epochs=1, shuffle=True, shuffle_buffer=10000,
+                   block_size=1024, prefetch=4, workers=4, seed=None):
+    """
+    Stream training batches of windows with bounded memory.
+
+    Windows are assembled from the sources by a thread pool, with up to
+    prefetch batches prepared ahead of the consumer.
+
+    Args:
+        sources (list): WindowSource objects with the same number of features.
+        timesteps (int): Window length.
+        batch_size (int): Windows per batch (default: 32).
+        epochs (int): Passes over all windows, None to loop forever as Keras expects (default: 1).
+        shuffle (bool): Shuffle windows (default: True).
+        shuffle_buffer (int): Windows held in the shuffle buffer (default: 10000).
+        block_size (int): Consecutive windows read together when shuffling (default: 1024).
+        prefetch (int): Batches assembled ahead (default: 4).
+        workers (int): Threads assembling batches (default: 4).
+        seed (int): Random seed (optional).
+
+    Yields:
+        tuple: (X, y) - float32 arrays of shape (batch, timesteps, features) and (batch,).
+    """
+    sources = [source for source in sources if source.count(timesteps) > 0]
+    if not sources:
+        return
+    offsets = np.cumsum([0] + [source.count(timesteps) for source in sources])
+    total = int(offsets[-1])
+    rng = np.random.default_rng(seed)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            batch = []
+            for index in _window_indices(total, shuffle, shuffle_buffer, block_size, rng):
+                batch.append(index)
+                if len(batch) == batch_size:
+                    pending.append(executor.submit(_assemble_batch, sources, offsets, np.array(batch), timesteps))
+                    batch = []
+                    if len(pending) >= prefetch:
+                        yield pending.popleft().result()
+            if batch:
+                pending.append(executor.submit(_assemble_batch, sources, offsets, np.array(batch), timesteps))
+            epoch += 1
+        while pending:
+            yield pending.popleft().result()
+
+def sample_windows(sources, timesteps, n_samples, chunk_size=4096, workers=4, seed=None):
+    """
+    Draw a uniform random sample of windows, assembled in chunks.
+
+    Args:
+        sources (list): WindowSource objects.
+        timesteps (int): Window length.
+        n_samples (int): Windows to draw (all of them if there are fewer).
+        chunk_size (int): Windows assembled per task (default: 4096).
+        workers (int): Threads assembling chunks (default: 4).
+        seed (int): Random seed (optional).
+
+    Returns:
+        tuple: (X, y) - arrays of shape (n, timesteps, features) and (n,).
+    """
+    sources = [source for source in sources if source.count(timesteps) > 0]
+    offsets = np.cumsum([0] + [source.count(timesteps) for source in sources])
+    total = int(offsets[-1])
+    if not total:
+        return np.empty((0, timesteps, 0), dtype=np.float32), np.empty(0, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    # Sorted indices keep the reads of each chunk close together in the files
+    indices = np.sort(rng.choice(total, size=min(n_samples, total), replace=False))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunks = list(executor.map(
+            lambda start: _assemble_batch(sources, offsets, indices[start:start + chunk_size], timesteps),
+            range(0, len(indices), chunk_size)
+        ))
+    return np.concatenate([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+def train_random_forest(X, y, group=DEFAULT_GROUP, metadata=None, registry=None):
+    """
+    Train a Random Forest model and publish it as a new registry version.
 
     Args:
         X (np.ndarray): Features.
         y (np.ndarray): Target.
-        model_path (str): Path to save the model (default: 'rf_model.pkl').
+        group (str): Symbol group the model is trained for (default: 'default').
+        metadata (dict): Feature schema and training window to record with the model (optional).
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
 
     Returns:
         Trained model.
     """
+    registry = registry or get_model_registry()
     model = RandomForestClassifier(n_estimators=100, random_state=42)
     model.fit(X, y)
-    joblib.dump(model, model_path)
+    registry.publish(
+        RF_MODEL_NAME, group,
+        artifacts={RF_ARTIFACT: lambda path: joblib.dump(model, path)},
+        metadata=dict(metadata or {}, samples=len(X), metrics={'train_accuracy': float(model.score(X, y))})
+    )
     return model
 
-def train_lstm_model(X, y, model_path="lstm_model.h5"):
+def train_random_forest_sampled(sources, n_samples=200000, timesteps=1, group=DEFAULT_GROUP, metadata=None,
+                                registry=None, seed=None):
     """
-    Train an LSTM model.
+    Train a Random Forest on a chunked random sample of windows that need not fit in memory.
 
     Args:
-        X (np.ndarray): Features (shape: [samples, timesteps, features]).
-        y (np.ndarray): Target.
-        model_path (str): Path to save the model (default: 'lstm_model.h5').
+        sources (list): WindowSource objects, e.g. from store_window_source.
+        n_samples (int): Windows to sample (default: 200000).
+        timesteps (int): Window length, windows are flattened into one feature row (default: 1).
+        group (str): Symbol group the model is trained for (default: 'default').
+        metadata (dict): Feature schema and training window to record with the model (optional).
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
+        seed (int): Random seed (optional).
 
     Returns:
         Trained model.
     """
+    X, y = sample_windows(sources, timesteps, n_samples, seed=seed)
+    return train_random_forest(X.reshape(len(X), -1), y.astype(int), group, metadata, registry)
+
+def load_random_forest(group=DEFAULT_GROUP, version=None, registry=None):
+    """
+    Load a published Random Forest model, memory-mapping its arrays.
+
+    Args:
+        group (str): Symbol group (default: 'default').
+        version (str): Version to load, the current one if None.
+        registry (ModelRegistry): Registry to load from (default: get_model_registry()).
+
+    Returns:
+        Trained model, or None if nothing was published.
+    """
+    registry = registry or get_model_registry()
+    path = registry.version_dir(RF_MODEL_NAME, group, version)
+    return joblib.load(f"{path}/{RF_ARTIFACT}", mmap_mode='r') if path else None
+
+def build_lstm_model(timesteps, n_features):
+    """
+    Build the LSTM architecture.
+
+    Args:
+        timesteps (int): Sequence length.
+        n_features (int): Features per timestep.
+
+    Returns:
+        Compiled, untrained model.
+    """
     model = Sequential([
-        LSTM(50, return_sequences=True, input_shape=(X.shape[1], X.shape[2])),
+        LSTM(50, return_sequences=True, input_shape=(timesteps, n_features)),
         Dropout(0.2),
         LSTM(50),
         Dropout(0.2),
         Dense(1, activation='sigmoid')
     ])
     model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-    model.fit(X, y, epochs=50, batch_size=32, validation_split=0.2)
-    model.save(model_path)
+    return model
+
+def train_lstm_model(X, y, group=DEFAULT_GROUP, metadata=None, registry=None):
+    """
+    Train an LSTM model and publish its weights as a new registry version.
+
+    Args:
+        X (np.ndarray): Features (shape: [samples, timesteps, features]).
+        y (np.ndarray): Target.
+        group (str): Symbol group the model is trained for (default: 'default').
+        metadata (dict): Feature schema and training window to record with the model (optional).
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
+
+    Returns:
+        Trained model.
+    """
+    registry = registry or get_model_registry()
+    model = build_lstm_model(X.shape[1], X.shape[2])
+    history = model.fit(X, y, epochs=50, batch_size=32, validation_split=0.2)
+    registry.publish(
+        LSTM_MODEL_NAME, group, weights=model.get_weights(),
+        metadata=dict(metadata or {}, samples=len(X), input_shape=[X.shape[1], X.shape[2]],
+                      metrics={key: float(values[-1]) for key, values in history.history.items()})
+    )
+    return model
+
+def train_lstm_streaming(sources, timesteps, group=DEFAULT_GROUP, metadata=None, registry=None, epochs=50,
+                         batch_size=32, validation_fraction=0.2, shuffle_buffer=10000, prefetch=4, workers=4, seed=None):
+    """
+    Train an LSTM model from streamed windows and publish its weights as a new registry version.
+
+    Unlike train_lstm_model, the [samples, timesteps, features] array is never
+    built: batches are assembled on the fly from the sources, so memory stays
+    bounded by the shuffle buffer and prefetched batches.
+
+    Args:
+        sources (list): WindowSource objects, e.g. from store_window_source.
+        timesteps (int): Window length.
+        group (str): Symbol group the model is trained for (default: 'default').
+        metadata (dict): Feature schema and training window to record with the model (optional).
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
+        epochs (int): Training epochs (default: 50).
+        batch_size (int): Windows per batch (default: 32).
+        validation_fraction (float): Most recent share of each source held out (default: 0.2).
+        shuffle_buffer (int): Windows held in the shuffle buffer (default: 10000).
+        prefetch (int): Batches assembled ahead (default: 4).
+        workers (int): Threads assembling batches (default: 4).
+        seed (int): Random seed (optional).
+
+    Returns:
+        Trained model.
+    """
+    registry = registry or get_model_registry()
+    splits = [source.split(validation_fraction, timesteps) for source in sources]
+    train = [t for t, _ in splits if t.count(timesteps)]
+    validation = [v for _, v in splits if v.count(timesteps)]
+    if not train:
+        raise ValueError(f"No windows of {timesteps} timesteps to train on")
+    samples = sum(source.count(timesteps) for source in train)
+    steps = -(-samples // batch_size)
+    validation_steps = -(-sum(source.count(timesteps) for source in validation) // batch_size)
+    n_features = train[0].n_features
+    model = build_lstm_model(timesteps, n_features)
+    history = model.fit(
+        window_batches(train, timesteps, batch_size, epochs=None, shuffle_buffer=shuffle_buffer,
+                       prefetch=prefetch, workers=workers, seed=seed),
+        steps_per_epoch=steps,
+        epochs=epochs,
+        validation_data=window_batches(validation, timesteps, batch_size, epochs=None, shuffle=False,
+                                       prefetch=prefetch, workers=workers) if validation else None,
+        validation_steps=validation_steps or None
+    )
+    registry.publish(
+        LSTM_MODEL_NAME, group, weights=model.get_weights(),
+        metadata=dict(metadata or {}, samples=samples, input_shape=[timesteps, n_features],
+                      metrics={key: float(values[-1]) for key, values in history.history.items()})
+    )
+    return model
+
+def load_lstm_model(group=DEFAULT_GROUP, version=None, registry=None):
+    """
+    Rebuild a published LSTM model from its memory-mapped weights.
+
+    Args:
+        group (str): Symbol group (default: 'default').
+        version (str): Version to load, the current one if None.
+        registry (ModelRegistry): Registry to load from (default: get_model_registry()).
+
+    Returns:
+        Trained model, or None if nothing was published.
+    """
+    registry = registry or get_model_registry()
+    version, weights = registry.load_weights(LSTM_MODEL_NAME, group, version)
+    if weights is None:
+        return None
+    model = build_lstm_model(*registry.metadata(LSTM_MODEL_NAME, group, version)['input_shape'])
+    model.set_weights(weights)
     return model
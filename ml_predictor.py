@@ -1,32 +1,228 @@
+import os
+import time
 import pandas as pd
 import numpy as np
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from features import extract_features, calculate_sma, calculate_rsi
+from features import extract_features
+from model_registry import DEFAULT_GROUP, get_model_registry
+
+FEATURE_COLUMNS = ['returns', 'volatility', 'sma_20', 'sma_50', 'rsi']
+MODEL_NAME = "predictor"
+LAYERS = [(64, 'relu'), (32, 'relu'), (1, 'linear')]  # Units and activation of each dense layer
+BACKEND = os.getenv("PREDICTOR_BACKEND", "numpy")
+
+class DenseNetwork:
+    """
+    NumPy forward pass of the predictor MLP.
+
+    Takes the same weights as the Keras model (kernel and bias of each layer,
+    in model.get_weights() order) and returns the same outputs, without
+    loading TensorFlow.
+    """
+
+    def __init__(self, weights=None, seed=None):
+        """
+        Initialize the network.
+
+        Args:
+            weights (list): Kernel and bias arrays of each layer, Glorot-initialized if None.
+            seed (int): Random seed for the initialization (optional).
+        """
+        if weights is None:
+            rng = np.random.default_rng(seed)
+            weights = []
+            fan_in = len(FEATURE_COLUMNS)
+            for units, _ in LAYERS:
+                limit = np.sqrt(6 / (fan_in + units))
+                weights += [rng.uniform(-limit, limit, (fan_in, units)), np.zeros(units)]
+                fan_in = units
+        self.set_weights(weights)
+
+    def set_weights(self, weights):
+        if len(weights) != 2 * len(LAYERS):
+            raise ValueError(f"Expected {2 * len(LAYERS)} weight arrays, got {len(weights)}")
+        fan_in = len(FEATURE_COLUMNS)
+        for (units, _), kernel, bias in zip(LAYERS, weights[::2], weights[1::2]):
+            if kernel.shape != (fan_in, units) or bias.shape != (units,):
+                raise ValueError(f"Weight shapes {kernel.shape}, {bias.shape} do not match a {fan_in}->{units} layer")
+            fan_in = units
+        # Memory-mapped float32 weights are used as is, so workers share their pages
+        self.weights = [w if w.dtype == np.float32 else np.asarray(w, dtype=np.float32) for w in weights]
+
+    def get_weights(self):
+        return list(self.weights)
+
+    def __call__(self, X):
+        """
+        Run the forward pass.
+
+        Args:
+            X (np.ndarray): Feature rows of shape (n, 5).
+
+        Returns:
+            np.ndarray: Outputs of shape (n, 1).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        for (_, activation), kernel, bias in zip(LAYERS, self.weights[::2], self.weights[1::2]):
+            X = X @ kernel + bias
+            if activation == 'relu':
+                np.maximum(X, 0, out=X)
+        return X
+
+def export_model(model, group=DEFAULT_GROUP, metadata=None, registry=None):
+    """
+    Publish trained predictor weights for inference with either backend.
+
+    Args:
+        model: Keras model from Predictor.build_model() or a DenseNetwork.
+        group (str): Symbol group (default: 'default').
+        metadata (dict): Feature schema, training window, metrics... (optional).
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
+
+    Returns:
+        str: The published version.
+    """
+    registry = registry or get_model_registry()
+    return registry.publish(MODEL_NAME, group, weights=model.get_weights(), metadata=dict(
+        metadata or {}, feature_columns=FEATURE_COLUMNS, layers=[list(layer) for layer in LAYERS]
+    ))
 
 class Predictor:
-    def __init__(self, retraining_manager):
+    def __init__(self, retraining_manager, registry=None, group=DEFAULT_GROUP, reload_interval=30, backend=BACKEND):
+        """
+        Initialize the predictor.
+
+        Args:
+            retraining_manager (RetrainingManager): Manager receiving new training samples.
+            registry (ModelRegistry): Registry serving model versions (default: get_model_registry()).
+            group (str): Symbol group whose model is served (default: 'default').
+            reload_interval (float): Seconds between checks for a new version (default: 30).
+            backend (str): 'numpy' to run without TensorFlow, or 'tensorflow' (default: PREDICTOR_BACKEND).
+        """
+        if backend not in ('numpy', 'tensorflow'):
+            raise ValueError(f"Unknown predictor backend: {backend}")
         self.retraining_manager = retraining_manager
-        self.model = self._build_model()
+        self.registry = registry or get_model_registry()
+        self.group = group
+        self.reload_interval = reload_interval
+        self.backend = backend
+        self.version = None
+        self.last_reload_check = 0.0
+        self.model = self.build_model() if backend == 'tensorflow' else DenseNetwork()
+        self.refresh_weights()
 
-    def _build_model(self):
+    @staticmethod
+    def build_model():
+        # TensorFlow is imported here so that importing this module stays cheap
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense
+
+        # 5 features in (returns, volatility, sma_20, sma_50, rsi), predicted value out
         model = Sequential([
-            Dense(64, activation='relu', input_shape=(5,)),  # 5 features: returns, volatility, sma_20, sma_50, rsi
-            Dense(32, activation='relu'),
-            Dense(1)  # Output: predicted value
+            Dense(units, activation=activation, input_shape=(len(FEATURE_COLUMNS),)) if i == 0
+            else Dense(units, activation=activation)
+            for i, (units, activation) in enumerate(LAYERS)
         ])
         model.compile(optimizer='adam', loss='mse')
         return model
 
-    def predict(self, data):
+    def refresh_weights(self):
+        """
+        Load a newly published model version, checking the registry at most once per reload_interval.
+
+        Returns:
+            bool: True if a new version was loaded.
+        """
+        self.last_reload_check = time.monotonic()
+        version = self.registry.current_version(MODEL_NAME, self.group)
+        if version is None or version == self.version:
+            return False
+        _, weights = self.registry.load_weights(MODEL_NAME, self.group, version)
+        self.model.set_weights(weights)
+        self.version = version
+        return True
+
+    def feature_row(self, data):
+        """
+        Extract the model input for the latest candle.
+
+        Args:
+            data (pd.DataFrame): OHLCV data.
+
+        Returns:
+            np.ndarray: Feature row of shape (1, 5).
+        """
         features = extract_features(data)
-        sma = calculate_sma(data)
-        rsi = calculate_rsi(data)
-        
-        # Prepare features for prediction
-        feature_columns = ['returns', 'volatility', 'sma_20', 'sma_50', 'rsi']
-        X = features[feature_columns].tail(1).to_numpy()  # Use the last row for prediction
-        
-        # Make prediction
-        prediction = self.model.predict(X, verbose=0)
-        return prediction[0][0]  # Return the predicted value
+        return features[FEATURE_COLUMNS].tail(1).to_numpy()  # Use the last row for prediction
+
+    def predict_rows(self, X):
+        """
+        Run one forward pass over a batch of feature rows.
+
+        Args:
+            X (np.ndarray): Feature rows of shape (n, 5).
+
+        Returns:
+            np.ndarray: Predicted values of shape (n,).
+        """
+        if time.monotonic() - self.last_reload_check >= self.reload_interval:
+            self.refresh_weights()
+        if self.backend == 'numpy':
+            return self.model(X)[:, 0]
+        # Calling the model directly skips the per-call setup of model.predict
+        return self.model(np.asarray(X, dtype=np.float32), training=False).numpy()[:, 0]
+
+    def predict(self, data):
+        X = self.feature_row(data)
+        return self.predict_rows(X)[0]  # Return the predicted value
+
+    def predict_many(self, frames):
+        """
+        Predict the latest candle of many symbols in one forward pass.
+
+        Args:
+            frames (dict): Symbol -> OHLCV DataFrame.
+
+        Returns:
+            dict: Symbol -> predicted value, without symbols too short to extract features from.
+        """
+        rows = {symbol: self.feature_row(data) for symbol, data in frames.items()}
+        rows = {symbol: row for symbol, row in rows.items() if len(row)}
+        if not rows:
+            return {}
+        predictions = self.predict_rows(np.concatenate(list(rows.values())))
+        return dict(zip(rows, predictions.tolist()))
+
+    def predict_latest(self, symbols, timeframe, store):
+        """
+        Predict the latest stored candle of many symbols in one forward pass.
+
+        Args:
+            symbols (list): Trading symbols.
+            timeframe (str): Timeframe of the stored features.
+            store (FeatureStore): Feature store of the symbols' exchange.
+
+        Returns:
+            dict: Symbol -> predicted value, without symbols lacking complete features.
+        """
+        rows = store.latest_rows(symbols, timeframe, FEATURE_COLUMNS)
+        if not rows:
+            return {}
+        predictions = self.predict_rows(np.concatenate(list(rows.values())))
+        return dict(zip(rows, predictions.tolist()))
+
+_shared_predictors = {}
+
+def get_predictor(group=DEFAULT_GROUP):
+    """
+    Get the process-wide Predictor of a symbol group, building its model on first use.
+
+    Args:
+        group (str): Symbol group (default: 'default').
+
+    Returns:
+        Predictor: Shared predictor instance.
+    """
+    if group not in _shared_predictors:
+        from retraining_manager import get_retraining_manager
+        _shared_predictors[group] = Predictor(get_retraining_manager(), group=group)
+    return _shared_predictors[group]
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+
+logger = logging.getLogger("main")
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+DEFAULT_GROUP = "default"
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+class ModelRegistry:
+    """
+    Versioned on-disk store of trained models.
+
+    Every model name and symbol group has its own directory of immutable
+    versions (v0001, v0002, ...), each holding the weights as one .npy file per
+    array, optional extra artifacts (pickles, Keras files) and a metadata.json
+    with the feature schema, training window and metrics. A CURRENT file names
+    the version to serve and is swapped atomically, so workers sharing the
+    directory pick up a new version without restarting:
+
+        models/registry/<name>/<group>/CURRENT
+        models/registry/<name>/<group>/v0003/metadata.json
+        models/registry/<name>/<group>/v0003/weights_000.npy
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        """
+        Initialize the registry.
+
+        Args:
+            root (str): Registry directory, shared by trainers and workers (default: MODEL_REGISTRY_DIR).
+        """
+        self.root = root
+
+    def group_dir(self, name, group=DEFAULT_GROUP):
+        return os.path.join(self.root, name, group)
+
+    def version_dir(self, name, group=DEFAULT_GROUP, version=None):
+        """
+        Directory of a model version.
+
+        Args:
+            name (str): Model name.
+            group (str): Symbol group (default: 'default').
+            version (str): Version, the current one if None.
+
+        Returns:
+            str: Version directory, or None if the group has no current version.
+        """
+        version = version or self.current_version(name, group)
+        return os.path.join(self.group_dir(name, group), version) if version else None
+
+    def versions(self, name, group=DEFAULT_GROUP):
+        """List the published versions of a model, oldest first."""
+        try:
+            entries = os.listdir(self.group_dir(name, group))
+        except FileNotFoundError:
+            return []
+        return sorted(entry for entry in entries if entry.startswith('v') and entry[1:].isdigit())
+
+    def current_version(self, name, group=DEFAULT_GROUP):
+        """
+        Get the version currently served for a model and group.
+
+        Returns:
+            str: Version such as 'v0003', or None if nothing was published.
+        """
+        try:
+            with open(os.path.join(self.group_dir(name, group), CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_current(self, name, group, version):
+        """
+        Atomically point a model and group at a published version (also used to roll back).
+
+        Args:
+            name (str): Model name.
+            group (str): Symbol group.
+            version (str): Published version.
+        """
+        if not os.path.isdir(os.path.join(self.group_dir(name, group), version)):
+            raise ValueError(f"Unknown version {version} of model {name}/{group}")
+        _atomic_write(os.path.join(self.group_dir(name, group), CURRENT_FILE), version)
+        logger.info(f"Model {name}/{group} now serves {version}")
+
+    def publish(self, name, group=DEFAULT_GROUP, weights=None, artifacts=None, metadata=None, make_current=True):
+        """
+        Publish a new immutable model version.
+
+        The version is assembled in a temporary directory and renamed into
+        place, so readers never see a partially written version.
+
+        Args:
+            name (str): Model name.
+            group (str): Symbol group (default: 'default').
+            weights (list): Weight arrays, e.g. from model.get_weights() (optional).
+            artifacts (dict): File name -> callable writing that file given its path (optional).
+            metadata (dict): Feature schema, training window, metrics... (optional).
+            make_current (bool): Serve the new version right away (default: True).
+
+        Returns:
+            str: The new version.
+        """
+        group_dir = self.group_dir(name, group)
+        os.makedirs(group_dir, exist_ok=True)
+        tmp_dir = os.path.join(group_dir, f".tmp-{os.getpid()}-{time.time_ns()}")
+        os.makedirs(tmp_dir)
+        try:
+            weights = list(weights or [])
+            for i, array in enumerate(weights):
+                np.save(os.path.join(tmp_dir, f"weights_{i:03d}.npy"), np.asarray(array))
+            for file_name, write in (artifacts or {}).items():
+                write(os.path.join(tmp_dir, file_name))
+            # Claim the next free version number, retrying if another trainer took it first
+            while True:
+                existing = self.versions(name, group)
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+                info = dict(metadata or {}, name=name, group=group, version=version,
+                            created_at=int(time.time()), weights=len(weights))
+                with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                    json.dump(info, f, indent=2)
+                try:
+                    os.rename(tmp_dir, os.path.join(group_dir, version))
+                    break
+                except OSError:
+                    if not os.path.exists(os.path.join(group_dir, version)):
+                        raise
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Published model {name}/{group} {version}")
+        if make_current:
+            self.set_current(name, group, version)
+        return version
+
+    def metadata(self, name, group=DEFAULT_GROUP, version=None):
+        """
+        Read the metadata of a version.
+
+        Returns:
+            dict: Metadata, or None if the version does not exist.
+        """
+        path = self.version_dir(name, group, version)
+        if path is None:
+            return None
+        try:
+            with open(os.path.join(path, METADATA_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_weights(self, name, group=DEFAULT_GROUP, version=None, mmap=True):
+        """
+        Load the weight arrays of a version.
+
+        Args:
+            name (str): Model name.
+            group (str): Symbol group (default: 'default').
+            version (str): Version, the current one if None.
+            mmap (bool): Memory-map the arrays read-only instead of reading them (default: True).
+
+        Returns:
+            tuple: (version, weights), or (None, None) if nothing was published.
+        """
+        version = version or self.current_version(name, group)
+        if version is None:
+            return None, None
+        info = self.metadata(name, group, version)
+        path = self.version_dir(name, group, version)
+        weights = [
+            np.load(os.path.join(path, f"weights_{i:03d}.npy"), mmap_mode='r' if mmap else None)
+            for i in range(info['weights'])
+        ]
+        return version, weights
+
+    def prune(self, name, group=DEFAULT_GROUP, keep=5):
+        """
+        Delete old versions, keeping the newest ones and the current one.
+
+        Args:
+            name (str): Model name.
+            group (str): Symbol group (default: 'default').
+            keep (int): Newest versions to keep (default: 5).
+
+        Returns:
+            list: Deleted versions.
+        """
+        current = self.current_version(name, group)
+        versions = self.versions(name, group)
+        removed = [version for version in versions[:-keep] if version != current] if keep else []
+        for version in removed:
+            shutil.rmtree(os.path.join(self.group_dir(name, group), version), ignore_errors=True)
+        return removed
+
+_shared_registry = None
+
+def get_model_registry():
+    """
+    Get the process-wide ModelRegistry.
+
+    Returns:
+        ModelRegistry: Shared registry instance.
+    """
+    global _shared_registry
+    if _shared_registry is None:
+        _shared_registry = ModelRegistry()
+    return _shared_registry
+
+__all__ = ['ModelRegistry', 'get_model_registry', 'REGISTRY_DIR', 'DEFAULT_GROUP']
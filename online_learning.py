@@ -1,4 +1,10 @@
-from river import linear_model, optim
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("main")
 
 class OnlineLearning:
     """
@@ -9,6 +15,8 @@ class OnlineLearning:
         """
         Initialize the online learning model.
         """
+        from river import linear_model, optim
+
         self.model = linear_model.LogisticRegression(optimizer=optim.SGD(0.01))
 
     def update(self, x, y):
@@ -32,3 +40,132 @@ class OnlineLearning:
             str: Trading signal ('buy' or 'sell').
         """
         return "buy" if self.model.predict_one(x) > 0.5 else "sell"
+
+SNAPSHOT_DIR = os.getenv("ONLINE_SNAPSHOT_DIR", "models/online")
+
+class OnlineLearningPool:
+    """
+    Per-symbol (or per-cluster) online models with mini-batch updates.
+
+    Models are created on first use, kept in an LRU of at most max_models
+    entries and snapshotted to disk periodically and when evicted, so cold
+    symbols cost no memory and every model survives restarts.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, max_models=1000, snapshot_interval=300, clusters=None):
+        """
+        Initialize the pool.
+
+        Args:
+            snapshot_dir (str): Directory of the model snapshots (default: ONLINE_SNAPSHOT_DIR).
+            max_models (int): Models kept in memory (default: 1000).
+            snapshot_interval (float): Seconds between snapshots of updated models (default: 300).
+            clusters (dict): Symbol -> cluster name, symbols of a cluster share one model (optional).
+        """
+        self.snapshot_dir = snapshot_dir
+        self.max_models = max_models
+        self.snapshot_interval = snapshot_interval
+        self.clusters = clusters or {}
+        self.models = OrderedDict()
+        self.dirty = set()
+        self.last_snapshot = time.monotonic()
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, f"{key.replace('/', '_')}.pkl")
+
+    def _new_model(self):
+        from river import linear_model, optim
+
+        return linear_model.LogisticRegression(optimizer=optim.SGD(0.01))
+
+    def _save(self, key):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.models[key], f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.dirty.discard(key)
+
+    def model(self, symbol):
+        """
+        Get the model of a symbol, loading its snapshot or creating it if needed.
+
+        Args:
+            symbol (str): Trading symbol.
+
+        Returns:
+            river.linear_model.LogisticRegression: The symbol's (or its cluster's) model.
+        """
+        key = self.clusters.get(symbol, symbol)
+        if key in self.models:
+            self.models.move_to_end(key)
+            return self.models[key]
+        try:
+            with open(self._path(key), 'rb') as f:
+                model = pickle.load(f)
+        except FileNotFoundError:
+            model = self._new_model()
+        except Exception as e:
+            logger.error(f"Discarding unreadable online model snapshot {self._path(key)}: {str(e)}")
+            model = self._new_model()
+        self.models[key] = model
+        while len(self.models) > self.max_models:
+            cold = next(iter(self.models))
+            if cold in self.dirty:
+                self._save(cold)
+            del self.models[cold]
+        return model
+
+    def learn_many(self, symbol, X, y):
+        """
+        Update a symbol's model with a mini-batch.
+
+        Args:
+            symbol (str): Trading symbol.
+            X (pd.DataFrame): Feature rows.
+            y (pd.Series): Targets (1 for buy, 0 for sell), aligned with X.
+        """
+        if not len(X):
+            return
+        self.model(symbol).learn_many(X, y.astype(bool))
+        self.dirty.add(self.clusters.get(symbol, symbol))
+        if time.monotonic() - self.last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def predict_many(self, symbol, X):
+        """
+        Predict trading signals for a batch of feature rows.
+
+        Args:
+            symbol (str): Trading symbol.
+            X (pd.DataFrame): Feature rows.
+
+        Returns:
+            pd.Series: Trading signal ('buy' or 'sell') per row.
+        """
+        proba = self.model(symbol).predict_proba_many(X)
+        # An untrained model may not know the positive class yet
+        buy = proba[True] if True in proba.columns else proba.iloc[:, 0] * 0
+        return (buy > 0.5).map({True: 'buy', False: 'sell'})
+
+    def snapshot(self):
+        """
+        Write the models updated since the last snapshot to disk.
+
+        Returns:
+            int: Number of models written.
+        """
+        written = 0
+        for key in list(self.dirty):
+            try:
+                self._save(key)
+                written += 1
+            except Exception as e:
+                logger.error(f"Failed to snapshot online model {key}: {str(e)}")
+        self.last_snapshot = time.monotonic()
+        return written
+
+    def close(self):
+        """Snapshot pending updates, e.g. on shutdown."""
+        self.snapshot()
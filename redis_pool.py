@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import os
+import weakref
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger("main")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+# Async connections belong to the event loop that opened them, so each loop gets its own pool
+_async_clients = weakref.WeakKeyDictionary()
+_sync_client = None
+
+def get_redis():
+    """
+    Get the process-wide async Redis client of the running event loop.
+
+    The client is backed by a connection pool, so calls reuse warm
+    connections. Do not close it after use.
+
+    Returns:
+        redis.asyncio.Redis: Shared client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = aioredis.ConnectionPool.from_url(REDIS_URL, max_connections=MAX_CONNECTIONS)
+        client = aioredis.Redis(connection_pool=pool)
+        _async_clients[loop] = client
+    return client
+
+def get_sync_redis():
+    """
+    Get the process-wide blocking Redis client (decoded responses), for code outside event loops.
+
+    Returns:
+        redis.Redis: Shared client.
+    """
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis(
+            connection_pool=redis.ConnectionPool.from_url(REDIS_URL, max_connections=MAX_CONNECTIONS, decode_responses=True)
+        )
+    return _sync_client
+
+async def close_redis():
+    """Disconnect the pool of the running event loop, e.g. before the loop is closed."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.connection_pool.disconnect()
+
+def pipeline(transaction=False):
+    """
+    Start a pipeline on the shared client; queued commands are sent in one round-trip.
+
+    Args:
+        transaction (bool): Wrap the commands in MULTI/EXEC (default: False).
+
+    Returns:
+        redis.asyncio.client.Pipeline: Pipeline to queue commands on and execute().
+    """
+    return get_redis().pipeline(transaction=transaction)
+
+def _loads(value):
+    return json.loads(value.decode() if isinstance(value, bytes) else value)
+
+async def cache_get(key):
+    """
+    Read one JSON value.
+
+    Returns:
+        Decoded value, or None if the key is missing or Redis is unavailable.
+    """
+    return (await cache_get_many([key])).get(key)
+
+async def cache_get_many(keys):
+    """
+    Read many JSON values with a single MGET.
+
+    Args:
+        keys (list): Redis keys.
+
+    Returns:
+        dict: Key -> decoded value for the keys present (empty if Redis is unavailable).
+    """
+    if not keys:
+        return {}
+    try:
+        values = await get_redis().mget(keys)
+    except Exception as e:
+        logger.error(f"Failed to read {len(keys)} cache keys: {type(e).__name__}: {str(e)}")
+        return {}
+    return {key: _loads(value) for key, value in zip(keys, values) if value is not None}
+
+async def cache_set(key, value, ttl=None):
+    """
+    Write one JSON value.
+
+    Args:
+        key (str): Redis key.
+        value: JSON-serializable value.
+        ttl (int): Expiry in seconds (optional).
+    """
+    await cache_set_many({key: value}, ttl)
+
+async def cache_set_many(items, ttl=None):
+    """
+    Write many JSON values in one round-trip.
+
+    Without ttl this is a single MSET; with ttl the SETs are pipelined.
+
+    Args:
+        items (dict): Key -> JSON-serializable value.
+        ttl (int or dict): Expiry in seconds for all keys, or key -> expiry (optional).
+    """
+    if not items:
+        return
+    encoded = {key: json.dumps(value) for key, value in items.items()}
+    try:
+        if ttl is None:
+            await get_redis().mset(encoded)
+            return
+        pipe = pipeline()
+        for key, value in encoded.items():
+            pipe.set(key, value, ex=ttl[key] if isinstance(ttl, dict) else ttl)
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to write {len(items)} cache keys: {type(e).__name__}: {str(e)}")
+
+__all__ = ['get_redis', 'get_sync_redis', 'close_redis', 'pipeline', 'cache_get', 'cache_get_many',
+           'cache_set', 'cache_set_many', 'REDIS_URL']
@@ -1,31 +1,223 @@
+import fcntl
 import logging
-import pandas as pd
-from ml_predictor import Predictor
-from ml_data_preparer import prepare_data
+import multiprocessing
+import os
+import time
+import numpy as np
+from features import extract_features
+from ml_predictor import FEATURE_COLUMNS, MODEL_NAME, Predictor, export_model
+from model_registry import DEFAULT_GROUP, get_model_registry
 
 logger = logging.getLogger(__name__)
 
+SPOOL_DIR = os.getenv("RETRAINING_SPOOL_DIR", "models/retraining_spool")
+
+def labeled_samples(data):
+    """
+    Build training samples from OHLCV data.
+
+    Args:
+        data (pd.DataFrame): OHLCV data.
+
+    Returns:
+        tuple: (X, y, t) - feature rows of every candle that has a successor,
+            1.0 if the next close is higher, else 0.0, and the candle timestamps
+            in milliseconds.
+    """
+    features = extract_features(data)
+    X = features[FEATURE_COLUMNS].to_numpy(dtype=np.float32)[:-1]
+    closes = features['close'].to_numpy()
+    y = (closes[1:] > closes[:-1]).astype(np.float32)
+    t = features['timestamp'].to_numpy()
+    if np.issubdtype(t.dtype, np.datetime64):
+        t = t.astype('datetime64[ms]')
+    return X, y, t.astype(np.int64)[:-1]
+
+def run_training_worker(spool_dir=SPOOL_DIR, group=DEFAULT_GROUP, registry=None, batch_size=256, epochs=1,
+                        min_samples=1024, interval=600, buffer_size=50000, poll_interval=1.0, stop_event=None):
+    """
+    Train the predictor model from spooled samples until stopped.
+
+    Samples are accumulated in a bounded ring buffer. Training runs over the
+    buffer in mini-batches once min_samples new samples arrived, or once
+    interval seconds passed with at least one new sample, and the resulting
+    model is published as a new registry version for predictors to pick up.
+
+    Args:
+        spool_dir (str): Directory the RetrainingManager writes sample files to.
+        group (str): Symbol group the model is published for (default: 'default').
+        registry (ModelRegistry): Registry to publish to (default: get_model_registry()).
+        batch_size (int): Mini-batch size (default: 256).
+        epochs (int): Passes over the buffer per training round (default: 1).
+        min_samples (int): New samples that trigger training (default: 1024).
+        interval (float): Seconds after which any new samples trigger training (default: 600).
+        buffer_size (int): Most recent samples kept for training (default: 50000).
+        poll_interval (float): Seconds between spool scans (default: 1.0).
+        stop_event: multiprocessing.Event ending the loop (optional, runs forever if None).
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    registry = registry or get_model_registry()
+    model = Predictor.build_model()
+    version, weights = registry.load_weights(MODEL_NAME, group, mmap=False)
+    if weights is not None:
+        model.set_weights(weights)
+    X_buffer = np.empty((buffer_size, len(FEATURE_COLUMNS)), dtype=np.float32)
+    y_buffer = np.empty(buffer_size, dtype=np.float32)
+    t_buffer = np.zeros(buffer_size, dtype=np.int64)
+    size = 0
+    position = 0
+    new_samples = 0
+    last_train = time.monotonic()
+    logger.info(f"Training worker started from {version or 'scratch'}, watching {spool_dir}")
+
+    while stop_event is None or not stop_event.is_set():
+        for name in sorted(f for f in os.listdir(spool_dir) if f.endswith('.npz')):
+            path = os.path.join(spool_dir, name)
+            try:
+                with np.load(path) as samples:
+                    X, y = samples['X'][-buffer_size:], samples['y'][-buffer_size:]
+                    t = samples['t'][-buffer_size:] if 't' in samples.files else np.zeros(len(X), dtype=np.int64)
+            except Exception as e:
+                logger.error(f"Skipping unreadable sample file {path}: {str(e)}")
+                X, y, t = X_buffer[:0], y_buffer[:0], t_buffer[:0]
+            os.remove(path)
+            # Ring buffer write, wrapping around once the buffer is full
+            first = min(len(X), buffer_size - position)
+            X_buffer[position:position + first] = X[:first]
+            y_buffer[position:position + first] = y[:first]
+            t_buffer[position:position + first] = t[:first]
+            X_buffer[:len(X) - first] = X[first:]
+            y_buffer[:len(X) - first] = y[first:]
+            t_buffer[:len(X) - first] = t[first:]
+            position = (position + len(X)) % buffer_size
+            size = min(size + len(X), buffer_size)
+            new_samples += len(X)
+
+        due = new_samples >= min_samples or (new_samples > 0 and time.monotonic() - last_train >= interval)
+        if due:
+            started = time.monotonic()
+            history = model.fit(X_buffer[:size], y_buffer[:size], batch_size=batch_size, epochs=epochs,
+                                shuffle=True, verbose=0)
+            timestamps = t_buffer[:size][t_buffer[:size] > 0]
+            version = export_model(model, group, registry=registry, metadata={
+                'training_window': {
+                    'start': int(timestamps.min()) if len(timestamps) else None,
+                    'end': int(timestamps.max()) if len(timestamps) else None,
+                    'samples': int(size)
+                },
+                'metrics': {'loss': float(history.history['loss'][-1])}
+            })
+            registry.prune(MODEL_NAME, group)
+            logger.info(f"Trained on {size} samples ({new_samples} new) in {time.monotonic() - started:.1f}s, "
+                        f"published {MODEL_NAME}/{group} {version}")
+            new_samples = 0
+            last_train = time.monotonic()
+        else:
+            time.sleep(poll_interval)
+
 class RetrainingManager:
-    def __init__(self):
-        self.predictor = Predictor(self)
-
-    def retrain(self, data):
-        logger.info("Starting retraining process")
-        prepared_data = prepare_data(data)
-        
-        # Convert prepared data to features and target for retraining
-        X = prepared_data.drop(columns=['close'], errors='ignore')  # Features
-        y = prepared_data['close'] if 'close' in prepared_data else None  # Target
-        
-        if y is None:
-            logger.error("Target column 'close' not found in prepared data")
-            return self.predictor
-        
-        # Retrain the model (assuming the model can be retrained incrementally)
-        for i in range(len(X)):
-            x_row = X.iloc[i].to_dict()
-            y_value = y.iloc[i]
-            self.predictor.model.fit([list(x_row.values())], [y_value], epochs=1, verbose=0)
-        
-        logger.info("Retraining completed")
-        return self.predictor
+    def __init__(self, spool_dir=SPOOL_DIR, group=DEFAULT_GROUP):
+        self.spool_dir = spool_dir
+        self.group = group
+        self.process = None
+        self.stop_event = None
+        self.watermark_dir = os.path.join(self.spool_dir, 'watermarks')
+        os.makedirs(self.watermark_dir, exist_ok=True)
+
+    def retrain(self, data, exchange_id, symbol, timeframe, include_last=True):
+        """
+        Queue the new labeled samples of a series for the background training worker.
+
+        Only candles newer than the last ones spooled for the series are
+        queued, tracked in a watermark file shared by all processes, so
+        overlapping fetches never feed the same sample twice. This only writes
+        a small sample file and returns; training happens in the worker
+        process, so trading cycles never block on it.
+
+        Args:
+            data (pd.DataFrame): OHLCV data.
+            exchange_id (str): Exchange the candles come from.
+            symbol (str): Trading symbol of the candles.
+            timeframe (str): Timeframe of the candles.
+            include_last (bool): Use the last candle; pass False when it is still open,
+                so no sample is labeled with an incomplete close (default: True).
+
+        Returns:
+            int: Number of samples queued.
+        """
+        if not include_last:
+            data = data.iloc[:-1]
+        X, y, t = labeled_samples(data)
+        if not len(X):
+            return 0
+        path = os.path.join(self.watermark_dir, f"{exchange_id}_{symbol.replace('/', '_')}_{timeframe}")
+        with open(path, 'a+') as watermark:
+            fcntl.flock(watermark, fcntl.LOCK_EX)
+            watermark.seek(0)
+            last = int(watermark.read() or -1)
+            new = t > last
+            if not new.any():
+                return 0
+            X, y, t = X[new], y[new], t[new]
+            self._spool(X, y, t)
+            watermark.seek(0)
+            watermark.truncate()
+            watermark.write(str(int(t[-1])))
+        logger.debug(f"Queued {len(X)} samples of {symbol} {timeframe} for retraining")
+        return len(X)
+
+    def _spool(self, X, y, t):
+        name = f"{time.time_ns()}-{os.getpid()}.npz"
+        tmp_path = os.path.join(self.spool_dir, f".{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, X=X, y=y, t=t)
+        os.replace(tmp_path, os.path.join(self.spool_dir, name))
+
+    def start_worker(self, **kwargs):
+        """
+        Start the training worker in a separate process.
+
+        With many trading processes, run a single worker instead with
+        `python retraining_manager.py`; all managers share the spool directory.
+
+        Args:
+            **kwargs: Training options passed to run_training_worker.
+        """
+        if self.process is not None and self.process.is_alive():
+            return
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=run_training_worker,
+            kwargs=dict(kwargs, spool_dir=self.spool_dir, group=self.group, stop_event=self.stop_event),
+            daemon=True
+        )
+        self.process.start()
+        logger.info(f"Started training worker process {self.process.pid}")
+
+    def stop_worker(self, timeout=30):
+        """Stop the training worker started by start_worker."""
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout)
+        self.process = None
+        logger.info("Stopped training worker process")
+
+_shared_manager = None
+
+def get_retraining_manager():
+    """
+    Get the process-wide RetrainingManager.
+
+    Returns:
+        RetrainingManager: Shared manager instance.
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        _shared_manager = RetrainingManager()
+    return _shared_manager
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run_training_worker()
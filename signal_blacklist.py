@@ -1,11 +1,103 @@
-import redis
+import asyncio
 import logging
+import time
+from redis_pool import get_redis, get_sync_redis
 
 logger = logging.getLogger(__name__)
 
+BLACKLIST_KEY = 'blacklist:signals'
+BLACKLIST_CHANNEL = 'blacklist:signals:updates'
+
 class SignalBlacklist:
-    def __init__(self, redis_host='localhost', redis_port=6379):
-        self.redis = redis.Redis(host=redis_host, port=redis_port, decode_responses=True)
+    """
+    Blacklisted signals mirrored in process memory.
+
+    The set is loaded with one SMEMBERS and kept current by listening on a
+    pub/sub channel that every change is published to, so membership checks
+    are local set lookups that never block the event loop. Without a running
+    listener the snapshot is reloaded once it is older than refresh_interval:
+    in the background on a running event loop, or with the blocking client
+    outside of one.
+    """
+
+    def __init__(self, redis_client=None, refresh_interval=60):
+        """
+        Initialize the blacklist.
+
+        Args:
+            redis_client (redis.Redis): Blocking client for the sync API (default: get_sync_redis()).
+            refresh_interval (float): Seconds after which a snapshot without listener is reloaded (default: 60).
+        """
+        self.redis = redis_client or get_sync_redis()
+        self.refresh_interval = refresh_interval
+        self.signals = set()
+        self.loaded_at = None
+        self.listener = None
+        self.reload = None
+
+    def _apply(self, message):
+        action, _, signal_id = message.partition(':')
+        if action == 'add':
+            self.signals.add(signal_id)
+        elif action == 'remove':
+            self.signals.discard(signal_id)
+
+    def _stale(self):
+        if self.listener is not None and not self.listener.done():
+            return False
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_interval
+
+    def refresh(self):
+        """Reload the snapshot with the blocking client."""
+        self.signals = set(self.redis.smembers(BLACKLIST_KEY))
+        self.loaded_at = time.monotonic()
+
+    async def load(self):
+        """Reload the snapshot with one SMEMBERS."""
+        members = await get_redis().smembers(BLACKLIST_KEY)
+        self.signals = {m.decode() if isinstance(m, bytes) else m for m in members}
+        self.loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(self.signals)} blacklisted signals")
+
+    async def start(self):
+        """Subscribe to blacklist changes, then load the snapshot so no change is missed."""
+        if self.listener is not None and not self.listener.done():
+            return
+        pubsub = get_redis().pubsub()
+        try:
+            await pubsub.subscribe(BLACKLIST_CHANNEL)
+            await self.load()
+        except BaseException:
+            # Not handed to a listener yet, so nothing else would close its connection
+            await pubsub.aclose()
+            raise
+        self.listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    data = message['data']
+                    self._apply(data.decode() if isinstance(data, bytes) else data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Blacklist listener stopped, falling back to periodic reloads: {type(e).__name__}: {str(e)}")
+        finally:
+            await pubsub.aclose()
+
+    async def stop(self):
+        """Stop listening for changes."""
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+        if self.reload is not None:
+            self.reload.cancel()
+            self.reload = None
 
     def add_signal(self, signal_id):
         """
@@ -14,12 +106,48 @@ class SignalBlacklist:
         Args:
             signal_id: ID of the signal to blacklist.
         """
-        self.redis.sadd('blacklist:signals', signal_id)
+        pipe = self.redis.pipeline()
+        pipe.sadd(BLACKLIST_KEY, signal_id)
+        pipe.publish(BLACKLIST_CHANNEL, f"add:{signal_id}")
+        pipe.execute()
+        self.signals.add(str(signal_id))
         logger.info(f"Added signal {signal_id} to blacklist")
 
+    def remove_signal(self, signal_id):
+        """
+        Remove a signal from the blacklist.
+
+        Args:
+            signal_id: ID of the signal to remove.
+        """
+        pipe = self.redis.pipeline()
+        pipe.srem(BLACKLIST_KEY, signal_id)
+        pipe.publish(BLACKLIST_CHANNEL, f"remove:{signal_id}")
+        pipe.execute()
+        self.signals.discard(str(signal_id))
+        logger.info(f"Removed signal {signal_id} from blacklist")
+
+    async def add(self, signal_id):
+        """Async variant of add_signal."""
+        pipe = get_redis().pipeline()
+        pipe.sadd(BLACKLIST_KEY, signal_id)
+        pipe.publish(BLACKLIST_CHANNEL, f"add:{signal_id}")
+        await pipe.execute()
+        self.signals.add(str(signal_id))
+        logger.info(f"Added signal {signal_id} to blacklist")
+
+    async def remove(self, signal_id):
+        """Async variant of remove_signal."""
+        pipe = get_redis().pipeline()
+        pipe.srem(BLACKLIST_KEY, signal_id)
+        pipe.publish(BLACKLIST_CHANNEL, f"remove:{signal_id}")
+        await pipe.execute()
+        self.signals.discard(str(signal_id))
+        logger.info(f"Removed signal {signal_id} from blacklist")
+
     def is_blacklisted(self, signal_id):
         """
-        Check if a signal is blacklisted.
+        Check if a signal is blacklisted, from the in-memory snapshot.
 
         Args:
             signal_id: ID of the signal to check.
@@ -27,4 +155,48 @@ class SignalBlacklist:
         Returns:
             bool: True if blacklisted, False otherwise.
         """
-        return self.redis.sismember('blacklist:signals', signal_id)
+        if self._stale():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.refresh()
+            else:
+                # Never block the loop on SMEMBERS; this check uses the current snapshot
+                if self.reload is None or self.reload.done():
+                    self.reload = loop.create_task(self._reload())
+        return str(signal_id) in self.signals
+
+    async def _reload(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to reload blacklist: {type(e).__name__}: {str(e)}")
+
+_shared_blacklist = None
+
+async def get_signal_blacklist():
+    """
+    Get the process-wide blacklist, listening for changes on the running event loop.
+
+    Call it from the long-lived worker loop, so the snapshot and its
+    listener are shared by every task of the process. A listener that
+    stopped is restarted.
+
+    Returns:
+        SignalBlacklist: Shared, started blacklist.
+    """
+    global _shared_blacklist
+    if _shared_blacklist is None:
+        _shared_blacklist = SignalBlacklist()
+    try:
+        await _shared_blacklist.start()
+    except Exception as e:
+        logger.error(f"Failed to start blacklist listener: {type(e).__name__}: {str(e)}")
+    return _shared_blacklist
+
+async def close_signal_blacklist():
+    """Stop the listener of the process-wide blacklist, e.g. before its event loop is closed."""
+    global _shared_blacklist
+    if _shared_blacklist is not None:
+        await _shared_blacklist.stop()
+        _shared_blacklist = None
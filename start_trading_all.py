@@ -2,9 +2,8 @@ import asyncio
 import logging
 from user_manager import UserManager
 from exchange_detector import ExchangeDetector
-from ml_predictor import Predictor
-from retraining_manager import RetrainingManager
 from queue_manager import QueueManager
+from candle_scheduler import CandleScheduler
 from notification_manager import NotificationManager
 from signal_blacklist import SignalBlacklist
 from strategy_manager import StrategyManager
@@ -27,8 +26,6 @@ async def start_trading_all(users, credentials, since, limit, timeframe, symbol_
         smtp_password: SMTP password for email notifications.
     """
     detector = ExchangeDetector()
-    retraining_manager = RetrainingManager()
-    predictor = Predictor(retraining_manager)
     queue_manager = QueueManager()
     notification_manager = NotificationManager(smtp_user=smtp_user, smtp_password=smtp_password)
     signal_blacklist = SignalBlacklist()
@@ -41,3 +38,21 @@ async def start_trading_all(users, credentials, since, limit, timeframe, symbol_
             user, credentials[user], since, limit, timeframe, symbol_batch
         )
         logger.info(f"Finished trading for user {user}")
+
+async def schedule_trading_all(users, credentials, limit, timeframe, symbol_batch, scheduler=None):
+    """
+    Trade all users on every candle close instead of on a fixed cycle.
+
+    Args:
+        users: List of user IDs.
+        credentials: Dict of user credentials (API keys).
+        limit: Number of closed OHLCV candles each task fetches.
+        timeframe: Timeframe whose closes trigger the tasks, or dict of user ID -> timeframe.
+        symbol_batch: List of symbols to process (or None to fetch all available symbols).
+        scheduler: CandleScheduler to subscribe the users to (default: a new one).
+    """
+    scheduler = scheduler or CandleScheduler(QueueManager())
+    for user in users:
+        user_timeframe = timeframe[user] if isinstance(timeframe, dict) else timeframe
+        scheduler.subscribe(user, credentials[user], symbol_batch, user_timeframe, limit)
+    await scheduler.run()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = ['celery_app', 'api_server', 'local_model_api']
+HEAVY_PACKAGES = ['tensorflow', 'keras', 'sklearn', 'pandas', 'ccxt', 'deap', 'river', 'torch']
+
+def measure_import(module, repeats=3):
+    """
+    Measure the cold import of a module in fresh interpreters.
+
+    Args:
+        module (str): Module name, imported from the repository root.
+        repeats (int): Fresh interpreters to start, the fastest one is reported (default: 3).
+
+    Returns:
+        dict: Wall time, cumulative import time of the slowest top-level imports,
+            and the heavy packages the import pulled in.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    script = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in {HEAVY_PACKAGES!r} and '.' not in m)))"
+    )
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                                cwd=root, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return {'module': module, 'error': result.stderr.strip().splitlines()[-1] if result.stderr else 'failed'}
+        if best is None or elapsed < best['seconds']:
+            best = {'module': module, 'seconds': elapsed, 'stdout': result.stdout, 'stderr': result.stderr}
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    top_level = []
+    for line in best['stderr'].splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            top_level.append((name.strip(), int(cumulative) / 1e6))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return {
+        'module': module,
+        'seconds': best['seconds'],
+        'slowest_imports': [{'name': name, 'seconds': seconds} for name, seconds in top_level[:10]],
+        'heavy_packages': json.loads(best['stdout'].strip().splitlines()[-1])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import time of service entry points")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    parser.add_argument('--max-seconds', type=float, help="Fail if any module takes longer to import")
+    args = parser.parse_args()
+
+    report = [measure_import(module, args.repeats) for module in args.modules]
+    failed = False
+    for entry in report:
+        if 'error' in entry:
+            print(f"{entry['module']:20s} ERROR {entry['error']}")
+            failed = True
+            continue
+        print(f"{entry['module']:20s} {entry['seconds']:7.3f}s  heavy: {', '.join(entry['heavy_packages']) or '-'}")
+        for item in entry['slowest_imports'][:5]:
+            print(f"    {item['name']:40s} {item['seconds']:7.3f}s")
+        if args.max_seconds is not None and entry['seconds'] > args.max_seconds:
+            failed = True
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': int(time.time()), 'python': sys.version.split()[0], 'modules': report}, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
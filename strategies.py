@@ -1,12 +1,15 @@
 import pandas as pd
-import ccxt.async_support as ccxt
 import numpy as np
 from genetic_optimizer import GeneticOptimizer
+from fitness_cache import FitnessCache
 
-async def optimize_thresholds(exchange, symbol, timeframe, since, limit, strategy_type):
+async def optimize_thresholds(exchange, symbol, timeframe, since, limit, strategy_type, budget=None):
     """
     Optimize thresholds for a strategy using genetic algorithms.
 
+    Fitness scores are cached across runs and the search is warm-started
+    from the previous run's best parameters.
+
     Args:
         exchange: Exchange instance.
         symbol (str): Trading symbol.
@@ -14,12 +17,19 @@ async def optimize_thresholds(exchange, symbol, timeframe, since, limit, strateg
         since (int): Timestamp to fetch from (in milliseconds).
         limit (int): Number of candles to fetch.
         strategy_type (str): Type of strategy ('rsi', 'macd', 'bb', 'vw').
+        budget (int): Compute budget in backtested candles; if set, successive halving
+            is used instead of the full genetic search (optional).
 
     Returns:
         dict: Optimized thresholds.
     """
-    optimizer = GeneticOptimizer(exchange, symbol, timeframe, since, limit)
-    best_params = await optimizer.optimize()
+    cache = FitnessCache(symbol, timeframe, strategy_type)
+    optimizer = GeneticOptimizer(exchange, symbol, timeframe, since, limit, cache=cache)
+    if budget is not None:
+        best_params = await optimizer.optimize_with_budget(budget)
+    else:
+        best_params = await optimizer.optimize()
+    best_params = list(best_params.values())  # profit_target, stop_loss, trailing_percent
     if strategy_type == "rsi":
         return {
             "buy_threshold": best_params[0] * 100,  # Преобразуем в диапазон 0-100
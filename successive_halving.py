@@ -0,0 +1,77 @@
+import math
+from logging_setup import logger_main
+
+def rung_lengths(max_length, min_length=100, eta=3):
+    """
+    History lengths of the successive-halving rungs, growing by eta up to the full history.
+
+    Args:
+        max_length (int): Full history length in candles.
+        min_length (int): Length of the first rung (default: 100).
+        eta (int): Growth factor between rungs (default: 3).
+
+    Returns:
+        list: Increasing slice lengths ending with max_length.
+    """
+    lengths = []
+    length = min(min_length, max_length)
+    while length < max_length:
+        lengths.append(length)
+        length *= eta
+    lengths.append(max_length)
+    return lengths
+
+async def successive_halving(sample_candidates, evaluate_batch, max_length, budget, min_length=100, eta=3,
+                             max_candidates=None):
+    """
+    Budget-aware parameter search in the spirit of successive halving / Hyperband.
+
+    All candidates are scored on the most recent min_length candles, the best
+    1/eta of them are promoted to a slice eta times longer, and so on up to the
+    full history. The number of starting candidates is chosen so that every rung
+    costs roughly the same share of the budget, and a rung is shrunk to its best
+    candidates if the remaining budget cannot cover it. At least one candidate is
+    always scored on the first rung, so a budget below min_length overspends to
+    one slice instead of returning an empty ranking.
+
+    Args:
+        sample_candidates (callable): sample_candidates(n) returning n candidates.
+        evaluate_batch (callable): Coroutine evaluate_batch(candidates, length) returning
+            one score per candidate (higher is better) on the last `length` candles.
+        max_length (int): Full history length in candles.
+        budget (int): Compute budget in simulated candles (candidates x slice length).
+        min_length (int): Slice length of the first rung (default: 100).
+        eta (int): Promotion ratio between rungs (default: 3).
+        max_candidates (int): Upper bound on the starting candidates (optional).
+
+    Returns:
+        tuple: (ranking, spent) where ranking is a list of (candidate, score, length)
+            ordered best first - candidates that reached a longer slice rank above
+            those eliminated earlier - and spent is the budget used.
+    """
+    lengths = rung_lengths(max_length, min_length, eta)
+    n = max(1, int(budget / (len(lengths) * lengths[0])))
+    if max_candidates is not None:
+        n = min(n, max_candidates)
+    candidates = list(enumerate(sample_candidates(n)))
+    deepest = {}  # candidate index -> (candidate, score, length) from the longest slice it reached
+    spent = 0
+    for rung, length in enumerate(lengths):
+        affordable = max((budget - spent) // length, 1 if rung == 0 else 0)
+        if affordable < 1:
+            break
+        # Candidates arrive ordered best first, so trimming keeps the strongest
+        candidates = candidates[:affordable]
+        scores = await evaluate_batch([c for _, c in candidates], length)
+        spent += len(candidates) * length
+        scored = sorted(zip(candidates, scores), key=lambda item: item[1], reverse=True)
+        for (index, candidate), score in scored:
+            deepest[index] = (candidate, score, length)
+        keep = max(1, math.ceil(len(scored) / eta))
+        logger_main.debug(f"Successive halving rung {rung}: {len(scored)} candidates on {length} candles, promoting {keep}")
+        candidates = [item for item, _ in scored[:keep]]
+    ranking = sorted(deepest.values(), key=lambda item: (item[2], item[1]), reverse=True)
+    logger_main.info(f"Successive halving spent {spent} of {budget} candles over {len(ranking)} candidates")
+    return ranking, spent
+
+__all__ = ['rung_lengths', 'successive_halving']
@@ -1,83 +1,133 @@
 # symbol_filter.py
 import logging
 import asyncio
-import redis.asyncio as redis
 import json
 import time
+from redis_pool import get_redis, pipeline
 
 logger = logging.getLogger("main")
 
-async def get_redis_client():
-    """Инициализация Redis клиента."""
-    return await redis.from_url("redis://localhost:6379/0")
+def _verdict(valid, reason, ttl):
+    return json.dumps({'valid': valid, 'reason': reason, 'expires': int(time.time()) + ttl})
 
-async def filter_symbols(exchange, symbols, since, limit, timeframe, user=None, market_state=None, batch_size=500):
-    """Фильтрует символы, оставляя только пары с USDT и достаточным объёмом торгов, по батчам."""
-    redis_client = await get_redis_client()
+async def _save_verdicts(key, updates, ttl):
+    pipe = pipeline()
+    pipe.hset(key, mapping=updates)
+    pipe.expire(key, ttl)
+    await pipe.execute()
+
+async def _check_ohlcv(exchange, symbol, since, limit, timeframe, semaphore):
+    """Returns (valid, reason), or None if the symbol should be retried on the next run."""
+    async with semaphore:
+        try:
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+        except Exception as e:
+            if "429" in str(e):
+                logger.warning(f"Rate limit exceeded for {symbol}, pausing for 5 seconds...")
+                await asyncio.sleep(5)
+                return None
+            logger.error(f"Failed to fetch OHLCV for {symbol}: {type(e).__name__}: {str(e)}")
+            return False, "ohlcv_error"
+    logger.debug(f"Fetched {len(ohlcv)} candles for {symbol}")
+    if len(ohlcv) < limit:
+        logger.warning(f"Skipping {symbol}: insufficient data (only {len(ohlcv)} candles)")
+        return False, "insufficient_data"
+    if sum(candle[5] for candle in ohlcv) == 0:
+        logger.warning(f"Skipping {symbol}: zero trading volume")
+        return False, "zero_volume"
+    return True, "ok"
+
+async def _fetch_tickers(exchange, symbols):
+    """Все тикеры одним запросом; None, если биржа не отдала тикеры."""
+    try:
+        return await exchange.fetch_tickers(symbols)
+    except Exception as e:
+        logger.warning(f"Bulk fetch_tickers for {len(symbols)} symbols failed, fetching all tickers: {type(e).__name__}: {str(e)}")
     try:
-        valid_symbols = []
-        problematic_symbols = []
-        # Проверяем кэш в Redis
-        valid_symbols_key = f"valid_symbols:{user or 'unknown'}"
-        problematic_symbols_key = f"problematic_symbols:{user or 'unknown'}"
-        cached_valid = await redis_client.get(valid_symbols_key)
-        cached_problematic = await redis_client.get(problematic_symbols_key)
+        return await exchange.fetch_tickers()
+    except Exception as e:
+        logger.error(f"Failed to fetch tickers: {type(e).__name__}: {str(e)}")
+        return None
 
-        if cached_valid and cached_problematic:
-            valid_symbols = json.loads(cached_valid.decode())
-            problematic_symbols = json.loads(cached_problematic.decode())
-            logger.info(f"Loaded {len(valid_symbols)} valid symbols and {len(problematic_symbols)} problematic symbols from Redis cache")
-            return valid_symbols
+async def filter_symbols(exchange, symbols, since, limit, timeframe, user=None, market_state=None, batch_size=500,
+                         concurrency=10, verdict_ttl=86400):
+    """
+    Фильтрует символы, оставляя только пары с USDT и достаточным объёмом торгов.
 
-        # Фильтруем символы, которые ещё не в кэше
-        symbols_to_filter = [s for s in symbols if s not in problematic_symbols]
-        for i in range(0, len(symbols_to_filter), batch_size):
-            batch = symbols_to_filter[i:i + batch_size]
-            for symbol in batch:
-                if not symbol.endswith('/USDT'):
-                    problematic_symbols.append(symbol)
-                    continue
-                try:
-                    # Проверяем, поддерживается ли символ API
-                    await exchange.fetch_ticker(symbol)
-                except Exception as e:
-                    logger.error(f"Symbol {symbol} not supported by API: {type(e).__name__}: {str(e)}")
-                    problematic_symbols.append(symbol)
-                    continue
-                try:
-                    ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
-                    logger.debug(f"Fetched {len(ohlcv)} candles for {symbol}")
-                    if len(ohlcv) < limit:
-                        logger.warning(f"Skipping {symbol}: insufficient data (only {len(ohlcv)} candles)")
-                        problematic_symbols.append(symbol)
-                        continue
-                    volume = sum(candle[5] for candle in ohlcv)
-                    if volume == 0:
-                        logger.warning(f"Skipping {symbol}: zero trading volume")
-                        problematic_symbols.append(symbol)
-                        continue
-                    valid_symbols.append(symbol)
-                except Exception as e:
-                    if "429" in str(e):
-                        logger.warning(f"Rate limit exceeded for {symbol}, pausing for 5 seconds...")
-                        await asyncio.sleep(5)
-                        continue
-                    logger.error(f"Failed to fetch OHLCV for {symbol}: {type(e).__name__}: {str(e)}")
-                    problematic_symbols.append(symbol)
-                    continue
-                # Добавляем задержку 0.5 секунды между запросами
-                await asyncio.sleep(0.5)
-            logger.info(f"Processed batch {i//batch_size + 1} of {len(symbols_to_filter)//batch_size + 1}, found {len(valid_symbols)} valid symbols so far")
+    Verdicts are cached per symbol in the Redis hash symbol_verdicts:<user>, each
+    with its own expiry, so a run only re-checks new or expired symbols. Tickers
+    are fetched in one bulk request and OHLCV checks run concurrently.
+
+    Args:
+        exchange: Exchange instance.
+        symbols (list): Symbols to check.
+        since (int): Timestamp to fetch OHLCV data from.
+        limit (int): Candles a valid symbol must have.
+        timeframe (str): Timeframe of the OHLCV check.
+        user: User ID (optional).
+        market_state (str): Market state, for logging (optional).
+        batch_size (int): Symbols checked between verdict writes (default: 500).
+        concurrency (int): OHLCV requests in flight (default: 10).
+        verdict_ttl (int): Seconds a verdict stays valid (default: 24 hours).
+
+    Returns:
+        list: Valid symbols, in input order.
+    """
+    redis_client = get_redis()
+    try:
+        verdicts_key = f"symbol_verdicts:{user or 'unknown'}"
+        symbols = list(dict.fromkeys(symbols))
+        verdicts = {}
+        now = time.time()
+        cached = await redis_client.hmget(verdicts_key, symbols) if symbols else []
+        for symbol, value in zip(symbols, cached):
+            if value is not None:
+                verdict = json.loads(value.decode())
+                if verdict['expires'] > now:
+                    verdicts[symbol] = verdict['valid']
+        to_check = [s for s in symbols if s not in verdicts]
+        logger.info(f"Loaded {len(verdicts)} cached symbol verdicts, checking {len(to_check)} new or expired symbols")
 
-        # Сохраняем результаты в Redis
-        await redis_client.set(valid_symbols_key, json.dumps(valid_symbols), ex=86400)  # Кэшируем на 24 часа
-        await redis_client.set(problematic_symbols_key, json.dumps(problematic_symbols), ex=86400)
-        logger.info(f"Cached {len(valid_symbols)} valid symbols and {len(problematic_symbols)} problematic symbols in Redis")
+        updates = {}
+        for symbol in [s for s in to_check if not s.endswith('/USDT')]:
+            updates[symbol] = _verdict(False, "not_usdt", verdict_ttl)
+            verdicts[symbol] = False
+        to_check = [s for s in to_check if s.endswith('/USDT')]
+
+        if to_check:
+            # Проверяем, поддерживается ли символ API, одним запросом тикеров
+            tickers = await _fetch_tickers(exchange, to_check)
+            if tickers is not None:
+                for symbol in [s for s in to_check if s not in tickers]:
+                    logger.error(f"Symbol {symbol} not supported by API: no ticker")
+                    updates[symbol] = _verdict(False, "no_ticker", verdict_ttl)
+                    verdicts[symbol] = False
+                to_check = [s for s in to_check if s in tickers]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        for i in range(0, len(to_check), batch_size):
+            batch = to_check[i:i + batch_size]
+            results = await asyncio.gather(*[
+                _check_ohlcv(exchange, symbol, since, limit, timeframe, semaphore) for symbol in batch
+            ])
+            for symbol, result in zip(batch, results):
+                if result is None:
+                    continue
+                valid, reason = result
+                updates[symbol] = _verdict(valid, reason, verdict_ttl)
+                verdicts[symbol] = valid
+            # Сохраняем вердикты после каждого батча, чтобы прерванный запуск не начинал заново
+            if updates:
+                await _save_verdicts(verdicts_key, updates, verdict_ttl)
+                updates = {}
+            logger.info(f"Processed batch {i//batch_size + 1} of {-(-len(to_check)//batch_size)}, "
+                        f"{sum(verdicts.values())} valid symbols so far")
+        if updates:
+            await _save_verdicts(verdicts_key, updates, verdict_ttl)
 
+        valid_symbols = [s for s in symbols if verdicts.get(s)]
         logger.info(f"Filtered {len(valid_symbols)} valid symbols for user {user or 'unknown'} in {market_state or 'unknown'} market state")
         return valid_symbols
     except Exception as e:
         logger.error(f"Failed to filter symbols: {type(e).__name__}: {str(e)}")
         return []
-    finally:
-        await redis_client.close()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis_pool
+from worker_runtime import get_runtime
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """
+    In-memory Redis behind redis_pool for code running on the worker loop.
+
+    Returns:
+        fakeredis.aioredis.FakeRedis: Async client shared with the code under test.
+    """
+    server = fakeredis.FakeServer()
+    runtime = get_runtime()
+    runtime.start()
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    monkeypatch.setitem(redis_pool._async_clients, runtime.loop, client)
+    monkeypatch.setattr(redis_pool, "_sync_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    yield client
+    runtime.stop()
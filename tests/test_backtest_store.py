@@ -0,0 +1,86 @@
+import multiprocessing
+
+import numpy as np
+
+from backtest_store import BacktestResultStore, new_run_id
+
+def rows(run_id, profits, strategy='default'):
+    return [{'run_id': run_id, 'symbol': symbol, 'strategy': strategy, 'params': {'fast': 10}, 'profit': profit}
+            for symbol, profit in profits.items()]
+
+def test_append_and_reload(tmp_path):
+    store = BacktestResultStore(str(tmp_path))
+    assert store.append(rows('r1', {'AAA/USDT': 1.0, 'BBB/USDT': 2.0})) == 2
+    store.append(rows('r2', {'AAA/USDT': 3.0}))
+
+    reloaded = BacktestResultStore(str(tmp_path)).query()
+
+    assert sorted(zip(reloaded['run_id'], reloaded['symbol'], reloaded['profit'])) == [
+        ('r1', 'AAA/USDT', 1.0), ('r1', 'BBB/USDT', 2.0), ('r2', 'AAA/USDT', 3.0)
+    ]
+    assert reloaded['params'].tolist() == [{'fast': 10}] * 3
+
+def test_later_rows_supersede_earlier_ones(tmp_path):
+    store = BacktestResultStore(str(tmp_path))
+    store.append(rows('r1', {'AAA/USDT': 1.0}))
+    store.append(rows('r1', {'AAA/USDT': 5.0}))
+    assert store.update('r1', 'AAA/USDT', sharpe_ratio=1.5)
+    assert not store.update('r1', 'ZZZ/USDT', sharpe_ratio=1.5)
+
+    for current in (store, BacktestResultStore(str(tmp_path))):
+        result = current.query(run_id='r1')
+        assert len(result) == 1
+        assert result['profit'].tolist() == [5.0]
+        assert result['sharpe_ratio'].tolist() == [1.5]
+
+def test_top_n(tmp_path):
+    store = BacktestResultStore(str(tmp_path))
+    profits = {f"S{i}/USDT": float(p) for i, p in enumerate(np.random.default_rng(0).permutation(50))}
+    store.append(rows('r1', profits))
+    store.append(rows('r2', {'X/USDT': 100.0}))
+
+    top = store.top_n('profit', n=5, run_id='r1')
+
+    assert top['profit'].tolist() == [49.0, 48.0, 47.0, 46.0, 45.0]
+    assert store.top_n('profit', n=1)['symbol'].tolist() == ['X/USDT']
+    assert store.top_n('profit', n=2, ascending=True)['profit'].tolist() == [0.0, 1.0]
+
+def test_instances_sharing_a_directory_keep_every_row(tmp_path):
+    first = BacktestResultStore(str(tmp_path))
+    second = BacktestResultStore(str(tmp_path))
+    first.append(rows('r1', {'AAA/USDT': 1.0}))
+    second.append(rows('r1', {'BBB/USDT': 2.0}))
+
+    assert sorted(first.top_n('profit')['symbol']) == ['AAA/USDT', 'BBB/USDT']
+    assert len(BacktestResultStore(str(tmp_path)).query()) == 2
+
+def _append_many(path, worker):
+    store = BacktestResultStore(path)
+    for i in range(20):
+        store.append(rows('r1', {f"W{worker}-{i}/USDT": float(i)}))
+
+def test_concurrent_processes_keep_every_row(tmp_path):
+    processes = [multiprocessing.Process(target=_append_many, args=(str(tmp_path), worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert len(BacktestResultStore(str(tmp_path)).query()) == 80
+
+def test_new_run_ids_are_unique_and_sortable():
+    run_ids = [new_run_id() for _ in range(100)]
+    assert len(set(run_ids)) == 100
+    assert [run_id[:22] for run_id in run_ids] == sorted(run_id[:22] for run_id in run_ids)
+
+def test_compact_keeps_live_rows(tmp_path):
+    store = BacktestResultStore(str(tmp_path))
+    other = BacktestResultStore(str(tmp_path))
+    store.append(rows('r1', {'AAA/USDT': 1.0, 'BBB/USDT': 2.0}))
+    other.append(rows('r1', {'AAA/USDT': 4.0}))
+
+    store.compact()
+
+    assert len(store._segment_files()) == 1
+    for current in (store, other, BacktestResultStore(str(tmp_path))):
+        assert current.top_n('profit')['profit'].tolist() == [4.0, 2.0]
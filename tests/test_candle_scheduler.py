@@ -0,0 +1,69 @@
+import asyncio
+import calendar
+import time
+
+import pytest
+
+from candle_clock import candle_open, is_closed, next_close
+from candle_scheduler import CandleScheduler
+
+class FakeQueueManager:
+    def __init__(self):
+        self.sent = []
+
+    async def process_user(self, user, credentials, since, limit, timeframe, symbol_batch):
+        self.sent.append((user, timeframe, time.monotonic()))
+
+def job(user, timeframe, stagger):
+    return {'user': user, 'credentials': {}, 'since': 0, 'limit': 10, 'timeframe': timeframe,
+            'symbol_batch': None, 'stagger': stagger}
+
+def test_staggered_dispatch_does_not_hold_up_other_closes():
+    async def scenario():
+        manager = FakeQueueManager()
+        scheduler = CandleScheduler(manager)
+        started = time.monotonic()
+        spread = await scheduler.dispatch([job(f"u{i}", '1h', 0.6) for i in range(3)])
+        returned = time.monotonic() - started
+        other = await scheduler.dispatch([job('u9', '1m', 30)])
+        await asyncio.gather(*spread, *other)
+        return manager.sent, returned, started, scheduler.sending
+
+    sent, returned, started, sending = asyncio.run(scenario())
+
+    assert returned < 0.1
+    assert [user for user, _, _ in sent] == ['u0', 'u9', 'u1', 'u2']
+    offsets = [at - started for user, _, at in sent if user != 'u9']
+    assert offsets[1] == pytest.approx(0.2, abs=0.1)
+    assert offsets[2] == pytest.approx(0.4, abs=0.1)
+    assert not sending
+
+def test_dispatch_failure_is_logged_not_raised():
+    class FailingQueueManager:
+        async def process_user(self, *args):
+            raise RuntimeError("broker down")
+
+    async def scenario():
+        return await asyncio.gather(*await CandleScheduler(FailingQueueManager()).dispatch([job('u1', '1h', 0)]))
+
+    assert asyncio.run(scenario()) == [None]
+
+MONDAY = calendar.timegm((2024, 1, 1, 0, 0, 0))
+
+@pytest.mark.parametrize('moment', [MONDAY, MONDAY + 2.5 * 86400, MONDAY + 7 * 86400 - 1])
+def test_weekly_candles_open_on_monday(moment):
+    assert candle_open(moment, '1w') == MONDAY
+    assert next_close('1w', moment) == MONDAY + 7 * 86400
+    assert time.gmtime(candle_open(moment, '1w')).tm_wday == 0
+
+def test_is_closed():
+    opened = calendar.timegm((2024, 1, 1, 4, 0, 0))
+
+    assert not is_closed(opened, '4h', now=opened)
+    assert not is_closed(opened, '4h', now=opened + 4 * 3600 - 1)
+    assert is_closed(opened, '4h', now=opened + 4 * 3600)
+    assert not is_closed(MONDAY, '1w', now=MONDAY + 6 * 86400)
+    assert is_closed(MONDAY, '1w', now=MONDAY + 7 * 86400)
+    # Months have their own length
+    assert not is_closed(calendar.timegm((2024, 2, 1, 0, 0, 0)), '1M', now=calendar.timegm((2024, 2, 29, 23, 0, 0)))
+    assert is_closed(calendar.timegm((2024, 2, 1, 0, 0, 0)), '1M', now=calendar.timegm((2024, 3, 1, 0, 0, 0)))
@@ -0,0 +1,118 @@
+import json
+import time
+
+import pytest
+
+import celery_app
+import exchange_detector
+import feature_store
+import ml_predictor
+import model_registry
+import retraining_manager
+from candle_clock import candle_open
+from queue_manager import dedupe_key
+from worker_runtime import run
+
+MARKETS = ['AAA/USDT', 'BBB/USDT', 'CCC/USDT']
+
+class FakeExchange:
+    id = 'fakex'
+
+    def __init__(self):
+        self.ohlcv_calls = []
+
+    async def load_markets(self):
+        return {symbol: {} for symbol in MARKETS}
+
+    async def fetch_tickers(self, symbols=None):
+        return {symbol: {'baseVolume': 10000.0, 'high': 11.0, 'low': 9.0, 'last': 10.0} for symbol in symbols or MARKETS}
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.ohlcv_calls.append(symbol)
+        # CCC/USDT never moves and is screened out for low volatility
+        step = 0.0 if symbol == 'CCC/USDT' else 0.5
+        return [[since + i * 3600000, 10.0, 11.0, 9.0, 10.0 + step * (i % 2), 100.0] for i in range(limit)]
+
+    async def create_market_buy_order(self, symbol, amount):
+        return {'id': f'buy-{symbol}'}
+
+    async def create_market_sell_order(self, symbol, amount):
+        return {'id': f'sell-{symbol}'}
+
+    async def close(self):
+        pass
+
+class FakePool:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    async def connect(self, exchange_id, api_key, api_secret):
+        return self.exchange
+
+class FakeDetector:
+    exchange = None
+
+    async def detect_exchange(self, api_key, api_secret):
+        return FakeDetector.exchange
+
+    async def close(self):
+        pass
+
+@pytest.fixture
+def dispatched(monkeypatch, fake_redis):
+    FakeDetector.exchange = FakeExchange()
+    monkeypatch.setattr(exchange_detector, 'ExchangeDetector', FakeDetector)
+    chords = []
+
+    def fake_chord(header):
+        header = list(header)
+        return lambda callback: chords.append((header, callback))
+
+    monkeypatch.setattr(celery_app, 'chord', fake_chord)
+    monkeypatch.setattr(celery_app, 'SHARD_SIZE', 1)
+    return chords
+
+@pytest.mark.parametrize('symbol_batch', [None, ['AAA_USDT', 'BBB/USDT', 'CCC/USDT', 'ZZZ/USDT']])
+def test_process_user_task_dispatches_shards(dispatched, fake_redis, symbol_batch):
+    since, limit = 1700000000000, 20
+    run(fake_redis.set(dedupe_key('u1', '1h'), 'analysis'))
+
+    celery_app.process_user_task('u1', {'api_key': 'k', 'api_secret': 's'}, since, limit, '1h', symbol_batch)
+
+    assert len(dispatched) == 1
+    header, callback = dispatched[0]
+    assert callback.task == 'celery_app.aggregate_user_results'
+    assert callback.args == ('u1',)
+    shards = [signature.args[6] for signature in header]
+    assert sorted(symbol for shard in shards for symbol in shard) == ['AAA/USDT', 'BBB/USDT']
+    assert all(len(shard) == 1 for shard in shards)
+    for shard in shards:
+        for symbol, key in shard.items():
+            assert key == celery_app.candle_key('fakex', symbol, '1h', since, limit)
+            assert len(json.loads(run(fake_redis.get(key)))) == limit
+    assert not run(fake_redis.exists(dedupe_key('u1', '1h')))
+
+@pytest.fixture
+def shard_env(monkeypatch, tmp_path, fake_redis):
+    exchange = FakeExchange()
+    monkeypatch.setattr(celery_app, 'get_exchange_pool', lambda: FakePool(exchange))
+    monkeypatch.setenv('FEATURE_STORE_DIR', str(tmp_path / 'features'))
+    monkeypatch.setattr(feature_store, '_shared_stores', {})
+    monkeypatch.setattr(model_registry, '_shared_registry', model_registry.ModelRegistry(str(tmp_path / 'registry')))
+    monkeypatch.setattr(ml_predictor, '_shared_predictors', {})
+    monkeypatch.setattr(retraining_manager, '_shared_manager', retraining_manager.RetrainingManager(str(tmp_path / 'spool')))
+    return exchange
+
+@pytest.mark.parametrize('closed', [True, False])
+def test_process_shard_task_stores_closed_candles(shard_env, closed):
+    limit = 80
+    # Candles ending with the one that just closed, or with the one still open
+    last_open = candle_open(time.time(), '1h') - (3600 if closed else 0)
+    since = (last_open - (limit - 1) * 3600) * 1000
+    key = celery_app.candle_key('fakex', 'AAA/USDT', '1h', since, limit)
+
+    celery_app.process_shard_task('u1', {'api_key': 'k', 'api_secret': 's'}, 'fakex', since, limit, '1h', {'AAA/USDT': key})
+
+    timestamps, _ = feature_store.get_feature_store('fakex').arrays('AAA/USDT', '1h')
+    assert len(timestamps) == (limit if closed else limit - 1)
+    assert timestamps[-1] == (last_open * 1000 if closed else last_open * 1000 - 3600000)
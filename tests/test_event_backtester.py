@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from event_backtester import (EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_TRAILING_STOP, EventBacktester,
+                              FeeSchedule)
+
+def candles(opens, highs=None, lows=None, closes=None):
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = opens if closes is None else np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({
+        'timestamp': 1700000000000 + np.arange(len(opens)) * 3600000, 'open': opens,
+        'high': np.maximum(opens, closes) if highs is None else highs,
+        'low': np.minimum(opens, closes) if lows is None else lows,
+        'close': closes, 'volume': np.full(len(opens), 10.0)
+    })
+
+def signals_at(length, **bars):
+    signals = np.zeros(length)
+    for side, bar in bars.items():
+        signals[bar] = 1 if side == 'buy' else -1
+    return signals
+
+def test_market_orders_fill_at_next_open_with_fees():
+    opens = [10.0, 10.0, 10.0, 12.0, 12.0, 12.0, 15.0, 15.0]
+    closes = [10.0, 10.0, 11.0, 12.5, 12.0, 13.0, 14.0, 15.0]
+    fees = FeeSchedule(maker=0.0005, taker=0.002)
+
+    result = EventBacktester(candles(opens, closes=closes), fees=fees).run(signals_at(8, buy=2, sell=5), stop_loss=0)
+
+    qty = 1000.0 * (1 - 0.002) / 12.0
+    proceeds = qty * 15.0
+    log = result['trade_log']
+    assert (log['entry_bar'].tolist(), log['exit_bar'].tolist()) == ([3], [6])
+    assert (log['entry_price'].tolist(), log['exit_price'].tolist()) == ([12.0], [15.0])
+    assert log['reason'].tolist() == [EXIT_SIGNAL]
+    assert result['fees_paid'] == pytest.approx(1000.0 * 0.002 + proceeds * 0.002)
+    assert result['final_balance'] == pytest.approx(proceeds * (1 - 0.002))
+    assert log['pnl'][0] == pytest.approx(result['final_balance'] - 1000.0)
+    # Marked to market at the close while the position is open
+    assert result['equity'][4] == pytest.approx(qty * 12.0)
+
+def test_no_signal_keeps_the_balance():
+    result = EventBacktester(candles(np.linspace(10, 20, 10))).run(np.zeros(10))
+
+    assert result['trades'] == 0
+    assert result['final_balance'] == 1000.0
+    assert result['fees_paid'] == 0.0
+
+@pytest.mark.parametrize('bar, price, reason', [
+    # (open, high, low) of the bar after the entry bar
+    ((99.0, 100.0, 94.0), 95.0, EXIT_STOP_LOSS),
+    ((90.0, 91.0, 89.0), 90.0, EXIT_STOP_LOSS),  # Gaps through the stop, filled at the open
+    ((101.0, 112.0, 100.0), 110.0, EXIT_TAKE_PROFIT),
+    ((115.0, 116.0, 114.0), 115.0, EXIT_TAKE_PROFIT),  # Gaps through the target, filled at the open
+    ((100.0, 112.0, 94.0), 95.0, EXIT_STOP_LOSS),  # Both inside one bar, the stop is assumed first
+])
+def test_stop_loss_and_take_profit_exits(bar, price, reason):
+    data = candles([100.0] * 5)
+    data.loc[2, ['open', 'high', 'low', 'close']] = [*bar, bar[0]]
+    fees = FeeSchedule(maker=0.0005, taker=0.002)
+
+    result = EventBacktester(data, fees=fees).run(signals_at(5, buy=0), profit_target=0.1, stop_loss=0.05)
+
+    qty = 1000.0 * (1 - 0.002) / 100.0
+    rate = fees.maker if reason == EXIT_TAKE_PROFIT else fees.taker
+    log = result['trade_log']
+    assert (log['entry_bar'].tolist(), log['exit_bar'].tolist()) == ([1], [2])
+    assert log['exit_price'][0] == pytest.approx(price)
+    assert log['reason'].tolist() == [reason]
+    assert result['final_balance'] == pytest.approx(qty * price * (1 - rate))
+
+def test_trailing_stop_follows_the_high():
+    opens = [100.0, 100.0, 110.0, 118.0, 118.0]
+    data = candles(opens, highs=[100.0, 100.0, 120.0, 119.0, 118.0], lows=[100.0, 100.0, 109.0, 113.0, 118.0])
+
+    result = EventBacktester(data).run(signals_at(5, buy=0), stop_loss=0.05, trailing_percent=0.05)
+
+    log = result['trade_log']
+    assert log['exit_bar'].tolist() == [3]
+    assert log['exit_price'][0] == pytest.approx(120.0 * 0.95)
+    assert log['reason'].tolist() == [EXIT_TRAILING_STOP]
+
+def test_volatility_stop_uses_volatility_known_at_the_signal():
+    opens = np.full(30, 100.0)
+    closes = opens.copy()
+    highs, lows = opens + 0.5, opens - 0.5
+    # Entry bar 25 closes far above its open, which would widen a stop computed from its own volatility
+    closes[25], highs[25], lows[25] = 200.0, 200.0, 99.0
+    opens[26:], closes[26:], highs[26:], lows[26:] = 150.0, 150.0, 150.0, 97.8
+    backtester = EventBacktester(candles(opens, highs, lows, closes))
+    assert backtester.volatility[25] > backtester.volatility[24]
+
+    result = backtester.run(signals_at(30, buy=24))
+
+    stop = 100.0 * (1 - (0.02 + backtester.volatility[24] * 0.005))
+    assert result['trades'] == 1
+    assert result['trade_log']['exit_bar'].tolist() == [26]
+    assert result['trade_log']['reason'].tolist() == [EXIT_STOP_LOSS]
+    assert result['trade_log']['exit_price'][0] == pytest.approx(stop)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from feature_store import COLUMNS, FeatureStore
+
+HOUR = 3600000
+
+def candles(start, count, seed=0):
+    closes = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, count))
+    return pd.DataFrame({
+        'timestamp': 1700000000000 + (start + np.arange(count)) * HOUR, 'open': closes, 'high': closes + 1,
+        'low': closes - 1, 'close': closes, 'volume': np.full(count, 10.0)
+    })
+
+def test_append_continues_features(tmp_path):
+    data = candles(0, 150)
+    split, whole = FeatureStore(str(tmp_path / 'split')), FeatureStore(str(tmp_path / 'whole'))
+    split.append('AAA/USDT', '1h', data.iloc[:100])
+    assert split.append('AAA/USDT', '1h', data.iloc[90:]) == 50
+    whole.append('AAA/USDT', '1h', data)
+
+    np.testing.assert_allclose(split.arrays('AAA/USDT', '1h')[1], whole.arrays('AAA/USDT', '1h')[1])
+
+def test_append_after_gap_restarts_warmup(tmp_path):
+    store = FeatureStore(str(tmp_path / 'gap'))
+    before, after = candles(0, 100), candles(130, 100, seed=1)
+    store.append('AAA/USDT', '1h', before)
+
+    assert store.append('AAA/USDT', '1h', after) == 100
+
+    fresh = FeatureStore(str(tmp_path / 'fresh'))
+    fresh.append('AAA/USDT', '1h', after)
+    timestamps, values = store.arrays('AAA/USDT', '1h')
+    assert len(timestamps) == 200
+    np.testing.assert_allclose(values[100:], fresh.arrays('AAA/USDT', '1h')[1])
+    # sma_50 of the first candles after the gap is warm-up, not a mix of both sides
+    assert np.isnan(values[100:149, COLUMNS.index('sma_50')]).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from event_backtester import FeeSchedule
+from fitness_cache import FitnessCache, data_fingerprint
+from genetic_optimizer import GeneticOptimizer
+from worker_runtime import run
+
+def candles(n):
+    return [[1700000000000 + i * 3600000, 1.0, 1.0, 1.0, 100.0 + i, 1.0] for i in range(n)]
+
+def test_slice_scores_survive_appends(fake_redis):
+    cache = FitnessCache('AAA/USDT', '1h', 'rsi', ttl=600)
+    run(cache.set_many(data_fingerprint(candles(100)[-50:]), {'a': 1.5}))
+
+    # After a new candle the same slice keeps its fingerprint, a shifted one does not
+    grown = candles(101)
+    assert run(cache.get_many(data_fingerprint(grown[-51:-1]), ['a'])) == {'a': 1.5}
+    assert run(cache.get_many(data_fingerprint(grown[-50:]), ['a'])) == {}
+
+def test_scores_expire_per_slice(fake_redis):
+    cache = FitnessCache('AAA/USDT', '1h', 'rsi', ttl=600)
+    for n in (100, 101):
+        run(cache.set_many(data_fingerprint(candles(n)), {'a': float(n)}))
+
+    keys = run(fake_redis.keys('fitness:AAA/USDT:1h:rsi:*'))
+    assert len(keys) == 2
+    assert all(0 < run(fake_redis.ttl(key)) <= 600 for key in keys)
+
+def test_scores_are_kept_apart_per_signals_and_fees(fake_redis):
+    cache = FitnessCache('AAA/USDT', '1h', 'rsi', ttl=600)
+    fingerprint = data_fingerprint(candles(100))
+    default = cache.with_settings(fees=FeeSchedule())
+    run(default.set_many(fingerprint, {'a': 1.5}))
+    run(default.set_best([[0.05, 0.02, 0.01]]))
+
+    assert run(cache.with_settings(fees=FeeSchedule()).get_many(fingerprint, ['a'])) == {'a': 1.5}
+    for other in (cache.with_settings(fees=FeeSchedule(maker=0.0, taker=0.0005)),
+                  cache.with_settings(np.ones(100), FeeSchedule()), cache.with_settings(np.zeros(100), FeeSchedule())):
+        assert run(other.get_many(fingerprint, ['a'])) == {}
+        assert run(other.get_best()) == [[0.05, 0.02, 0.01]]
+
+def test_optimizer_scopes_the_cache_to_its_settings(fake_redis):
+    data = pd.DataFrame(candles(300), columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    cache = FitnessCache('AAA/USDT', '1h', 'rsi', ttl=600)
+
+    def optimizer(**settings):
+        return GeneticOptimizer(None, 'AAA/USDT', '1h', None, None, data=data, max_workers=0, cache=cache, **settings)
+
+    plain = optimizer()
+    run(plain.evaluate_population([[0.05, 0.02, 0.01]]))
+    assert plain.evaluations == 1
+
+    again = optimizer(fees=FeeSchedule())
+    run(again.evaluate_population([[0.05, 0.02, 0.01]]))
+    assert again.evaluations == 0
+
+    for settings in ({'fees': FeeSchedule(taker=0.01)}, {'signals': np.ones(300)}):
+        other = optimizer(**settings)
+        run(other.evaluate_population([[0.05, 0.02, 0.01]]))
+        assert other.evaluations == 1
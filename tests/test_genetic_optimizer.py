@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from genetic_optimizer import PARAM_NAMES, PARAM_RANGES, GeneticOptimizer
+from worker_runtime import run
+
+def candles(n=1000):
+    closes = 100 + 10 * np.sin(np.arange(n) / 15)
+    return pd.DataFrame({
+        'timestamp': 1700000000000 + np.arange(n) * 3600000, 'open': closes, 'high': closes + 1,
+        'low': closes - 1, 'close': closes, 'volume': np.full(n, 10.0)
+    })
+
+def test_optimize_with_budget_below_first_rung():
+    optimizer = GeneticOptimizer(None, 'AAA/USDT', '1h', None, None, data=candles(), max_workers=0)
+
+    best = run(optimizer.optimize_with_budget(100))
+
+    assert list(best) == PARAM_NAMES
+    assert all(low <= best[name] <= high for name, (low, high) in zip(PARAM_NAMES, PARAM_RANGES))
+    assert optimizer.evaluations == 1
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+
+import local_model_api
+from local_model_api import MicroBatcher
+
+def candles(close):
+    return [[1700000000000 + i * 3600000, close, close, close, close, 1.0] for i in range(3)]
+
+def test_concurrent_predictions_share_one_forward_pass(monkeypatch):
+    calls = []
+
+    def predict_rows(X):
+        calls.append(X.copy())
+        return X[:, 0] * 2
+
+    monkeypatch.setattr(local_model_api.predictor, 'feature_row',
+                        lambda df: np.array([[df['close'].iloc[-1], 0.0, 0.0, 0.0, 0.0]]))
+
+    async def scenario():
+        batcher = MicroBatcher(predict_rows, max_batch_size=16, max_wait_ms=200)
+        monkeypatch.setattr(local_model_api, 'batcher', batcher)
+        batcher.start()
+        transport = httpx.ASGITransport(app=local_model_api.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await asyncio.gather(*[
+                    client.post('/predict', json={'data': candles(close)}) for close in (1.0, 2.0, 3.0, 4.0)
+                ])
+        finally:
+            await batcher.stop()
+
+    responses = asyncio.run(scenario())
+
+    assert [response.json() for response in responses] == [{'predictions': close * 2} for close in (1.0, 2.0, 3.0, 4.0)]
+    assert len(calls) == 1
+    assert sorted(calls[0][:, 0]) == [1.0, 2.0, 3.0, 4.0]
+
+def test_batch_failure_reaches_every_caller():
+    async def scenario():
+        # One prediction for a batch of three rows must not be spread over the callers
+        batcher = MicroBatcher(lambda X: X[:1, 0], max_wait_ms=100)
+        batcher.start()
+        try:
+            return await asyncio.gather(*[batcher.submit(np.ones((1, 5)) * i) for i in range(3)], return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_submit_rejects_more_than_one_row():
+    async def scenario():
+        await MicroBatcher(lambda X: X[:, 0]).submit(np.ones((2, 5)))
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
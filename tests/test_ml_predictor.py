@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from ml_predictor import FEATURE_COLUMNS, LAYERS, DenseNetwork
+
+def zero_weights():
+    weights = []
+    fan_in = len(FEATURE_COLUMNS)
+    for units, _ in LAYERS:
+        weights += [np.zeros((fan_in, units)), np.zeros(units)]
+        fan_in = units
+    return weights
+
+def test_forward_pass_on_known_weights():
+    weights = zero_weights()
+    weights[0][0, 0] = weights[0][1, 1] = 1.0
+    weights[1][1] = -2.0
+    weights[2][0, 0] = weights[2][1, 0] = 1.0
+    weights[4][0, 0] = 2.0
+    weights[5][0] = -10.0
+    X = np.array([[3.0, 1.0, 7.0, 7.0, 7.0], [-3.0, 4.0, 0.0, 0.0, 0.0]])
+
+    out = DenseNetwork(weights)(X)
+
+    # Hidden units clip at zero (3, max(1 - 2, 0)) and (max(-3, 0), 2); the linear output goes negative
+    assert out.shape == (2, 1)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out[:, 0], [2 * 3 - 10, 2 * 2 - 10])
+
+def test_set_weights_rejects_mismatched_shapes():
+    network = DenseNetwork(seed=0)
+    before = network.get_weights()
+    weights = zero_weights()
+    weights[2] = np.zeros((LAYERS[0][0] + 1, LAYERS[1][0]))
+
+    with pytest.raises(ValueError):
+        network.set_weights(weights)
+    with pytest.raises(ValueError):
+        network.set_weights(zero_weights()[:-1])
+    with pytest.raises(ValueError):
+        DenseNetwork([np.zeros((len(FEATURE_COLUMNS) + 1, LAYERS[0][0]))] + zero_weights()[1:])
+    assert all(a is b for a, b in zip(network.get_weights(), before))
+
+def test_matches_keras_model():
+    pytest.importorskip('tensorflow')
+    from ml_predictor import Predictor
+
+    rng = np.random.default_rng(0)
+    model = Predictor.build_model()
+    # Non-zero biases, Keras initializes them to zero
+    model.set_weights([w + rng.normal(0, 0.1, w.shape).astype(np.float32) for w in model.get_weights()])
+    X = rng.normal(size=(32, len(FEATURE_COLUMNS))).astype(np.float32)
+
+    expected = model(X, training=False).numpy()
+
+    np.testing.assert_allclose(DenseNetwork(model.get_weights())(X), expected, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from model_registry import ModelRegistry
+
+def weights(scale=1.0):
+    return [np.arange(6, dtype=np.float32).reshape(2, 3) * scale, np.ones(3, dtype=np.float32) * scale]
+
+def test_publish_serves_new_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.current_version('lstm') is None
+    assert registry.load_weights('lstm') == (None, None)
+
+    def write_artifact(path):
+        with open(path, 'w') as f:
+            json.dump({'scaler': 'minmax'}, f)
+
+    first = registry.publish('lstm', weights=weights(), artifacts={'scaler.json': write_artifact},
+                             metadata={'features': ['close', 'rsi']})
+    second = registry.publish('lstm', weights=weights(2.0), make_current=False)
+
+    assert (first, second) == ('v0001', 'v0002')
+    assert registry.versions('lstm') == ['v0001', 'v0002']
+    assert registry.current_version('lstm') == 'v0001'
+    metadata = registry.metadata('lstm')
+    assert (metadata['version'], metadata['features'], metadata['weights']) == ('v0001', ['close', 'rsi'], 2)
+    with open(f"{registry.version_dir('lstm')}/scaler.json") as f:
+        assert json.load(f) == {'scaler': 'minmax'}
+
+    registry.set_current('lstm', 'default', second)
+    assert registry.current_version('lstm') == 'v0002'
+    with pytest.raises(ValueError):
+        registry.set_current('lstm', 'default', 'v0009')
+
+def test_groups_are_versioned_separately(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.publish('lstm', 'majors', weights=weights())
+    registry.publish('lstm', 'majors', weights=weights())
+
+    assert registry.publish('lstm', 'alts', weights=weights()) == 'v0001'
+    assert registry.current_version('lstm', 'majors') == 'v0002'
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_load_weights(tmp_path, mmap):
+    registry = ModelRegistry(str(tmp_path))
+    registry.publish('lstm', weights=weights())
+    registry.publish('lstm', weights=weights(3.0))
+
+    version, loaded = registry.load_weights('lstm', mmap=mmap)
+    _, older = registry.load_weights('lstm', version='v0001', mmap=mmap)
+
+    assert version == 'v0002'
+    for array, expected in zip(loaded, weights(3.0)):
+        np.testing.assert_array_equal(array, expected)
+        assert array.dtype == expected.dtype
+        assert isinstance(array, np.memmap) == mmap
+        if mmap:
+            assert not array.flags.writeable
+    np.testing.assert_array_equal(older[0], weights()[0])
+
+def test_prune_keeps_newest_and_current(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    for _ in range(6):
+        registry.publish('lstm', weights=weights(), make_current=False)
+    registry.set_current('lstm', 'default', 'v0001')
+
+    removed = registry.prune('lstm', keep=2)
+
+    assert removed == ['v0002', 'v0003', 'v0004']
+    assert registry.versions('lstm') == ['v0001', 'v0005', 'v0006']
+    assert registry.load_weights('lstm')[0] == 'v0001'
+    assert registry.prune('lstm', keep=2) == []
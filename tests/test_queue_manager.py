@@ -0,0 +1,82 @@
+import pytest
+
+import queue_manager
+from queue_manager import (ANALYSIS_PRIORITY, ANALYSIS_QUEUE, ORDERS_PRIORITY, ORDERS_QUEUE, QueueManager, dedupe_key,
+                           pending_key, task_started)
+from worker_runtime import run
+
+class FakeResult:
+    def __init__(self, id):
+        self.id = id
+
+class FakeApp:
+    def __init__(self):
+        self.sent = []
+
+    def send_task(self, name, args, queue, priority):
+        self.sent.append((name, args, queue, priority))
+        return FakeResult(f"task-{len(self.sent)}")
+
+@pytest.fixture
+def manager(fake_redis):
+    manager = QueueManager(max_depth=2, backpressure_timeout=0)
+    manager.app = FakeApp()
+    manager.depths = []
+    manager._depth = lambda queue: manager.depths.pop(0) if manager.depths else 0
+    return manager
+
+def dispatch(manager, user='u1', timeframe='1h', queue=ANALYSIS_QUEUE):
+    return run(manager.process_user(user, {'api_key': 'k'}, 0, 10, timeframe, None, queue=queue))
+
+def dispatched(outcome, queue=ANALYSIS_QUEUE):
+    return queue_manager.dispatch_metric.labels(queue, outcome)._value.get()
+
+def test_pending_task_is_deduplicated(manager, fake_redis):
+    deduplicated = dispatched('deduplicated')
+
+    assert dispatch(manager) == 'task-1'
+    assert dispatch(manager) is None
+    assert dispatch(manager, timeframe='4h') == 'task-2'
+    assert dispatched('deduplicated') == deduplicated + 1
+
+    run(task_started('u1', '1h'))
+
+    assert dispatch(manager) == 'task-3'
+    assert len(manager.app.sent) == 3
+
+@pytest.mark.parametrize('queue, priority', [(ANALYSIS_QUEUE, ANALYSIS_PRIORITY), (ORDERS_QUEUE, ORDERS_PRIORITY)])
+def test_tasks_are_sent_with_the_queue_priority(manager, queue, priority):
+    dispatch(manager, queue=queue)
+
+    assert manager.app.sent == [('celery_app.process_user_task', ('u1', {'api_key': 'k'}, 0, 10, '1h', None), queue, priority)]
+
+@pytest.mark.parametrize('queue', [ANALYSIS_QUEUE, ORDERS_QUEUE])
+def test_task_started_clears_the_pending_entry_of_its_queue(manager, fake_redis, queue):
+    dispatch(manager, queue=queue)
+    assert run(fake_redis.zcard(pending_key(queue))) == 1
+
+    run(task_started('u1', '1h'))
+
+    assert run(fake_redis.zcard(pending_key(queue))) == 0
+    assert not run(fake_redis.exists(dedupe_key('u1', '1h')))
+    assert run(manager.queue_lag(queue)) == 0.0
+
+def test_full_queue_drops_the_task(manager, fake_redis):
+    rejected = dispatched('rejected')
+    manager.depths = [2]
+
+    assert dispatch(manager) is None
+
+    assert manager.app.sent == []
+    assert dispatched('rejected') == rejected + 1
+    # Nothing stays pending, so the next attempt is not deduplicated
+    assert not run(fake_redis.exists(dedupe_key('u1', '1h')))
+    assert run(fake_redis.zcard(pending_key(ANALYSIS_QUEUE))) == 0
+    assert dispatch(manager) == 'task-1'
+
+def test_dispatch_waits_for_the_queue_to_drain(manager):
+    manager.backpressure_timeout = 5
+    manager.depths = [3, 1]
+
+    assert dispatch(manager) == 'task-1'
+    assert manager.depths == []
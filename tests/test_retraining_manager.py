@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from retraining_manager import RetrainingManager
+
+def candles(n):
+    closes = 100 + np.sin(np.arange(n) / 3)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(1700000000000 + np.arange(n) * 3600000, unit='ms'),
+        'open': closes, 'high': closes + 1, 'low': closes - 1, 'close': closes, 'volume': 1.0
+    })
+
+def spooled(spool_dir):
+    t = []
+    for name in sorted(f for f in os.listdir(spool_dir) if f.endswith('.npz')):
+        with np.load(os.path.join(spool_dir, name)) as samples:
+            t.extend(samples['t'].tolist())
+    return t
+
+def test_retrain_spools_each_closed_sample_once(tmp_path):
+    manager = RetrainingManager(str(tmp_path))
+    data = candles(120)
+
+    first = manager.retrain(data.iloc[:100], 'fakex', 'AAA/USDT', '1h', include_last=False)
+    assert manager.retrain(data.iloc[:100], 'fakex', 'AAA/USDT', '1h', include_last=False) == 0
+    second = manager.retrain(data.iloc[10:120], 'fakex', 'AAA/USDT', '1h', include_last=False)
+
+    t = spooled(str(tmp_path))
+    assert len(t) == first + second == len(set(t))
+    # The open last candle is never used, so the newest sample is labeled by the last closed close
+    last_closed = data['timestamp'].iloc[-2].value // 10**6
+    assert max(t) < last_closed
+    # Another exchange's series is tracked separately
+    assert manager.retrain(data.iloc[:100], 'otherx', 'AAA/USDT', '1h', include_last=False) == first
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import signal_blacklist
+from signal_blacklist import BLACKLIST_KEY, get_signal_blacklist
+from worker_runtime import run
+
+def test_shared_blacklist_follows_published_changes(fake_redis):
+    async def scenario():
+        blacklist = await get_signal_blacklist()
+        await blacklist.add('AAA/USDT')
+        assert blacklist is await get_signal_blacklist()
+        # A change published by another process reaches the shared snapshot
+        other = signal_blacklist.SignalBlacklist()
+        await other.add('BBB/USDT')
+        for _ in range(50):
+            if blacklist.is_blacklisted('BBB/USDT'):
+                break
+            await asyncio.sleep(0.01)
+        return blacklist.is_blacklisted('AAA/USDT'), blacklist.is_blacklisted('BBB/USDT')
+
+    assert run(scenario()) == (True, True)
+
+def test_stale_snapshot_reloads_without_blocking(fake_redis, monkeypatch):
+    async def scenario():
+        blacklist = signal_blacklist.SignalBlacklist(refresh_interval=0)
+        monkeypatch.setattr(blacklist, 'refresh', lambda: (_ for _ in ()).throw(AssertionError("blocking reload")))
+        await fake_redis.sadd(BLACKLIST_KEY, 'AAA/USDT')
+        first = blacklist.is_blacklisted('AAA/USDT')
+        await blacklist.reload
+        return first, blacklist.is_blacklisted('AAA/USDT')
+
+    # The stale check answers from the current snapshot and reloads in the background
+    assert run(scenario()) == (False, True)
+
+def test_failed_start_closes_the_pubsub(fake_redis, monkeypatch):
+    pubsubs = []
+    make_pubsub = fake_redis.pubsub
+    monkeypatch.setattr(fake_redis, 'pubsub', lambda: pubsubs.append(make_pubsub()) or pubsubs[-1])
+
+    async def failing_load():
+        raise ConnectionError("redis down")
+
+    async def scenario():
+        blacklist = signal_blacklist.SignalBlacklist()
+        monkeypatch.setattr(blacklist, 'load', failing_load)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await blacklist.start()
+        return blacklist.listener
+
+    assert run(scenario()) is None
+    assert len(pubsubs) == 3
+    # Every subscribed connection went back to the pool
+    assert all(pubsub.connection is None for pubsub in pubsubs)
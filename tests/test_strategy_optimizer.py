@@ -0,0 +1,32 @@
+import json
+import math
+
+import pytest
+
+from learning.strategy_optimizer import optimize_strategies
+from worker_runtime import run
+
+class FakeExchange:
+    def __init__(self, candles=200):
+        self.candles = candles
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        # ccxt returns plain lists: [timestamp, open, high, low, close, volume]
+        closes = [100 + 10 * math.sin(i / 7) for i in range(self.candles)]
+        return [[1700000000000 + i * 14400000, c, c + 1, c - 1, c, 10.0] for i, c in enumerate(closes)][-limit:]
+
+@pytest.mark.parametrize('budget', [None, 20000])
+def test_optimize_strategies_ranks_list_candles(fake_redis, budget):
+    top = run(optimize_strategies(FakeExchange(), 'AAA/USDT', '4h', limit=200, budget=budget))
+
+    assert len(top) == 3
+    assert all(len(strategy['indicators']) == 2 for strategy in top)
+    assert [s['profit'] for s in top] == sorted((s['profit'] for s in top), reverse=True)
+    assert json.loads(run(fake_redis.get('custom_strategies:AAA/USDT'))) == top
+    assert run(fake_redis.keys('fitness:AAA/USDT:4h:custom:*'))
+
+def test_optimize_strategies_budget_below_first_rung(fake_redis):
+    top = run(optimize_strategies(FakeExchange(), 'AAA/USDT', '4h', limit=200, budget=10))
+
+    assert len(top) == 1
+    assert json.loads(run(fake_redis.get('custom_strategies:AAA/USDT'))) == top
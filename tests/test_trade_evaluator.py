@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from learning import trade_evaluator
+from learning.trade_evaluator import evaluate_trade, evaluate_trades, get_trade_stats
+from worker_runtime import run
+
+PROFITS = np.random.default_rng(0).normal(0.5, 2.0, 40)
+
+def trades(profits, user='u1'):
+    return [{'symbol': 'AAA/USDT', 'user': user, 'strategy_info': {'name': 'sma'}, 'profit': float(p)} for p in profits]
+
+def assert_stats(stats, profits):
+    assert stats['total_trades'] == len(profits)
+    assert stats['successful_trades'] == int((profits > 0).sum())
+    assert stats['success_rate'] == pytest.approx((profits > 0).mean())
+    assert stats['avg_profit'] == pytest.approx(np.mean(profits), rel=1e-12)
+    assert stats['profit_volatility'] == pytest.approx(np.std(profits), rel=1e-12)
+
+def test_running_stats_match_numpy(fake_redis):
+    results = run(evaluate_trades(trades(PROFITS[:25])))
+    for profit in PROFITS[25:]:
+        last = run(evaluate_trade('AAA/USDT', 'u2', {'name': 'sma'}, float(profit)))
+
+    assert len(results) == 25
+    assert_stats(results[-1], PROFITS[:25])
+    assert_stats(last, PROFITS)
+    assert_stats(run(get_trade_stats('AAA/USDT')), PROFITS)
+    assert 0 < run(fake_redis.ttl('profitability:AAA/USDT')) <= trade_evaluator.STATS_TTL
+
+def test_legacy_json_stats_are_converted(fake_redis):
+    old = PROFITS[:30]
+    run(fake_redis.set('profitability:AAA/USDT', json.dumps({
+        'total_trades': len(old), 'successful_trades': int((old > 0).sum()), 'success_rate': float((old > 0).mean()),
+        'avg_profit': float(np.mean(old)), 'profit_volatility': float(np.std(old))
+    })))
+
+    stats = run(evaluate_trades(trades(PROFITS[30:])))[-1]
+
+    assert_stats(stats, PROFITS)
+    assert run(fake_redis.type('profitability:AAA/USDT')) == b'hash'
+
+def test_history_is_capped(fake_redis, monkeypatch):
+    monkeypatch.setattr(trade_evaluator, 'HISTORY_LIMIT', 5)
+
+    run(evaluate_trades(trades(PROFITS[:12])))
+
+    history = [json.loads(item) for item in run(fake_redis.lrange('trade_history:AAA/USDT:u1', 0, -1))]
+    assert [item['profit'] for item in history] == pytest.approx(PROFITS[11:6:-1].tolist())
+    assert history[0]['strategy'] == {'name': 'sma'}
+    assert run(get_trade_stats('AAA/USDT'))['total_trades'] == 12
+
+def test_no_stats_before_the_first_trade(fake_redis):
+    assert run(get_trade_stats('AAA/USDT')) is None
+    assert run(evaluate_trades([])) == []
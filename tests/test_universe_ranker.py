@@ -0,0 +1,22 @@
+import pytest
+
+from universe_ranker import UniverseRanker
+
+def tickers(volumes):
+    return {symbol: {'baseVolume': volume, 'high': 11.0, 'low': 9.0, 'last': 10.0} for symbol, volume in volumes.items()}
+
+@pytest.fixture
+def ranker():
+    ranker = UniverseRanker('fakex', top_n=3)
+    ranker.update(tickers({'A': 5000.0, 'B': 4000.0, 'C': 3000.0, 'D': 2000.0, 'E': 500.0}))
+    return ranker
+
+def test_top_serves_cached_ranking_for_symbols(ranker, monkeypatch):
+    monkeypatch.setattr(ranker, '_rank', lambda *args: pytest.fail('ranking recomputed'))
+
+    assert [symbol for symbol, _, _ in ranker.top(2, ['C', 'A', 'X'])] == ['A', 'C']
+    assert [symbol for symbol, _, _ in ranker.top(1, ['B', 'D'])] == ['B']
+
+def test_top_ranks_symbols_beyond_cached_ranking(ranker):
+    assert [symbol for symbol, _, _ in ranker.top(2, ['C', 'D', 'E'])] == ['C', 'D']
+    assert [symbol for symbol, _, _ in ranker.top(3, ['D', 'E', 'X'])] == ['D']
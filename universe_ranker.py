@@ -0,0 +1,139 @@
+import time
+import numpy as np
+from logging_setup import logger_main
+
+class UniverseRanker:
+    """
+    Columnar ticker snapshots of one exchange with a cached top-N ranking.
+
+    Volume and volatility of every known symbol live in numpy columns
+    indexed by a symbol -> row map, so a new snapshot updates rows in place
+    and the top-N is selected with argpartition instead of sorting the whole
+    universe. The ranking is computed once per snapshot and then served to
+    every caller.
+    """
+
+    def __init__(self, exchange_id, top_n=100, min_volume=1000):
+        """
+        Initialize the ranker.
+
+        Args:
+            exchange_id (str): Exchange the snapshots come from.
+            top_n (int): Size of the cached ranking (default: 100).
+            min_volume (float): Minimum base volume to be ranked (default: 1000).
+        """
+        self.exchange_id = exchange_id
+        self.top_n = top_n
+        self.min_volume = min_volume
+        self.symbols = []
+        self.rows = {}
+        self.volume = np.empty(0)
+        self.volatility = np.empty(0)
+        self.updated = np.empty(0)
+        self.last_update = 0.0
+        self._ranking = []
+
+    def _grow(self, count):
+        size = len(self.symbols) + count
+        if size <= len(self.volume):
+            return
+        capacity = max(size, 2 * len(self.volume), 256)
+        for name, fill in (('volume', 0.0), ('volatility', 0.0), ('updated', 0.0)):
+            column = np.full(capacity, fill)
+            column[:len(self.symbols)] = getattr(self, name)[:len(self.symbols)]
+            setattr(self, name, column)
+
+    def update(self, tickers):
+        """
+        Merge a ticker snapshot and refresh the ranking.
+
+        Args:
+            tickers (dict): Symbol -> ccxt ticker, as returned by fetch_tickers.
+        """
+        new = [symbol for symbol in tickers if symbol not in self.rows]
+        self._grow(len(new))
+        for symbol in new:
+            self.rows[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        rows = np.fromiter((self.rows[symbol] for symbol in tickers), dtype=np.int64, count=len(tickers))
+        values = np.array([
+            [ticker.get('baseVolume') or 0.0, ticker.get('high') or 0.0, ticker.get('low') or 0.0, ticker.get('last') or 0.0]
+            for ticker in tickers.values()
+        ], dtype=np.float64).reshape(-1, 4)
+        self.volume[rows] = values[:, 0]
+        # Intraday range relative to the last price as the ticker-level volatility proxy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.volatility[rows] = np.where(values[:, 3] > 0, (values[:, 1] - values[:, 2]) / values[:, 3], 0.0)
+        self.last_update = time.time()
+        self.updated[rows] = self.last_update
+        self._ranking = self._rank(np.arange(len(self.symbols)), self.top_n, 'volume')
+        logger_main.debug(f"Updated {len(tickers)} tickers of {self.exchange_id} ({len(new)} new), "
+                          f"{len(self.symbols)} symbols known")
+
+    def _rank(self, rows, n, by):
+        column = self.volume if by == 'volume' else self.volatility
+        rows = rows[self.volume[rows] >= self.min_volume]
+        if len(rows) > n:
+            rows = rows[np.argpartition(-column[rows], n - 1)[:n]]
+        rows = rows[np.argsort(-column[rows], kind='stable')]
+        return [(self.symbols[row], float(self.volume[row]), float(self.volatility[row])) for row in rows]
+
+    def age(self):
+        """Seconds since the last snapshot."""
+        return time.time() - self.last_update
+
+    def missing(self, symbols):
+        """Symbols that no snapshot covered yet."""
+        return [symbol for symbol in symbols if symbol not in self.rows]
+
+    def top(self, n=None, symbols=None, by='volume'):
+        """
+        Get the ranked universe.
+
+        Args:
+            n (int): Number of symbols (default: top_n).
+            symbols (list): Restrict the ranking to these symbols (optional).
+            by (str): 'volume' or 'volatility' (default: 'volume').
+
+        Returns:
+            list: (symbol, volume, volatility) tuples, highest first, above min_volume.
+        """
+        n = n or self.top_n
+        if by == 'volume' and n <= self.top_n:
+            if symbols is None:
+                return self._ranking[:n]
+            # Symbols outside the cached ranking trade less than all of it, so while the
+            # filtered ranking still has n entries it is exactly the top-n of the subset
+            wanted = set(symbols)
+            ranking = [entry for entry in self._ranking if entry[0] in wanted][:n]
+            if len(ranking) == n or len(self._ranking) < self.top_n:
+                return ranking
+        if symbols is None:
+            rows = np.arange(len(self.symbols))
+        else:
+            rows = np.array([self.rows[symbol] for symbol in symbols if symbol in self.rows], dtype=np.int64)
+        return self._rank(rows, n, by)
+
+    def volume_of(self, symbol):
+        """Last known base volume of a symbol (None if unknown)."""
+        row = self.rows.get(symbol)
+        return None if row is None else float(self.volume[row])
+
+_shared_rankers = {}
+
+def get_universe_ranker(exchange_id, top_n=100):
+    """
+    Get the process-wide ranker of an exchange, shared by all users trading on it.
+
+    Args:
+        exchange_id (str): Exchange ID.
+        top_n (int): Size of the cached ranking when the ranker is created (default: 100).
+
+    Returns:
+        UniverseRanker: Shared ranker instance.
+    """
+    if exchange_id not in _shared_rankers:
+        _shared_rankers[exchange_id] = UniverseRanker(exchange_id, top_n)
+    return _shared_rankers[exchange_id]
+
+__all__ = ['UniverseRanker', 'get_universe_ranker']
@@ -0,0 +1,177 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+logger = logging.getLogger("main")
+
+class WorkerRuntime:
+    """
+    Long-lived event loop of a worker process.
+
+    The loop runs in a daemon thread for the whole life of the process, so
+    clients bound to it (exchange connections, aiohttp sessions, the Redis
+    pool) stay warm across tasks. Synchronous code such as Celery task bodies
+    submits coroutines with run(); cleanup coroutines registered with
+    on_shutdown() run on the loop when the runtime stops.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.shutdown_hooks = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the loop thread (no-op if it is already running)."""
+        with self.lock:
+            if self.running():
+                return
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self.thread = threading.Thread(target=self._serve, args=(ready,), name="worker-event-loop", daemon=True)
+            self.thread.start()
+            ready.wait()
+        logger.info("Started worker event loop")
+
+    def _serve(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    def running(self):
+        """Whether the loop thread is alive."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the worker loop and wait for its result.
+
+        Must not be called from the loop thread itself.
+
+        Args:
+            coro: Coroutine to run.
+            timeout (float): Seconds to wait before the coroutine is cancelled (optional).
+
+        Returns:
+            Result of the coroutine (its exception is re-raised).
+        """
+        if not self.running():
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def on_shutdown(self, hook):
+        """
+        Register a coroutine function to await when the runtime stops.
+
+        Hooks run in reverse registration order.
+
+        Args:
+            hook: Coroutine function without arguments.
+
+        Returns:
+            The hook, so this can be used as a decorator.
+        """
+        self.shutdown_hooks.append(hook)
+        return hook
+
+    async def _shutdown(self):
+        for hook in reversed(self.shutdown_hooks):
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Worker shutdown hook {hook.__name__} failed: {type(e).__name__}: {str(e)}")
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout=30):
+        """
+        Run the shutdown hooks, cancel leftover tasks and stop the loop.
+
+        Args:
+            timeout (float): Seconds to wait for the shutdown (default: 30).
+        """
+        with self.lock:
+            if not self.running():
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+            except Exception as e:
+                logger.error(f"Worker event loop shutdown failed: {type(e).__name__}: {str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+        logger.info("Stopped worker event loop")
+
+_runtime = WorkerRuntime()
+_exchange_pool = None
+
+def get_runtime():
+    """
+    Get the process-wide worker runtime.
+
+    Returns:
+        WorkerRuntime: Shared runtime (started on first run()).
+    """
+    return _runtime
+
+def run(coro, timeout=None):
+    """Run a coroutine on the process-wide worker loop, see WorkerRuntime.run."""
+    return _runtime.run(coro, timeout)
+
+def get_exchange_pool():
+    """
+    Get the exchange pool shared by the tasks of this worker process.
+
+    Its exchanges live on the worker loop, so only use it from coroutines
+    submitted with run(). The pool is closed when the runtime stops.
+
+    Returns:
+        ExchangePool: Shared pool.
+    """
+    global _exchange_pool
+    if _exchange_pool is None:
+        from exchange_pool import ExchangePool
+        _exchange_pool = ExchangePool()
+    return _exchange_pool
+
+async def _close_shared_clients():
+    global _exchange_pool
+    from redis_pool import close_redis
+    from signal_blacklist import close_signal_blacklist
+    await close_signal_blacklist()
+    if _exchange_pool is not None:
+        await _exchange_pool.close()
+        _exchange_pool = None
+    await close_redis()
+
+_runtime.on_shutdown(_close_shared_clients)
+
+def install():
+    """
+    Tie the runtime to the life of the Celery worker processes.
+
+    The loop is started in worker_process_init and stopped in
+    worker_process_shutdown, so every pool process gets its own loop (a loop
+    cannot be shared across fork).
+    """
+    from celery.signals import worker_process_init, worker_process_shutdown
+
+    @worker_process_init.connect(weak=False)
+    def start_runtime(**kwargs):
+        _runtime.start()
+
+    @worker_process_shutdown.connect(weak=False)
+    def stop_runtime(**kwargs):
+        _runtime.stop()
+
+__all__ = ['WorkerRuntime', 'get_runtime', 'run', 'get_exchange_pool', 'install']